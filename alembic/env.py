@@ -1,11 +1,11 @@
 from logging.config import fileConfig
 
-from sqlalchemy import engine_from_config
-from sqlalchemy import pool
-
+import sqlalchemy as sa
 from alembic import context
+from alembic.runtime.migration import MigrationContext
 
 from models import Base
+from database import SQLALCHEMY_DATABASE_URL, create_db_engine, is_sqlite
 target_metadata = Base.metadata
 
 # this is the Alembic Config object, which provides
@@ -17,6 +17,48 @@ config = context.config
 if config.config_file_name is not None:
     fileConfig(config.config_file_name)
 
+# URL DB sama dengan app (env DATABASE_URL, lihat database.py), bukan dari alembic.ini
+config.set_main_option("sqlalchemy.url", SQLALCHEMY_DATABASE_URL.replace("%", "%%"))
+# SQLite tidak mendukung sebagian besar ALTER TABLE: pakai mode batch (copy-and-move)
+RENDER_AS_BATCH = is_sqlite(SQLALCHEMY_DATABASE_URL)
+
+# Tabel yang di MySQL dibuat manual sebelum migrasi pertama (add61567ae5e menganggapnya
+# sudah ada). Untuk DB SQLite baru dibuat di sini, jadi revisi yang sudah rilis tidak diubah.
+PRE_ALEMBIC_METADATA = sa.MetaData()
+sa.Table(
+    'users', PRE_ALEMBIC_METADATA,
+    sa.Column('id', sa.Integer(), primary_key=True, index=True),
+    sa.Column('nama', sa.String(100), nullable=False),
+    sa.Column('email', sa.String(100), nullable=False, unique=True),
+    sa.Column('password', sa.String(255), nullable=False),
+    sa.Column('bb', sa.Integer(), nullable=False),
+    sa.Column('tinggi', sa.Integer(), nullable=False),
+    sa.Column('umur', sa.Integer(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+)
+sa.Table(
+    'images', PRE_ALEMBIC_METADATA,
+    sa.Column('id', sa.Integer(), primary_key=True, index=True),
+    sa.Column('filename', sa.String(255), nullable=False),
+    sa.Column('filepath', sa.String(255), nullable=False),
+    sa.Column('uploaded_at', sa.DateTime(), nullable=True),
+)
+sa.Table(
+    'recommendations', PRE_ALEMBIC_METADATA,
+    sa.Column('id', sa.Integer(), primary_key=True, index=True),
+    sa.Column('user_id', sa.Integer(), sa.ForeignKey('users.id'), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.Column('rekomendasi_json', sa.Text(), nullable=False),
+)
+
+
+def bootstrap_sqlite(connection) -> None:
+    """SQLite tanpa riwayat migrasi: buat tabel pra-Alembic yang belum ada."""
+    if MigrationContext.configure(connection).get_current_revision() is not None:
+        return
+    PRE_ALEMBIC_METADATA.create_all(connection, checkfirst=True)
+
+
 # add your model's MetaData object here
 # for 'autogenerate' support
 # from myapp import mymodel
@@ -46,6 +88,7 @@ def run_migrations_offline() -> None:
         target_metadata=target_metadata,
         literal_binds=True,
         dialect_opts={"paramstyle": "named"},
+        render_as_batch=RENDER_AS_BATCH,
     )
 
     with context.begin_transaction():
@@ -59,19 +102,21 @@ def run_migrations_online() -> None:
     and associate a connection with the context.
 
     """
-    connectable = engine_from_config(
-        config.get_section(config.config_ini_section, {}),
-        prefix="sqlalchemy.",
-        poolclass=pool.NullPool,
-    )
+    # Engine yang sama dengan app (termasuk pragma SQLite per koneksi)
+    connectable = create_db_engine(SQLALCHEMY_DATABASE_URL)
 
     with connectable.connect() as connection:
+        if RENDER_AS_BATCH:
+            bootstrap_sqlite(connection)
+            connection.commit()
         context.configure(
-            connection=connection, target_metadata=target_metadata
+            connection=connection, target_metadata=target_metadata,
+            render_as_batch=RENDER_AS_BATCH,
         )
 
         with context.begin_transaction():
             context.run_migrations()
+    connectable.dispose()
 
 
 if context.is_offline_mode():
@@ -0,0 +1,25 @@
+"""
+Index (user_id, uploaded_at) di images dan (user_id, created_at) di recommendations
+
+Tanpa index ini semua query riwayat / laporan gizi membaca seluruh tabel (lihat
+``python -m bench.bench_queries``). Di MySQL gunakan ALGORITHM=INPLACE (default untuk
+CREATE INDEX di InnoDB), tabel tetap bisa ditulis selama index dibuat.
+
+Revision ID: add_history_indexes
+Revises: add_phash_to_images
+Create Date: 2025-08-01 09:00:00.000000
+"""
+from alembic import op
+
+revision = 'add_history_indexes'
+down_revision = 'add_phash_to_images'
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    op.create_index('ix_images_user_uploaded', 'images', ['user_id', 'uploaded_at'])
+    op.create_index('ix_recommendations_user_created', 'recommendations', ['user_id', 'created_at'])
+
+def downgrade():
+    op.drop_index('ix_recommendations_user_created', table_name='recommendations')
+    op.drop_index('ix_images_user_uploaded', table_name='images')
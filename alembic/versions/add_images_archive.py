@@ -0,0 +1,31 @@
+"""
+Add images_archive table (arsip scan lama, lihat core/archive.py)
+
+Revision ID: add_images_archive
+Revises: compress_json_columns
+Create Date: 2025-07-15 09:00:00.000000
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = 'add_images_archive'
+down_revision = 'compress_json_columns'
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    op.create_table(
+        'images_archive',
+        sa.Column('id', sa.Integer(), primary_key=True, autoincrement=False),
+        sa.Column('filename', sa.String(255), nullable=False),
+        sa.Column('filepath', sa.String(255), nullable=False),
+        sa.Column('uploaded_at', sa.DateTime(), nullable=True),
+        sa.Column('user_id', sa.Integer(), sa.ForeignKey('users.id'), nullable=True),
+        sa.Column('nutrition_json', sa.LargeBinary(length=16777215), nullable=True),
+        sa.Column('archived_at', sa.DateTime(), nullable=True),
+    )
+    op.create_index('ix_images_archive_user_uploaded', 'images_archive', ['user_id', 'uploaded_at'])
+
+def downgrade():
+    op.drop_index('ix_images_archive_user_uploaded', table_name='images_archive')
+    op.drop_table('images_archive')
@@ -0,0 +1,21 @@
+"""
+Add phash (perceptual hash) to images table
+
+Revision ID: add_phash_to_images
+Revises: add_images_archive
+Create Date: 2025-07-25 09:00:00.000000
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = 'add_phash_to_images'
+down_revision = 'add_images_archive'
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    op.add_column('images', sa.Column('phash', sa.String(16), nullable=True))
+
+def downgrade():
+    with op.batch_alter_table('images') as batch:
+        batch.drop_column('phash')
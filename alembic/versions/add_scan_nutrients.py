@@ -0,0 +1,34 @@
+"""
+Tabel scan_nutrients: nilai gizi per scan sebagai kolom angka ber-index (pencarian /scan-search)
+
+Tabel baru kosong; isi dari data lama secara online dengan ``python -m scripts.index_nutrients``.
+
+Revision ID: add_scan_nutrients
+Revises: add_history_indexes
+Create Date: 2025-08-05 09:00:00.000000
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = 'add_scan_nutrients'
+down_revision = 'add_history_indexes'
+branch_labels = None
+depends_on = None
+
+NUTRIENT_COLUMNS = ('energi', 'protein', 'lemak_total', 'karbohidrat', 'serat', 'gula', 'garam')
+
+def upgrade():
+    op.create_table(
+        'scan_nutrients',
+        sa.Column('image_id', sa.Integer(), primary_key=True, autoincrement=False),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('uploaded_at', sa.DateTime(), nullable=True),
+        sa.Column('filename', sa.String(255), nullable=False),
+        *(sa.Column(name, sa.Float(), nullable=True) for name in NUTRIENT_COLUMNS),
+    )
+    op.create_index('ix_scan_nutrients_user_uploaded', 'scan_nutrients', ['user_id', 'uploaded_at'])
+    for name in NUTRIENT_COLUMNS:
+        op.create_index(f'ix_scan_nutrients_user_{name}', 'scan_nutrients', ['user_id', name])
+
+def downgrade():
+    op.drop_table('scan_nutrients')
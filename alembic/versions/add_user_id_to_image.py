@@ -11,7 +11,18 @@ branch_labels = None
 depends_on = None
 
 def upgrade():
+    if op.get_bind().dialect.name == 'sqlite':
+        # SQLite tidak bisa ALTER constraint (foreign key): mode batch (salin tabel)
+        with op.batch_alter_table('images') as batch:
+            batch.add_column(sa.Column('user_id', sa.Integer(), nullable=True))
+            batch.create_foreign_key('fk_images_user_id_users', 'users', ['user_id'], ['id'])
+        return
     op.add_column('images', sa.Column('user_id', sa.Integer(), sa.ForeignKey('users.id'), nullable=True))
 
 def downgrade():
+    if op.get_bind().dialect.name == 'sqlite':
+        with op.batch_alter_table('images') as batch:
+            batch.drop_constraint('fk_images_user_id_users', type_='foreignkey')
+            batch.drop_column('user_id')
+        return
     op.drop_column('images', 'user_id')
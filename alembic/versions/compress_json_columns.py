@@ -0,0 +1,44 @@
+"""
+Ubah nutrition_json & rekomendasi_json jadi BLOB (kompresi transparan, lihat core/compression.py)
+
+Teks lama tetap terbaca apa adanya (tanpa marker = teks UTF-8). Kompres data lama
+secara online setelah migrasi dengan ``python -m scripts.compress_blobs``.
+Catatan: di MySQL ALTER ini menyalin ulang tabel; jalankan di luar jam sibuk.
+
+Revision ID: compress_json_columns
+Revises: add_recommendation_table
+Create Date: 2025-07-10 09:00:00.000000
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = 'compress_json_columns'
+down_revision = 'add_recommendation_table'
+branch_labels = None
+depends_on = None
+
+BLOB = sa.LargeBinary(length=16777215)  # MEDIUMBLOB di MySQL
+COLUMNS = (('images', 'nutrition_json', True), ('recommendations', 'rekomendasi_json', False))
+
+
+def upgrade():
+    for table, column, nullable in COLUMNS:
+        with op.batch_alter_table(table) as batch:
+            batch.alter_column(column, existing_type=sa.Text(), type_=BLOB, existing_nullable=nullable)
+
+
+def downgrade():
+    from core.compression import decompress_text, is_compressed
+
+    bind = op.get_bind()
+    for table, column, nullable in COLUMNS:
+        # Dekompres dulu supaya kolom Text berisi JSON biasa lagi
+        rows = bind.execute(sa.text(f"SELECT id, {column} FROM {table} WHERE {column} IS NOT NULL")).fetchall()
+        for row_id, value in rows:
+            if is_compressed(value):
+                bind.execute(
+                    sa.text(f"UPDATE {table} SET {column} = :value WHERE id = :id"),
+                    {"value": decompress_text(value), "id": row_id},
+                )
+        with op.batch_alter_table(table) as batch:
+            batch.alter_column(column, existing_type=BLOB, type_=sa.Text(), existing_nullable=nullable)
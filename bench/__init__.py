@@ -0,0 +1,2 @@
+# bench/__init__.py
+# Benchmark & load test. Jalankan dari root repo, misal: python -m bench.loadtest
@@ -0,0 +1,149 @@
+# bench/bench_admission.py
+"""
+Benchmark rate limit + admission control: satu client nakal membanjiri POST /recommendation
+dengan banyak koneksi sementara user normal mengirim 1 request/detik. Upstream (stub ML)
+hanya mampu memproses ``--stub-capacity`` request bersamaan.
+
+Dijalankan per mode (off: tanpa proteksi, shed: admission control saja, on: rate limit +
+admission control) lalu dibandingkan latency user normal.
+
+    python -m bench.bench_admission --duration 20 --flood 64 --users 10
+"""
+import argparse
+import asyncio
+import json
+import random
+import tempfile
+import os
+import time
+
+import aiohttp
+
+from bench.common import BENCH_PASSWORD, free_port, percentile, save_results, seed_users, start_app
+from bench.stub_ml import StubConfig, start_stub
+
+MODES = {
+    "off": {"RATE_LIMIT_ENABLED": "0", "UPSTREAM_MAX_INFLIGHT": "0"},
+    "shed": {"RATE_LIMIT_ENABLED": "0"},  # admission control saja
+    "on": {"RATE_LIMIT_ENABLED": "1"},
+}
+
+
+def random_payload() -> dict:
+    # Payload selalu berbeda supaya tidak terjawab dari cache ML
+    return {
+        "konsumsi": {"energi": random.randint(500, 3000), "gula": random.randint(0, 100)},
+        "target_harian": {"energi": 2100, "gula": 50},
+    }
+
+
+async def login(session, base_url, email) -> str:
+    async with session.post(f"{base_url}/login", json={"email": email, "password": BENCH_PASSWORD}) as resp:
+        return (await resp.json())["token"]
+
+
+async def flooder(session, base_url, token, stop_at, counts):
+    headers = {"Authorization": f"Bearer {token}"}
+    while time.time() < stop_at:
+        try:
+            async with session.post(f"{base_url}/recommendation", json=random_payload(), headers=headers) as resp:
+                await resp.read()
+                counts[resp.status] = counts.get(resp.status, 0) + 1
+        except Exception:
+            counts[0] = counts.get(0, 0) + 1
+
+
+async def good_user(session, base_url, token, stop_at, record_from, samples):
+    headers = {"Authorization": f"Bearer {token}"}
+    while time.time() < stop_at:
+        t0 = time.perf_counter()
+        try:
+            async with session.post(f"{base_url}/recommendation", json=random_payload(), headers=headers) as resp:
+                await resp.read()
+                status = resp.status
+        except Exception:
+            status = 0
+        if time.time() >= record_from:
+            samples.append((status, (time.perf_counter() - t0) * 1000))
+        await asyncio.sleep(1)
+
+
+async def run_mode(mode: str, args) -> dict:
+    workdir = tempfile.mkdtemp(prefix=f"packfact-admission-{mode}-")
+    database_url = f"sqlite:///{os.path.join(workdir, 'bench.db')}"
+    stub_cfg = StubConfig(args.stub_latency_ms, 0, capacity=args.stub_capacity)
+    stub_port = free_port()
+    stub = await start_stub(stub_cfg, port=stub_port)
+    emails = seed_users(database_url, args.users + 1)
+    env = {
+        "CACHE_BACKEND": "none",
+        "RATE_LIMITS": args.rate_limits,
+        "UPSTREAM_MAX_INFLIGHT": str(args.max_inflight),
+        "UPSTREAM_MAX_QUEUE": str(args.max_queue),
+        **MODES[mode],
+    }
+    port = free_port()
+    proc = await asyncio.to_thread(start_app, database_url, f"http://127.0.0.1:{stub_port}", port,
+                                   os.path.join(workdir, "images"), 1, env)
+    base_url = f"http://127.0.0.1:{port}"
+    try:
+        connector = aiohttp.TCPConnector(limit=args.flood + args.users + 10)
+        async with aiohttp.ClientSession(connector=connector, timeout=aiohttp.ClientTimeout(total=120)) as session:
+            tokens = [await login(session, base_url, email) for email in emails]
+            # Detik pertama (burst awal client nakal masih dalam budget) tidak dihitung
+            record_from = time.time() + args.warmup
+            stop_at = record_from + args.duration
+            samples, flood_counts = [], {}
+            tasks = [asyncio.create_task(flooder(session, base_url, tokens[0], stop_at, flood_counts)) for _ in range(args.flood)]
+            tasks += [asyncio.create_task(good_user(session, base_url, t, stop_at, record_from, samples)) for t in tokens[1:]]
+            await asyncio.gather(*tasks)
+    finally:
+        proc.terminate()
+        proc.wait()
+        await stub.cleanup()
+    lat = sorted(l for _, l in samples)
+    statuses = {}
+    for status, _ in samples:
+        statuses[status] = statuses.get(status, 0) + 1
+    return {
+        "good_users": {
+            "requests": len(samples),
+            "ok": statuses.get(200, 0),
+            "statuses": statuses,
+            "p50_ms": round(percentile(lat, 50), 1),
+            "p95_ms": round(percentile(lat, 95), 1),
+            "p99_ms": round(percentile(lat, 99), 1),
+        },
+        "flooder": flood_counts,
+        "upstream": {"calls": sum(stub_cfg.calls.values()), "max_queue": stub_cfg.max_queue},
+    }
+
+
+async def main_async(args):
+    results = {}
+    for mode in args.modes.split(","):
+        print(f"== proteksi {mode} ==")
+        results[mode] = await run_mode(mode, args)
+        print(json.dumps(results[mode], indent=2))
+    path = save_results("admission", {"config": vars(args), "results": results}, args.output)
+    print(f"Hasil disimpan di {path}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark rate limit & admission control")
+    parser.add_argument("--duration", type=float, default=20)
+    parser.add_argument("--warmup", type=float, default=3)
+    parser.add_argument("--flood", type=int, default=64, help="Koneksi paralel client nakal")
+    parser.add_argument("--users", type=int, default=10, help="User normal (1 req/detik)")
+    parser.add_argument("--stub-latency-ms", type=float, default=200)
+    parser.add_argument("--stub-capacity", type=int, default=8)
+    parser.add_argument("--max-inflight", type=int, default=8)
+    parser.add_argument("--max-queue", type=int, default=16)
+    parser.add_argument("--rate-limits", default="recommendation=30/60")
+    parser.add_argument("--modes", default="off,shed,on")
+    parser.add_argument("--output")
+    asyncio.run(main_async(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,156 @@
+# bench/bench_cache.py
+"""
+Cek & benchmark backend cache (core/cache.py): memory, sqlite, redis (stand-in RESP lokal).
+
+1. Sanity: TTL, add (NX), eviction sesuai max_entries, clear per namespace.
+2. Latency get/set per operasi.
+3. Hit rate dengan N proses worker yang membaca keyspace yang sama (meniru uvicorn --workers):
+   cache in-process terisi ulang di tiap worker, cache bersama cukup diisi sekali.
+
+    python -m bench.bench_cache --workers 4 --keys 500 --lookups 4000
+"""
+import argparse
+import asyncio
+import multiprocessing
+import os
+import random
+import shutil
+import statistics
+import tempfile
+import threading
+import time
+
+from bench.common import free_port, save_results
+from bench.resp_server import RespStore, start_resp_server
+from core.cache import Cache, MemoryCache, RedisCache, SQLiteCache
+
+
+def start_resp_thread(max_keys: int) -> int:
+    """Jalankan stand-in RESP di thread daemon, return port."""
+    port = free_port()
+    ready = threading.Event()
+
+    def run():
+        loop = asyncio.new_event_loop()
+        loop.run_until_complete(start_resp_server(RespStore(max_keys), "127.0.0.1", port))
+        ready.set()
+        loop.run_forever()
+
+    threading.Thread(target=run, daemon=True).start()
+    ready.wait(5)
+    return port
+
+
+def make_backend(kind: str, workdir: str, max_entries: int, redis_port: int):
+    if kind == "memory":
+        return MemoryCache(max_entries)
+    if kind == "sqlite":
+        return SQLiteCache(os.path.join(workdir, "cache.sqlite3"), max_entries)
+    return RedisCache(f"redis://127.0.0.1:{redis_port}/0", max_entries)
+
+
+def sanity(kind: str, backend) -> dict:
+    cache = Cache(backend, f"sanity-{kind}", ttl=0.2)
+    other = Cache(backend, f"other-{kind}", ttl=None)
+    cache.set("a", {"x": 1})
+    other.set("a", [1, 2])
+    assert cache.get("a") == {"x": 1} and other.get("a") == [1, 2], "namespace bercampur"
+    assert cache.add("a", 2) is False, "add harus gagal jika key masih ada"
+    time.sleep(0.3)
+    assert cache.get("a") is None, "TTL tidak berjalan"
+    assert cache.add("a", 3) is True and cache.get("a") == 3, "add setelah kedaluwarsa harus berhasil"
+    cache.clear()
+    assert cache.get("a") is None and other.get("a") == [1, 2], "clear namespace salah"
+    other.clear()
+    limit = backend.max_entries
+    for i in range(limit + 50):
+        other.set(i, i)
+    entries = backend.info()["entries"]
+    assert entries <= limit, f"eviction tidak jalan: {entries} > {limit}"
+    assert other.get(limit + 49) == limit + 49 and other.get(0) is None, "urutan eviction bukan LRU"
+    other.clear()
+    return {"ok": True, "entries_after_fill": entries}
+
+
+def latency(backend, n: int) -> dict:
+    cache = Cache(backend, "latency", ttl=60)
+    value = {"energi": 210, "protein": 4, "lemak total": 9, "karbohidrat": 28, "gula": 12, "garam": 160}
+    result = {}
+    for op, fn in (("set", lambda i: cache.set(i, value)), ("get", lambda i: cache.get(i))):
+        times = []
+        for i in range(n):
+            t0 = time.perf_counter()
+            fn(i % 500)
+            times.append((time.perf_counter() - t0) * 1e6)
+        times.sort()
+        result[op] = {"median_us": round(statistics.median(times), 1), "p99_us": round(times[int(len(times) * 0.99)], 1)}
+    cache.clear()
+    return result
+
+
+def _worker(kind, workdir, max_entries, redis_port, keys, lookups, seed, out):
+    backend = make_backend(kind, workdir, max_entries, redis_port)
+    cache = Cache(backend, "shared", ttl=300)
+    rng = random.Random(seed)
+    for _ in range(lookups):
+        key = rng.randrange(keys)
+        if cache.get(key) is None:
+            cache.set(key, {"hasil": key})  # "panggil upstream" lalu simpan
+    out.put((cache.hits, cache.misses))
+
+
+def shared_hit_rate(kind, workdir, max_entries, redis_port, workers, keys, lookups) -> dict:
+    out = multiprocessing.Queue()
+    procs = [
+        multiprocessing.Process(target=_worker, args=(kind, workdir, max_entries, redis_port, keys, lookups, seed, out))
+        for seed in range(workers)
+    ]
+    for p in procs:
+        p.start()
+    results = [out.get() for _ in procs]
+    for p in procs:
+        p.join()
+    hits, misses = sum(r[0] for r in results), sum(r[1] for r in results)
+    return {"hits": hits, "misses": misses, "hit_rate": round(hits / (hits + misses), 4), "upstream_calls": misses}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark backend cache")
+    parser.add_argument("--backends", default="memory,sqlite,redis")
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--keys", type=int, default=500)
+    parser.add_argument("--lookups", type=int, default=4000)
+    parser.add_argument("--max-entries", type=int, default=200)
+    parser.add_argument("--ops", type=int, default=5000)
+    parser.add_argument("--output")
+    args = parser.parse_args()
+
+    redis_port = start_resp_thread(max_keys=args.max_entries)
+    results = {}
+    for kind in args.backends.split(","):
+        workdir = tempfile.mkdtemp(prefix=f"packfact-cache-{kind}-")
+        try:
+            small = make_backend(kind, workdir, args.max_entries, redis_port)
+            results[kind] = {"sanity": sanity(kind, small)}
+            small.close()
+            big = make_backend(kind, workdir, max(args.keys * 2, 1000), redis_port)
+            results[kind]["latency"] = latency(big, args.ops)
+            big.close()
+            # Stand-in terpisah untuk uji hit rate supaya batas key-nya sama dengan backend lain
+            shared_port = start_resp_thread(args.keys * 2) if kind == "redis" else None
+            results[kind]["shared"] = shared_hit_rate(
+                kind, workdir, args.keys * 2, shared_port, args.workers, args.keys, args.lookups
+            )
+        finally:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    print(f"{'backend':8} {'sanity':>7} {'get p50':>9} {'set p50':>9} {'hit rate':>9} {'upstream':>9}  ({args.workers} worker)")
+    for kind, r in results.items():
+        print(f"{kind:8} {'ok' if r['sanity']['ok'] else 'FAIL':>7} {r['latency']['get']['median_us']:>7}us "
+              f"{r['latency']['set']['median_us']:>7}us {r['shared']['hit_rate']:>9} {r['shared']['upstream_calls']:>9}")
+    path = save_results("cache", {"config": vars(args), "results": results}, args.output)
+    print(f"Hasil disimpan di {path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,136 @@
+# bench/bench_db_pool.py
+"""
+Load test pool koneksi DB saat OCR lambat: banyak upload bersamaan dengan latency OCR
+(stub) yang dinaikkan bertahap, sambil memantau koneksi pool yang sedang dipakai
+(``db_pool.checked_out`` dari /readyz?verbose=true, termasuk 1 koneksi untuk ping readyz).
+
+Pool sengaja kecil (DB_POOL_SIZE=5, tanpa overflow): jika koneksi dipegang selama
+menunggu OCR, pool habis dan upload gagal/timeout; jika tidak, pemakaian pool tetap
+datar berapa pun latency OCR.
+
+    python -m bench.bench_db_pool --ocr-latencies 200,1000,3000 --concurrency 40 --duration 15
+"""
+import argparse
+import asyncio
+import json
+import os
+import secrets
+import tempfile
+import time
+
+import aiohttp
+
+from bench.common import BENCH_PASSWORD, free_port, percentile, save_results, seed_users, start_app
+from bench.stub_ml import StubConfig, start_stub
+from core.profiling import sign_profile_token
+
+
+async def uploader(session, base_url, token, stop_at, samples):
+    headers = {"Authorization": f"Bearer {token}"}
+    while time.time() < stop_at:
+        form = aiohttp.FormData()
+        # Isi file selalu berbeda supaya tidak terjawab dari cache OCR
+        form.add_field("file", os.urandom(2048), filename="label.jpg", content_type="image/jpeg")
+        t0 = time.perf_counter()
+        try:
+            async with session.post(f"{base_url}/upload/", data=form, headers=headers) as resp:
+                await resp.read()
+                status = resp.status
+        except Exception:
+            status = 0
+        samples.append((status, (time.perf_counter() - t0) * 1000))
+
+
+async def pool_sampler(session, base_url, stop_at, pool_samples, debug_secret):
+    while time.time() < stop_at:
+        try:
+            async with session.get(f"{base_url}/readyz?verbose=true", timeout=aiohttp.ClientTimeout(total=2),
+                                   headers={"X-Debug-Token": sign_profile_token(debug_secret)}) as resp:
+                body = await resp.json()
+                pool_samples.append(body.get("db_pool", {}).get("checked_out"))
+        except Exception:
+            pool_samples.append(None)  # app tidak merespons (event loop terblokir / pool habis)
+        await asyncio.sleep(0.05)
+
+
+async def run_latency(latency_ms: float, args) -> dict:
+    workdir = tempfile.mkdtemp(prefix=f"packfact-dbpool-{int(latency_ms)}-")
+    database_url = f"sqlite:///{os.path.join(workdir, 'bench.db')}"
+    stub_port = free_port()
+    stub = await start_stub(StubConfig(latency_ms, 0), port=stub_port)
+    emails = seed_users(database_url, args.users)
+    debug_secret = secrets.token_hex(16)  # untuk /readyz?verbose=true
+    env = {
+        "PROFILE_SECRET": debug_secret,
+        "DB_POOL_SIZE": str(args.pool_size),
+        "DB_MAX_OVERFLOW": "0",
+        "DB_POOL_TIMEOUT_S": str(args.pool_timeout),
+        "DB_POOL_WARM": "1",
+        "CACHE_BACKEND": "none",
+        "PHASH_ENABLED": "0",
+        "UPSTREAM_MAX_INFLIGHT": "0",
+        "UPSTREAM_TIMEOUT_S": str(latency_ms / 1000 + 30),
+    }
+    port = free_port()
+    proc = await asyncio.to_thread(start_app, database_url, f"http://127.0.0.1:{stub_port}", port,
+                                   os.path.join(workdir, "images"), 1, env)
+    base_url = f"http://127.0.0.1:{port}"
+    samples, pool_samples = [], []
+    try:
+        connector = aiohttp.TCPConnector(limit=args.concurrency + 10)
+        async with aiohttp.ClientSession(connector=connector, timeout=aiohttp.ClientTimeout(total=args.duration + 60)) as session:
+            tokens = []
+            for email in emails:
+                async with session.post(f"{base_url}/login", json={"email": email, "password": BENCH_PASSWORD}) as resp:
+                    tokens.append((await resp.json())["token"])
+            stop_at = time.time() + args.duration
+            tasks = [asyncio.create_task(uploader(session, base_url, tokens[i % len(tokens)], stop_at, samples))
+                     for i in range(args.concurrency)]
+            tasks.append(asyncio.create_task(pool_sampler(session, base_url, stop_at, pool_samples, debug_secret)))
+            await asyncio.gather(*tasks)
+    finally:
+        proc.terminate()
+        proc.wait()
+        await stub.cleanup()
+    lat = sorted(l for _, l in samples)
+    statuses = {}
+    for status, _ in samples:
+        statuses[status] = statuses.get(status, 0) + 1
+    used = [p for p in pool_samples if p is not None]
+    return {
+        "uploads": len(samples),
+        "ok": statuses.get(200, 0),
+        "statuses": statuses,
+        "rps": round(statuses.get(200, 0) / args.duration, 1),
+        "p50_ms": round(percentile(lat, 50), 1),
+        "p99_ms": round(percentile(lat, 99), 1),
+        "pool_checked_out_max": max(used) if used else None,
+        "pool_checked_out_mean": round(sum(used) / len(used), 2) if used else None,
+        "readyz_unresponsive": len(pool_samples) - len(used),
+    }
+
+
+async def main_async(args):
+    results = {}
+    for latency in (float(l) for l in args.ocr_latencies.split(",")):
+        print(f"== OCR {latency:.0f} ms, {args.concurrency} upload bersamaan, pool {args.pool_size} ==")
+        results[str(int(latency))] = await run_latency(latency, args)
+        print(json.dumps(results[str(int(latency))], indent=2))
+    path = save_results("db_pool", {"config": vars(args), "results": results}, args.output)
+    print(f"Hasil disimpan di {path}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test pool DB vs latency OCR")
+    parser.add_argument("--ocr-latencies", default="200,1000,3000", help="Latency stub OCR (ms), pisahkan koma")
+    parser.add_argument("--concurrency", type=int, default=40)
+    parser.add_argument("--users", type=int, default=10)
+    parser.add_argument("--duration", type=float, default=15)
+    parser.add_argument("--pool-size", type=int, default=5)
+    parser.add_argument("--pool-timeout", type=float, default=5)
+    parser.add_argument("--output")
+    asyncio.run(main_async(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+# bench/bench_export.py
+"""
+Benchmark memori export riwayat: GET /export (stream CSV/NDJSON per batch) vs memuat
+semua riwayat sekaligus seperti /scan-history-all. Peak memori diukur dengan tracemalloc.
+
+    python -m bench.bench_export --scans 20000,100000
+"""
+import argparse
+import json
+import os
+import random
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+
+WORKDIR = tempfile.mkdtemp(prefix="packfact-bench-export-")
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{os.path.join(WORKDIR, 'export.db')}")
+os.environ.setdefault("UPLOAD_DIR", os.path.join(WORKDIR, "images"))
+
+import jwt  # noqa: E402
+from fastapi.testclient import TestClient  # noqa: E402
+
+from bench.common import save_results  # noqa: E402
+from database import SessionLocal, engine  # noqa: E402
+from models import Base, Image, Recommendation, User  # noqa: E402
+from routes.export import iter_records, stream_csv, stream_ndjson  # noqa: E402
+from routes.nutrition import scan_history_response  # noqa: E402
+
+
+def seed_user(scans: int, index: int) -> int:
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    try:
+        user = User(nama="Bench", email=f"export{index}@example.com", password="x", bb=60, tinggi=165, umur=30,
+                    gender="Perempuan", umur_satuan="tahun", is_verified=True)
+        db.add(user)
+        db.commit()
+        start = datetime(2024, 1, 1)
+        for offset in range(0, scans, 5000):
+            db.execute(Image.__table__.insert(), [
+                {
+                    "filename": f"{i:08d}.jpg", "filepath": f"/tmp/{i:08d}.jpg", "user_id": user.id,
+                    "uploaded_at": start + timedelta(minutes=i * 7),
+                    "nutrition_json": json.dumps({
+                        "energi": random.randint(50, 600), "protein": random.randint(0, 30),
+                        "total lemak": random.randint(0, 40), "karbohidrat": random.randint(0, 90),
+                        "serat": random.randint(0, 10), "gula": random.randint(0, 40), "garam": random.randint(0, 900),
+                    }),
+                }
+                for i in range(offset, min(scans, offset + 5000))
+            ])
+        db.add(Recommendation(user_id=user.id, rekomendasi_json=json.dumps({"rekomendasi": [{"nutrisi": "gula", "saran": "Kurangi konsumsi gula"}]})))
+        db.commit()
+        return user.id
+    finally:
+        db.close()
+
+
+def measure(fn) -> dict:
+    tracemalloc.start()
+    t0 = time.perf_counter()
+    size = fn()
+    elapsed = (time.perf_counter() - t0) * 1000
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {"bytes": size, "ms": round(elapsed, 1), "peak_mb": round(peak / 1024 / 1024, 2)}
+
+
+def load_all(user_id: int) -> int:
+    db = SessionLocal()
+    try:
+        rows = db.query(Image.filename, Image.uploaded_at, Image.nutrition_json).filter(
+            Image.user_id == user_id
+        ).order_by(Image.uploaded_at.desc()).all()
+        return len(scan_history_response(rows).body)
+    finally:
+        db.close()
+
+
+def export(user_id: int, stream) -> int:
+    return sum(len(chunk) for chunk in stream(iter_records(user_id, {"scans", "recommendations"})))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark memori export riwayat")
+    parser.add_argument("--scans", default="20000,100000", help="Ukuran riwayat, pisahkan koma")
+    parser.add_argument("--output")
+    args = parser.parse_args()
+
+    from main import app
+    client = TestClient(app)
+    results = {}
+    for index, scans in enumerate(int(s) for s in args.scans.split(",")):
+        user_id = seed_user(scans, index)
+        token = jwt.encode({"user_id": user_id, "exp": int(time.time()) + 3600}, os.environ.get("SECRET_KEY", "secretkey123"), algorithm="HS256")
+        resp = client.get("/export?format=csv", headers={"Authorization": f"Bearer {token}"})
+        assert resp.status_code == 200 and resp.text.count("\n") == scans + 2, resp.text[:200]
+        results[scans] = {
+            "scan_history_all": measure(lambda: load_all(user_id)),
+            "export_csv": measure(lambda: export(user_id, stream_csv)),
+            "export_ndjson": measure(lambda: export(user_id, stream_ndjson)),
+        }
+        print(f"{scans} scan:")
+        for name, r in results[scans].items():
+            print(f"  {name:17}: peak {r['peak_mb']:7.2f} MB, {r['ms']:8.1f} ms, {r['bytes']} byte")
+    path = save_results("export", {"config": vars(args), "results": results}, args.output)
+    print(f"Hasil disimpan di {path}")
+
+
+if __name__ == "__main__":
+    main()
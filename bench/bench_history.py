@@ -0,0 +1,126 @@
+# bench/bench_history.py
+"""
+Benchmark serialisasi riwayat scan (5k baris): jalur lama (ScanHistoryItem per baris +
+validasi response_model + json.dumps) vs jalur baru (query kolom + orjson + Fragment).
+
+    python -m bench.bench_history --rows 5000 --repeat 20
+"""
+import argparse
+import json
+import os
+import random
+import statistics
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+WORKDIR = tempfile.mkdtemp(prefix="packfact-bench-history-")
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{os.path.join(WORKDIR, 'history.db')}")
+os.environ.setdefault("UPLOAD_DIR", os.path.join(WORKDIR, "images"))
+
+import jwt  # noqa: E402
+from fastapi.testclient import TestClient  # noqa: E402
+
+from bench.common import save_results  # noqa: E402
+from database import SessionLocal, engine  # noqa: E402
+from models import Base, Image, User  # noqa: E402
+
+
+def seed(rows: int) -> int:
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    try:
+        user = User(nama="Bench", email="history@example.com", password="x", bb=60, tinggi=165, umur=30,
+                    gender="Perempuan", umur_satuan="tahun", is_verified=True)
+        db.add(user)
+        db.commit()
+        now = datetime(2025, 6, 1, 12, 0, 0)
+        db.execute(Image.__table__.insert(), [
+            {
+                "filename": f"{i:08d}.jpg", "filepath": f"/tmp/{i:08d}.jpg", "user_id": user.id,
+                "uploaded_at": now - timedelta(minutes=i * 7, microseconds=random.randint(0, 999999)),
+                "nutrition_json": json.dumps({
+                    "energi": random.randint(50, 600), "protein": random.randint(0, 30),
+                    "lemak total": random.randint(0, 40), "karbohidrat": random.randint(0, 90),
+                    "serat": random.randint(0, 10), "gula": random.randint(0, 40), "garam": random.randint(0, 900),
+                }, ensure_ascii=False),
+            }
+            for i in range(rows)
+        ])
+        db.commit()
+        return user.id
+    finally:
+        db.close()
+
+
+def legacy_body(db, user_id: int) -> bytes:
+    """Replika jalur lama get_scan_history_all + serialize_response FastAPI."""
+    from routes.nutrition import ScanHistoryAllResponse, ScanHistoryItem
+    images = db.query(Image).filter(Image.user_id == user_id).order_by(Image.uploaded_at.desc()).all()
+    history = []
+    for img in images:
+        try:
+            kandungan_gizi = json.loads(img.nutrition_json) if img.nutrition_json else {}
+        except Exception:
+            kandungan_gizi = {}
+        history.append(ScanHistoryItem(filename=img.filename, uploaded_at=img.uploaded_at, kandungan_gizi=kandungan_gizi))
+    content = {"history": [item.model_dump() for item in history]}
+    model = ScanHistoryAllResponse.model_validate(content)
+    return json.dumps(model.model_dump(mode="json"), ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def fast_body(db, user_id: int) -> bytes:
+    from routes.nutrition import scan_history_response
+    rows = db.query(Image.filename, Image.uploaded_at, Image.nutrition_json).filter(
+        Image.user_id == user_id
+    ).order_by(Image.uploaded_at.desc()).all()
+    return scan_history_response(rows).body
+
+
+def timeit(fn, repeat: int) -> dict:
+    times = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        times.append((time.perf_counter() - t0) * 1000)
+    times.sort()
+    return {"median_ms": round(statistics.median(times), 2), "min_ms": round(times[0], 2), "max_ms": round(times[-1], 2)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark serialisasi /scan-history-all")
+    parser.add_argument("--rows", type=int, default=5000)
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--output")
+    args = parser.parse_args()
+
+    user_id = seed(args.rows)
+    db = SessionLocal()
+    try:
+        # Output kedua jalur harus identik secara isi
+        assert json.loads(legacy_body(db, user_id)) == json.loads(fast_body(db, user_id)), "Output jalur lama & baru berbeda"
+        legacy = timeit(lambda: (legacy_body(db, user_id), db.expunge_all()), args.repeat)
+        fast = timeit(lambda: fast_body(db, user_id), args.repeat)
+    finally:
+        db.close()
+
+    from main import app
+    token = jwt.encode({"user_id": user_id, "exp": int(time.time()) + 3600}, os.environ.get("SECRET_KEY", "secretkey123"), algorithm="HS256")
+    client = TestClient(app)
+    headers = {"Authorization": f"Bearer {token}"}
+    assert len(client.get("/scan-history-all", headers=headers).json()["history"]) == args.rows
+    http = timeit(lambda: client.get("/scan-history-all", headers=headers), args.repeat)
+
+    print(f"{args.rows} baris, {args.repeat}x:")
+    print(f"  jalur lama (query + serialize) : {legacy['median_ms']} ms (median)")
+    print(f"  jalur baru (query + serialize) : {fast['median_ms']} ms (median), {legacy['median_ms'] / fast['median_ms']:.1f}x lebih cepat")
+    print(f"  GET /scan-history-all (HTTP)   : {http['median_ms']} ms (median)")
+    path = save_results("history", {
+        "config": {"rows": args.rows, "repeat": args.repeat},
+        "legacy": legacy, "fast": fast, "http": http,
+    }, args.output)
+    print(f"Hasil disimpan di {path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,172 @@
+# bench/bench_nutrition_report.py
+"""
+Benchmark laporan gizi multi-scan (10k scan): loop Python per scan (gaya
+utils.compare_nutrition: dict + float() per nilai) vs engine NumPy (nutrition_engine).
+
+    python -m bench.bench_nutrition_report --scans 10000 --days 90 --repeat 20
+"""
+import argparse
+import json
+import os
+import random
+import statistics
+import tempfile
+import time
+from datetime import date, datetime, timedelta
+
+WORKDIR = tempfile.mkdtemp(prefix="packfact-bench-report-")
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{os.path.join(WORKDIR, 'report.db')}")
+os.environ.setdefault("UPLOAD_DIR", os.path.join(WORKDIR, "images"))
+
+import jwt  # noqa: E402
+from fastapi.testclient import TestClient  # noqa: E402
+
+from bench.common import save_results  # noqa: E402
+from core.compression import decompress_text  # noqa: E402
+from database import SessionLocal, engine  # noqa: E402
+from models import Base, Image, User  # noqa: E402
+from nutrition_engine import NUTRIENTS, build_report, day_bounds  # noqa: E402
+
+KEBUTUHAN = {"energi": 2150, "protein": 60, "lemak total": 67, "karbohidrat": 325, "serat": 30, "gula": 50, "garam": 2000}
+
+
+def seed(scans: int, days: int, end: date) -> int:
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    try:
+        user = User(nama="Bench", email="report@example.com", password="x", bb=60, tinggi=165, umur=30,
+                    gender="Perempuan", umur_satuan="tahun", is_verified=True)
+        db.add(user)
+        db.commit()
+        start = datetime.combine(end - timedelta(days=days - 1), datetime.min.time())
+        db.execute(Image.__table__.insert(), [
+            {
+                "filename": f"{i:08d}.jpg", "filepath": f"/tmp/{i:08d}.jpg", "user_id": user.id,
+                "uploaded_at": start + timedelta(seconds=random.randint(0, days * 86400 - 1)),
+                "nutrition_json": json.dumps({
+                    "energi": random.randint(50, 600), "protein": random.randint(0, 30),
+                    "lemak total": random.randint(0, 40), "karbohidrat": random.randint(0, 90),
+                    "serat": random.randint(0, 10), "gula": random.randint(0, 40), "garam": random.randint(0, 900),
+                }, ensure_ascii=False),
+            }
+            for i in range(scans)
+        ])
+        db.commit()
+        return user.id
+    finally:
+        db.close()
+
+
+def legacy_report(rows, kebutuhan_gizi: dict, date_from: date, date_to: date) -> dict:
+    """Implementasi referensi dengan loop Python per scan (hasil harus sama dengan engine)."""
+    per_day = {}
+    counts = {}
+    for uploaded_at, nutrition_json in rows:
+        try:
+            gizi = json.loads(decompress_text(nutrition_json)) if nutrition_json else {}
+        except Exception:
+            gizi = {}
+        day = uploaded_at.date()
+        totals = per_day.setdefault(day, {k: 0.0 for k in NUTRIENTS})
+        counts[day] = counts.get(day, 0) + 1
+        for key in NUTRIENTS:
+            val = gizi.get(key, gizi.get("total lemak" if key == "lemak total" else None, 0))
+            try:
+                totals[key] += float(val)
+            except Exception:
+                pass
+    kebutuhan = {k: float(kebutuhan_gizi.get(k, 0)) for k in NUTRIENTS}
+    cumulative = {k: 0.0 for k in NUTRIENTS}
+    hari = []
+    for day in sorted(per_day):
+        totals = per_day[day]
+        for k in NUTRIENTS:
+            cumulative[k] += totals[k]
+        hari.append({
+            "tanggal": day.isoformat(),
+            "jumlah_scan": counts[day],
+            "asupan": {k: round(totals[k], 2) for k in NUTRIENTS},
+            "kumulatif": {k: round(cumulative[k], 2) for k in NUTRIENTS},
+            "persen_kebutuhan": {k: round(totals[k] / kebutuhan[k] * 100, 2) if kebutuhan[k] > 0 else None for k in NUTRIENTS},
+            "melebihi": [k for k in NUTRIENTS if kebutuhan[k] > 0 and totals[k] > kebutuhan[k]],
+        })
+    period_days = (date_to - date_from).days + 1
+    total = {k: sum(per_day[d][k] for d in per_day) for k in NUTRIENTS}
+    return {
+        "from": date_from.isoformat(),
+        "to": date_to.isoformat(),
+        "kebutuhan_harian": {k: round(kebutuhan[k], 2) for k in NUTRIENTS},
+        "ringkasan": {
+            "jumlah_hari": period_days,
+            "hari_dengan_scan": len(hari),
+            "jumlah_scan": sum(counts.values()),
+            "total_asupan": {k: round(total[k], 2) for k in NUTRIENTS},
+            "rata_rata_harian": {k: round(total[k] / period_days, 2) for k in NUTRIENTS},
+            "persen_kebutuhan_periode": {
+                k: round(total[k] / (kebutuhan[k] * period_days) * 100, 2) if kebutuhan[k] > 0 else None for k in NUTRIENTS
+            },
+            "hari_melebihi": sum(1 for h in hari if h["melebihi"]),
+            "hari_melebihi_per_nutrisi": {k: sum(1 for h in hari if k in h["melebihi"]) for k in NUTRIENTS},
+        },
+        "hari": hari,
+    }
+
+
+def timeit(fn, repeat: int) -> dict:
+    times = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        times.append((time.perf_counter() - t0) * 1000)
+    times.sort()
+    return {"median_ms": round(statistics.median(times), 2), "min_ms": round(times[0], 2), "max_ms": round(times[-1], 2)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark /nutrition-report")
+    parser.add_argument("--scans", type=int, default=10000)
+    parser.add_argument("--days", type=int, default=90)
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--output")
+    args = parser.parse_args()
+
+    date_to = date(2025, 6, 30)
+    date_from = date_to - timedelta(days=args.days - 1)
+    user_id = seed(args.scans, args.days, date_to)
+    start, end = day_bounds(date_from, date_to)
+    db = SessionLocal()
+    try:
+        rows = db.query(Image.uploaded_at, Image.nutrition_json).filter(
+            Image.user_id == user_id, Image.uploaded_at >= start, Image.uploaded_at <= end
+        ).order_by(Image.uploaded_at).all()
+    finally:
+        db.close()
+
+    legacy_out = legacy_report(rows, KEBUTUHAN, date_from, date_to)
+    engine_out = build_report(rows, KEBUTUHAN, date_from, date_to)
+    assert legacy_out == engine_out, "Hasil loop Python & engine NumPy berbeda"
+    legacy = timeit(lambda: legacy_report(rows, KEBUTUHAN, date_from, date_to), args.repeat)
+    vectorized = timeit(lambda: build_report(rows, KEBUTUHAN, date_from, date_to), args.repeat)
+
+    from main import app
+    token = jwt.encode({"user_id": user_id, "exp": int(time.time()) + 3600}, os.environ.get("SECRET_KEY", "secretkey123"), algorithm="HS256")
+    client = TestClient(app)
+    headers = {"Authorization": f"Bearer {token}"}
+    url = f"/nutrition-report?from={date_from.isoformat()}&to={date_to.isoformat()}"
+    body = client.get(url, headers=headers).json()
+    assert body["ringkasan"]["jumlah_scan"] == args.scans, body.get("detail")
+    http = timeit(lambda: client.get(url, headers=headers), args.repeat)
+
+    print(f"{args.scans} scan / {args.days} hari, {args.repeat}x:")
+    print(f"  loop Python   : {legacy['median_ms']} ms (median)")
+    print(f"  engine NumPy  : {vectorized['median_ms']} ms (median), {legacy['median_ms'] / vectorized['median_ms']:.1f}x lebih cepat")
+    print(f"  GET /nutrition-report (HTTP, termasuk query DB): {http['median_ms']} ms (median)")
+    path = save_results("nutrition_report", {
+        "config": {"scans": args.scans, "days": args.days, "repeat": args.repeat},
+        "legacy": legacy, "engine": vectorized, "http": http,
+    }, args.output)
+    print(f"Hasil disimpan di {path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,226 @@
+# bench/bench_queries.py
+"""
+Suite performa query riwayat / laporan gizi (statement dari ``crud.py``, sama dengan route)
+di beberapa ukuran data sintetis (``bench.gen_scale_data``).
+
+Per ukuran data dan per user contoh (terberat, median, ringan): waktu eksekusi + fetch
+(p50/p95) dan EXPLAIN (plan dinormalisasi). Exit code 1 jika:
+- plan memakai full scan tabel images / images_archive / recommendations / scan_nutrients
+  (mulai FULL_SCAN_MIN_ROWS baris), atau
+- dibanding ``--baseline`` (file hasil run sebelumnya): plan berubah, atau p50 lebih
+  lambat dari baseline * (1 + --tolerance) dan selisihnya > --min-ms.
+
+    python -m bench.bench_queries --sizes 10000,100000,1000000
+    python -m bench.bench_queries --baseline bench/results/queries-20250801-120000.json
+    python -m bench.bench_queries --database-url mysql+pymysql://user:pw@localhost/scale --sizes 10000000
+
+DB SQLite hasil generate disimpan di ``--data-dir`` dan dipakai ulang untuk run berikutnya.
+Dengan --database-url, DB dianggap sudah berisi data (ukuran hanya label) jika tabel images
+tidak kosong; jika kosong, diisi dulu dengan generator.
+"""
+import argparse
+import json
+import os
+import re
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{os.path.join(tempfile.mkdtemp(prefix='packfact-queries-'), 'app.db')}")
+
+from sqlalchemy import func, select  # noqa: E402
+from sqlalchemy.ext.compiler import compiles  # noqa: E402
+from sqlalchemy.sql.expression import ClauseElement, Executable  # noqa: E402
+
+import crud  # noqa: E402
+from core import nutrient_search  # noqa: E402
+from bench.common import percentile, save_results  # noqa: E402
+from bench.gen_scale_data import generate  # noqa: E402
+from database import create_db_engine  # noqa: E402
+from models import Image  # noqa: E402
+from nutrition_engine import day_bounds  # noqa: E402
+
+FULL_SCAN_MIN_ROWS = 100_000
+BIG_TABLES = ("images", "images_archive", "recommendations", "scan_nutrients")
+DEFAULT_DATA_DIR = os.path.join(tempfile.gettempdir(), "packfact-scale-data")
+
+
+def _report_bounds(days: int):
+    today = date.today()
+    return day_bounds(today - timedelta(days=days - 1), today)
+
+
+# Nama query -> (route, builder(user_id))
+QUERIES = {
+    "user_by_id": ("GET /daily-nutrition, /nutrition-report", crud.user_by_id),
+    "recommendation_history": ("GET /recommendation/history", crud.recommendation_history),
+    "scan_history_all": ("GET /scan-history-all", crud.scan_history_all),
+    "scan_history_today": ("GET /scan-history", lambda user_id: crud.scan_history_day(user_id, date.today())),
+    "nutrition_report_7d": ("GET /nutrition-report", lambda user_id: crud.nutrition_report_scans(user_id, *_report_bounds(7))),
+    "nutrition_report_366d": ("GET /nutrition-report?from=..", lambda user_id: crud.nutrition_report_scans(user_id, *_report_bounds(366))),
+    "scan_search_gula": ("GET /scan-search?filter=gula>40", lambda user_id: nutrient_search.search_stmt(user_id, [("gula", ">", 40.0)])),
+    "scan_search_garam_month": ("GET /scan-search?sort=garam&from=..", lambda user_id: nutrient_search.search_stmt(
+        user_id, [], "garam", True, *_report_bounds(30))),
+}
+
+
+class Explain(Executable, ClauseElement):
+    """EXPLAIN <statement> dengan bind parameter yang sama (diproses tipe kolomnya)."""
+    inherit_cache = False
+
+    def __init__(self, statement):
+        self.statement = statement
+
+
+@compiles(Explain)
+def _compile_explain(element, compiler, **kw):
+    prefix = "EXPLAIN QUERY PLAN" if compiler.dialect.name == "sqlite" else "EXPLAIN"
+    return f"{prefix} {compiler.process(element.statement, **kw)}"
+
+
+def explain(conn, stmt) -> list:
+    """Plan dalam bentuk list string yang stabil antar run (tanpa cost / estimasi baris)."""
+    rows = conn.execute(Explain(stmt)).mappings().all()
+    dialect = conn.dialect.name
+    if dialect == "sqlite":
+        return [row["detail"] for row in rows]
+    if dialect == "mysql":
+        return [f"{row['table']}: type={row['type']} key={row['key']} extra={row['Extra'] or ''}" for row in rows]
+    # PostgreSQL dan lainnya: teks plan tanpa angka cost/rows/width
+    return [re.sub(r"\s+\(cost=.*?\)", "", next(iter(row.values()))).strip() for row in rows]
+
+
+def full_scans(dialect: str, plan: list) -> list:
+    tables = "|".join(BIG_TABLES)
+    if dialect == "sqlite":
+        pattern = rf"^SCAN ({tables})\b"
+    elif dialect == "mysql":
+        pattern = rf"^({tables}): type=ALL\b"
+    else:
+        pattern = rf"Seq Scan on ({tables})\b"
+    return [line for line in plan if re.search(pattern, line)]
+
+
+def probe_users(conn) -> dict:
+    """User contoh: scan terbanyak, median, dan paling sedikit (minimal 1 scan)."""
+    counts = conn.execute(
+        select(Image.user_id, func.count()).where(Image.user_id.is_not(None)).group_by(Image.user_id).order_by(func.count().desc())
+    ).all()
+    if not counts:
+        return {}
+    return {
+        "heavy": {"user_id": counts[0][0], "scans": counts[0][1]},
+        "median": {"user_id": counts[len(counts) // 2][0], "scans": counts[len(counts) // 2][1]},
+        "light": {"user_id": counts[-1][0], "scans": counts[-1][1]},
+    }
+
+
+def time_query(conn, stmt, repeat: int) -> dict:
+    conn.execute(stmt).all()  # warm-up (cache halaman DB, compile statement)
+    samples, rows = [], 0
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        rows = len(conn.execute(stmt).all())
+        samples.append((time.perf_counter() - t0) * 1000)
+    samples.sort()
+    return {"rows": rows, "p50_ms": round(percentile(samples, 50), 3), "p95_ms": round(percentile(samples, 95), 3)}
+
+
+def run_size(database_url: str, size: int, args) -> dict:
+    engine = create_db_engine(database_url)
+    with engine.connect() as conn:
+        loaded = conn.execute(select(func.count()).select_from(Image)).scalar() if engine.dialect.has_table(conn, "images") else 0
+    if not loaded:
+        print(f"  generate {size} scan ...")
+        print("  " + json.dumps(generate(database_url, size, max(1, size // args.images_per_user), seed=args.seed, archive=args.archive)))
+    if engine.dialect.name == "sqlite":
+        with engine.begin() as conn:
+            conn.exec_driver_sql("ANALYZE")  # statistik untuk query planner, seperti DB produksi
+    results = {}
+    with engine.connect() as conn:
+        users = probe_users(conn)
+        for name, (route, builder) in QUERIES.items():
+            plan = explain(conn, builder(users["heavy"]["user_id"]))
+            entry = {"route": route, "plan": plan, "users": {}}
+            for label, user in users.items():
+                entry["users"][label] = {**user, **time_query(conn, builder(user["user_id"]), args.repeat)}
+            results[name] = entry
+    engine.dispose()
+    return {"dialect": engine.dialect.name, "images": size if not loaded else loaded, "queries": results}
+
+
+def find_regressions(results: dict, baseline: dict | None, args) -> list:
+    problems = []
+    for size, run in results.items():
+        for name, entry in run["queries"].items():
+            if run["images"] >= FULL_SCAN_MIN_ROWS:
+                for line in full_scans(run["dialect"], entry["plan"]):
+                    problems.append(f"[{size}] {name}: full scan -> {line}")
+            if baseline is None:
+                continue
+            base = baseline.get("results", {}).get(size, {}).get("queries", {}).get(name)
+            if base is None:
+                continue
+            if base["plan"] != entry["plan"]:
+                problems.append(f"[{size}] {name}: plan berubah\n    sebelum: {base['plan']}\n    sesudah: {entry['plan']}")
+            for label, cur in entry["users"].items():
+                prev = base["users"].get(label)
+                if prev and cur["p50_ms"] > prev["p50_ms"] * (1 + args.tolerance) and cur["p50_ms"] - prev["p50_ms"] > args.min_ms:
+                    problems.append(f"[{size}] {name} ({label}): p50 {prev['p50_ms']} -> {cur['p50_ms']} ms")
+    return problems
+
+
+def print_run(size: str, run: dict):
+    print(f"\n== {size} scan ({run['dialect']}) ==")
+    print(f"{'query':24} {'user':7} {'scans':>8} {'rows':>8} {'p50 ms':>9} {'p95 ms':>9}")
+    for name, entry in run["queries"].items():
+        for label, r in entry["users"].items():
+            print(f"{name:24} {label:7} {r['scans']:8} {r['rows']:8} {r['p50_ms']:9} {r['p95_ms']:9}")
+        for line in entry["plan"]:
+            print(f"{'':24}   plan: {line}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Suite performa query riwayat / laporan gizi")
+    parser.add_argument("--sizes", default="10000,100000,1000000", help="Jumlah baris images, pisahkan koma")
+    parser.add_argument("--database-url", help="Pakai DB ini (satu ukuran) alih-alih SQLite di --data-dir")
+    parser.add_argument("--data-dir", default=DEFAULT_DATA_DIR)
+    parser.add_argument("--images-per-user", type=int, default=50)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--archive", action="store_true", help="Generate dengan scan lama di images_archive")
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--baseline", help="File hasil sebelumnya (plan + latency) untuk deteksi regresi")
+    parser.add_argument("--tolerance", type=float, default=0.5, help="Toleransi kenaikan p50 (0.5 = +50%%)")
+    parser.add_argument("--min-ms", type=float, default=1.0, help="Selisih p50 di bawah ini diabaikan")
+    parser.add_argument("--output")
+    args = parser.parse_args()
+
+    sizes = [int(s) for s in args.sizes.split(",")]
+    if args.database_url and len(sizes) > 1:
+        parser.error("--database-url hanya untuk satu ukuran data")
+    os.makedirs(args.data_dir, exist_ok=True)
+    results = {}
+    for size in sizes:
+        suffix = "-archive" if args.archive else ""
+        url = args.database_url or f"sqlite:///{os.path.join(args.data_dir, f'scale-{size}-s{args.seed}{suffix}.db')}"
+        results[str(size)] = run_size(url, size, args)
+        print_run(str(size), results[str(size)])
+
+    baseline = None
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+    problems = find_regressions(results, baseline, args)
+    path = save_results("queries", {"config": vars(args), "results": results, "regressions": problems}, args.output)
+    print(f"\nHasil disimpan di {path}")
+    if problems:
+        print(f"\nREGRESI ({len(problems)}):")
+        for problem in problems:
+            print(f"- {problem}")
+        sys.exit(1)
+    print("Tidak ada regresi.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+# bench/bench_sqlite.py
+"""
+Benchmark mode SQLite embedded: insert scan (1 transaksi per upload, seperti /upload/)
+dari beberapa thread penulis sambil thread pembaca menjalankan query riwayat, dengan
+pragma default SQLite (rollback journal) vs pragma dari database.set_sqlite_pragmas (WAL).
+
+    python -m bench.bench_sqlite --writers 4 --readers 8 --duration 5
+"""
+import argparse
+import json
+import os
+import tempfile
+import threading
+import time
+from datetime import datetime
+
+from sqlalchemy import create_engine, event, select
+from sqlalchemy.exc import OperationalError
+
+from bench.common import percentile, save_results
+from database import set_sqlite_pragmas
+from models import Base, Image, User
+
+
+def make_engine(path: str, tuned: bool):
+    engine = create_engine(f"sqlite:///{path}", connect_args={"check_same_thread": False, "timeout": 5}, pool_size=32)
+    if tuned:
+        event.listen(engine, "connect", set_sqlite_pragmas)
+    return engine
+
+
+def run(tuned: bool, args) -> dict:
+    path = os.path.join(tempfile.mkdtemp(prefix="packfact-bench-sqlite-"), "bench.db")
+    engine = make_engine(path, tuned)
+    Base.metadata.create_all(engine)
+    with engine.begin() as conn:
+        conn.execute(User.__table__.insert(), [
+            {"id": i, "nama": "b", "email": f"b{i}@x", "password": "x", "bb": 60, "tinggi": 160, "umur": 30, "is_verified": True}
+            for i in range(1, args.users + 1)
+        ])
+    stop_at = time.time() + args.duration
+    writes, reads, errors = [], [], []
+    nutrition = json.dumps({"energi": 250, "protein": 4, "lemak total": 9, "karbohidrat": 28, "serat": 1, "gula": 12, "garam": 160})
+
+    def writer(n):
+        i = 0
+        while time.time() < stop_at:
+            t0 = time.perf_counter()
+            try:
+                with engine.begin() as conn:
+                    conn.execute(Image.__table__.insert().values(
+                        filename=f"{n}-{i}.jpg", filepath="/tmp/x.jpg", user_id=i % args.users + 1,
+                        uploaded_at=datetime.utcnow(), nutrition_json=nutrition,
+                    ))
+                writes.append((time.perf_counter() - t0) * 1000)
+            except OperationalError:
+                errors.append("write")
+            i += 1
+
+    def reader(n):
+        i = 0
+        while time.time() < stop_at:
+            t0 = time.perf_counter()
+            try:
+                with engine.connect() as conn:
+                    conn.execute(select(Image.filename, Image.uploaded_at, Image.nutrition_json).where(
+                        Image.user_id == (n + i) % args.users + 1
+                    ).order_by(Image.uploaded_at.desc()).limit(50)).all()
+                reads.append((time.perf_counter() - t0) * 1000)
+            except OperationalError:
+                errors.append("read")
+            i += 1
+
+    threads = [threading.Thread(target=writer, args=(n,)) for n in range(args.writers)]
+    threads += [threading.Thread(target=reader, args=(n,)) for n in range(args.readers)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    engine.dispose()
+    writes.sort()
+    reads.sort()
+    return {
+        "writes_per_s": round(len(writes) / args.duration, 1),
+        "reads_per_s": round(len(reads) / args.duration, 1),
+        "write_p99_ms": round(percentile(writes, 99), 2),
+        "read_p99_ms": round(percentile(reads, 99), 2),
+        "errors": len(errors),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark pragma SQLite (rollback journal vs WAL)")
+    parser.add_argument("--writers", type=int, default=4)
+    parser.add_argument("--readers", type=int, default=8)
+    parser.add_argument("--users", type=int, default=100)
+    parser.add_argument("--duration", type=float, default=5)
+    parser.add_argument("--output")
+    args = parser.parse_args()
+    results = {}
+    for name, tuned in (("default", False), ("wal", True)):
+        results[name] = run(tuned, args)
+        print(f"{name:8}: {results[name]}")
+    path = save_results("sqlite", {"config": vars(args), "results": results}, args.output)
+    print(f"Hasil disimpan di {path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,158 @@
+# bench/common.py
+"""Helper bersama untuk benchmark: start app, seed data, statistik & penyimpanan hasil."""
+import json
+import os
+import socket
+import subprocess
+import sys
+import time
+import urllib.request
+
+BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+RESULTS_DIR = os.path.join(os.path.dirname(__file__), 'results')
+SAMPLE_IMAGE = os.path.join(BASE_DIR, 'images', '5981937c-a221-48ec-86a6-e16703f4b6ab.jpg')
+
+BENCH_PASSWORD = "benchpass123"
+
+
+def percentile(sorted_values, p: float) -> float:
+    """Percentile (nearest-rank) dari list yang sudah diurutkan."""
+    if not sorted_values:
+        return 0.0
+    k = max(0, min(len(sorted_values) - 1, int(round(p / 100 * len(sorted_values) + 0.5)) - 1))
+    return sorted_values[k]
+
+
+def summarize(samples, duration_s: float) -> dict:
+    """samples: list (endpoint, status, latency_ms) -> statistik per endpoint."""
+    per_endpoint = {}
+    for endpoint, status, latency in samples:
+        per_endpoint.setdefault(endpoint, []).append((status, latency))
+    report = {}
+    for endpoint, rows in sorted(per_endpoint.items()):
+        lat = sorted(l for _, l in rows)
+        errors = sum(1 for s, _ in rows if s == 0 or s >= 400)
+        report[endpoint] = {
+            "count": len(rows),
+            "errors": errors,
+            "rps": round(len(rows) / duration_s, 2) if duration_s else 0,
+            "p50_ms": round(percentile(lat, 50), 2),
+            "p95_ms": round(percentile(lat, 95), 2),
+            "p99_ms": round(percentile(lat, 99), 2),
+            "max_ms": round(lat[-1], 2) if lat else 0,
+        }
+    total = len(samples)
+    report["_total"] = {
+        "count": total,
+        "errors": sum(r["errors"] for r in report.values()),
+        "rps": round(total / duration_s, 2) if duration_s else 0,
+    }
+    return report
+
+
+def print_report(report: dict):
+    print(f"{'endpoint':32} {'count':>7} {'err':>5} {'rps':>8} {'p50':>8} {'p95':>8} {'p99':>8}")
+    for endpoint, r in report.items():
+        if endpoint.startswith("_"):
+            continue
+        print(f"{endpoint:32} {r['count']:7} {r['errors']:5} {r['rps']:8} {r['p50_ms']:8} {r['p95_ms']:8} {r['p99_ms']:8}")
+    t = report.get("_total", {})
+    print(f"{'TOTAL':32} {t.get('count', 0):7} {t.get('errors', 0):5} {t.get('rps', 0):8}")
+
+
+def print_comparison(previous: dict, current: dict):
+    """Bandingkan dua report (hasil JSON) per endpoint."""
+    prev, cur = previous.get("report", {}), current.get("report", {})
+    print(f"{'endpoint':32} {'rps':>16} {'p95 ms':>18} {'p99 ms':>18}")
+    for endpoint in sorted(set(prev) | set(cur)):
+        if endpoint.startswith("_"):
+            continue
+        a, b = prev.get(endpoint, {}), cur.get(endpoint, {})
+
+        def delta(key):
+            x, y = a.get(key), b.get(key)
+            if not x or y is None:
+                return f"{y}"
+            return f"{x}->{y} ({(y - x) / x * 100:+.0f}%)"
+        print(f"{endpoint:32} {delta('rps'):>16} {delta('p95_ms'):>18} {delta('p99_ms'):>18}")
+
+
+def git_revision() -> str:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=BASE_DIR, text=True).strip()
+    except Exception:
+        return "unknown"
+
+
+def save_results(name: str, data: dict, path: str | None = None) -> str:
+    os.makedirs(RESULTS_DIR, exist_ok=True)
+    if path is None:
+        path = os.path.join(RESULTS_DIR, f"{name}-{time.strftime('%Y%m%d-%H%M%S')}.json")
+    data = {"name": name, "timestamp": time.strftime('%Y-%m-%dT%H:%M:%S'), "git": git_revision(), **data}
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(data, f, indent=2)
+    return path
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_app(database_url: str, base_api_url: str, port: int, upload_dir: str, workers: int = 1, extra_env: dict | None = None):
+    """Start app dengan uvicorn di subprocess dan tunggu sampai siap menerima request."""
+    env = {
+        **os.environ,
+        "DATABASE_URL": database_url,
+        "BASE_API_URL": base_api_url,
+        "UPLOAD_DIR": upload_dir,
+        "DB_SCHEMA_MODE": "create",
+        # Benchmark mengukur kapasitas, bukan budget per user
+        "RATE_LIMIT_ENABLED": "0",
+        **(extra_env or {}),
+    }
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--host", "127.0.0.1", "--port", str(port),
+         "--workers", str(workers), "--log-level", "warning", "--no-access-log"],
+        cwd=BASE_DIR, env=env,
+    )
+    deadline = time.time() + 60
+    while time.time() < deadline:
+        if proc.poll() is not None:
+            raise RuntimeError(f"App berhenti saat startup (exit code {proc.returncode})")
+        try:
+            urllib.request.urlopen(f"http://127.0.0.1:{port}/readyz", timeout=1)
+            return proc
+        except Exception:
+            time.sleep(0.3)
+    proc.terminate()
+    raise RuntimeError("App tidak siap dalam 60 detik")
+
+
+def seed_users(database_url: str, count: int, password: str = BENCH_PASSWORD) -> list:
+    """Buat user terverifikasi bench0..benchN (idempotent). Return list email."""
+    from passlib.context import CryptContext
+    from sqlalchemy import select
+    from database import create_db_engine
+    from models import Base, User
+
+    engine = create_db_engine(database_url)
+    Base.metadata.create_all(bind=engine)
+    hashed = CryptContext(schemes=["bcrypt"], deprecated="auto").hash(password)
+    emails = [f"bench{i}@example.com" for i in range(count)]
+    with engine.begin() as conn:
+        existing = set(conn.execute(select(User.email).where(User.email.in_(emails))).scalars())
+        rows = [
+            {
+                "nama": f"Bench {i}", "email": email, "password": hashed,
+                "bb": 60 + i % 20, "tinggi": 160 + i % 20, "umur": 20 + i % 40,
+                "gender": "Laki-laki" if i % 2 else "Perempuan", "umur_satuan": "tahun",
+                "hamil": 0, "menyusui": 0, "timezone": "Asia/Jakarta", "is_verified": True,
+            }
+            for i, email in enumerate(emails) if email not in existing
+        ]
+        if rows:
+            conn.execute(User.__table__.insert(), rows)
+    engine.dispose()
+    return emails
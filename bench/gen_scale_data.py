@@ -0,0 +1,183 @@
+# bench/gen_scale_data.py
+"""
+Generator data sintetis skala besar (users, images + nutrition_json, recommendations)
+untuk menguji query riwayat / laporan gizi di jutaan baris.
+
+Distribusi dibuat miring seperti produksi:
+- jumlah scan per user mengikuti Zipf (``--skew``): sedikit user sangat aktif, banyak
+  user dengan beberapa scan saja; urutan id user diacak (user aktif tidak berkumpul)
+- waktu scan condong ke hari-hari terakhir (eksponensial, maksimal ``--days`` hari),
+  id naik sesuai waktu upload seperti data asli
+- ~3% scan tanpa nutrition_json (OCR gagal), ~90% punya phash; scan lain ikut diindex
+  di scan_nutrients (pencarian gizi)
+- 0-3 rekomendasi per user yang pernah scan
+
+Dengan ``--archive`` scan yang lebih tua dari ARCHIVE_AFTER_DAYS langsung ditulis ke
+images_archive (seperti setelah ``scripts.archive_scans`` berjalan).
+
+    python -m bench.gen_scale_data --database-url sqlite:///./scale.db --images 10000000 --users 200000
+"""
+import argparse
+import json
+import os
+import time
+from datetime import datetime, timedelta
+
+import numpy as np
+
+from core import config
+
+NUTRIENT_RANGES = {
+    "energi": (20, 600),
+    "protein": (0, 30),
+    "lemak total": (0, 35),
+    "karbohidrat": (0, 80),
+    "serat": (0, 12),
+    "gula": (0, 45),
+    "garam": (0, 1500),
+}
+
+
+def user_scan_counts(rng, users: int, images: int, skew: float) -> np.ndarray:
+    """Bagi ``images`` scan ke ``users`` user dengan bobot Zipf (rank^-skew), urutan diacak."""
+    weights = 1.0 / np.arange(1, users + 1) ** skew
+    counts = rng.multinomial(images, weights / weights.sum())
+    rng.shuffle(counts)
+    return counts
+
+
+def nutrition_values(rng, n: int) -> list:
+    """n dict gizi acak (nilai dibulatkan 1 desimal seperti hasil OCR)."""
+    cols = {key: rng.uniform(lo, hi, n).round(1).tolist() for key, (lo, hi) in NUTRIENT_RANGES.items()}
+    return [{key: cols[key][i] for key in NUTRIENT_RANGES} for i in range(n)]
+
+
+def insert_users(engine, count: int, password: str) -> list:
+    """Buat user scale0..scaleN dalam batch; return list id sesuai urutan."""
+    from passlib.context import CryptContext
+    from sqlalchemy import select
+    from models import User
+
+    hashed = CryptContext(schemes=["bcrypt"], deprecated="auto").hash(password)
+    rows = [
+        {
+            "nama": f"Scale {i}", "email": f"scale{i}@example.com", "password": hashed,
+            "bb": 50 + i % 40, "tinggi": 150 + i % 40, "umur": 18 + i % 50,
+            "gender": "Laki-laki" if i % 2 else "Perempuan", "umur_satuan": "tahun",
+            "hamil": 0, "menyusui": 0, "timezone": "Asia/Jakarta", "is_verified": True,
+        }
+        for i in range(count)
+    ]
+    with engine.begin() as conn:
+        for start in range(0, count, 10000):
+            conn.execute(User.__table__.insert(), rows[start:start + 10000])
+        return list(conn.execute(
+            select(User.id).where(User.email.like("scale%@example.com")).order_by(User.id)
+        ).scalars())[:count]
+
+
+def generate(database_url: str, images: int, users: int, days: int = 365, skew: float = 1.0,
+             seed: int = 42, archive: bool = False, batch_size: int = 20000, password: str = "scalepass123") -> dict:
+    """Isi DB kosong dengan data sintetis; return ringkasan (jumlah baris, user terberat, durasi)."""
+    from database import create_db_engine
+    from core.nutrient_search import COLUMNS
+    from models import Base, Image, ImageArchive, Recommendation, ScanNutrient
+
+    rng = np.random.default_rng(seed)
+    engine = create_db_engine(database_url)
+    Base.metadata.create_all(bind=engine)
+    t0 = time.perf_counter()
+    user_ids = np.array(insert_users(engine, users, password))
+
+    counts = user_scan_counts(rng, users, images, skew)
+    owner = np.repeat(user_ids, counts)
+    # Detik sebelum sekarang: condong ke hari terakhir, dipotong di `days` hari
+    age_s = np.minimum(rng.exponential(days * 86400 / 6, images), days * 86400 - 1).astype(np.int64)
+    order = np.argsort(-age_s, kind="stable")  # scan tertua dulu -> id naik sesuai waktu
+    owner, age_s = owner[order], age_s[order]
+    now = datetime.now().replace(microsecond=0)
+    archive_age_s = config.ARCHIVE_AFTER_DAYS * 86400 + 86400
+
+    images_table, archive_table, nutrients_table = Image.__table__, ImageArchive.__table__, ScanNutrient.__table__
+    written = {"images": 0, "images_archive": 0, "scan_nutrients": 0}
+    with engine.begin() as conn:
+        for start in range(0, images, batch_size):
+            n = min(batch_size, images - start)
+            gizi = nutrition_values(rng, n)
+            missing = rng.random(n) < 0.03
+            phash = rng.integers(0, 2 ** 63, n)
+            has_phash = rng.random(n) < 0.9
+            live, archived, indexed = [], [], []
+            for i in range(n):
+                idx = start + i
+                uploaded_at = now - timedelta(seconds=int(age_s[idx]))
+                filename = f"{idx:010d}-synthetic.jpg"
+                row = {
+                    "id": idx + 1,
+                    "filename": filename,
+                    "uploaded_at": uploaded_at,
+                    "user_id": int(owner[idx]),
+                    "nutrition_json": None if missing[i] else json.dumps(gizi[i]),
+                }
+                if not missing[i]:
+                    indexed.append({"image_id": idx + 1, "user_id": row["user_id"], "uploaded_at": uploaded_at,
+                                    "filename": filename, **{COLUMNS[k]: v for k, v in gizi[i].items()}})
+                if archive and age_s[idx] > archive_age_s:
+                    archived.append({**row, "filepath": os.path.join(config.ARCHIVE_DIR, filename), "archived_at": now})
+                else:
+                    live.append({**row, "filepath": os.path.join(config.UPLOAD_DIR, filename),
+                                 "phash": f"{int(phash[i]):016x}" if has_phash[i] else None})
+            if archived:
+                conn.execute(archive_table.insert(), archived)
+            if live:
+                conn.execute(images_table.insert(), live)
+            if indexed:
+                conn.execute(nutrients_table.insert(), indexed)
+            written["scan_nutrients"] += len(indexed)
+            written["images"] += len(live)
+            written["images_archive"] += len(archived)
+            if (start // batch_size) % 25 == 24:
+                print(f"  {start + n}/{images} scan ({time.perf_counter() - t0:.0f} s)")
+
+        # Rekomendasi: hanya user yang pernah scan, kebanyakan 1 (endpoint save menimpa yang lama)
+        active = user_ids[counts > 0]
+        per_user = rng.choice([0, 1, 1, 1, 2, 3], size=len(active))
+        rec_owner = np.repeat(active, per_user)
+        rec_age_s = rng.integers(0, days * 86400, len(rec_owner))
+        rekomendasi = json.dumps({"rekomendasi": [{"nutrisi": "gula", "saran": "Kurangi konsumsi"}]})
+        for start in range(0, len(rec_owner), batch_size):
+            conn.execute(Recommendation.__table__.insert(), [
+                {"user_id": int(u), "created_at": now - timedelta(seconds=int(a)), "rekomendasi_json": rekomendasi}
+                for u, a in zip(rec_owner[start:start + batch_size], rec_age_s[start:start + batch_size])
+            ])
+    engine.dispose()
+    heaviest = int(user_ids[counts.argmax()])
+    return {
+        **written,
+        "recommendations": int(len(rec_owner)),
+        "users": users,
+        "max_scans_per_user": int(counts.max()),
+        "median_scans_per_user": float(np.median(counts)),
+        "heaviest_user_id": heaviest,
+        "seconds": round(time.perf_counter() - t0, 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate data sintetis skala besar")
+    parser.add_argument("--database-url", required=True, help="DB kosong (schema dibuat otomatis)")
+    parser.add_argument("--images", type=int, default=1_000_000)
+    parser.add_argument("--users", type=int, help="Default: images / 50")
+    parser.add_argument("--days", type=int, default=365, help="Rentang waktu scan (hari ke belakang)")
+    parser.add_argument("--skew", type=float, default=1.0, help="Eksponen Zipf scan per user (0 = merata)")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--archive", action="store_true", help="Scan lebih tua dari ARCHIVE_AFTER_DAYS ke images_archive")
+    parser.add_argument("--batch-size", type=int, default=20000)
+    args = parser.parse_args()
+    summary = generate(args.database_url, args.images, args.users or max(1, args.images // 50), args.days,
+                       args.skew, args.seed, args.archive, args.batch_size)
+    print(json.dumps(summary, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,198 @@
+# bench/loadtest.py
+"""
+Load test end-to-end: start stub OCR/ML + app (uvicorn) di database lokal,
+lalu jalankan traffic campuran (login, upload, scan history, rekomendasi).
+
+Contoh:
+    python -m bench.loadtest --duration 30 --concurrency 20 --stub-latency-ms 300
+    python -m bench.loadtest --database-url mysql+pymysql://root:pw@localhost/image_db_bench
+    python -m bench.loadtest --compare bench/results/loadtest-20250601-120000.json
+
+Hasil (throughput, p50/p95/p99 per endpoint) disimpan sebagai JSON di bench/results/.
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import shutil
+import tempfile
+import time
+
+import aiohttp
+
+from bench.common import (
+    BENCH_PASSWORD, SAMPLE_IMAGE, free_port, print_comparison, print_report,
+    save_results, seed_users, start_app, summarize,
+)
+from bench.stub_ml import StubConfig, start_stub
+
+DEFAULT_MIX = "login=5,upload=20,scan_history=30,scan_history_all=15,recommendation=15,recommendation_history=10,daily_nutrition=5"
+
+RECOMMENDATION_PAYLOAD = {
+    "konsumsi": {"energi": 1200, "protein": 40, "lemak total": 50, "karbohidrat": 180, "serat": 10, "gula": 35, "garam": 1500},
+    "target_harian": {"energi": 2100, "protein": 60, "lemak total": 70, "karbohidrat": 300, "serat": 30, "gula": 50, "garam": 2000},
+}
+
+
+def parse_mix(mix: str) -> dict:
+    weights = {}
+    for part in mix.split(","):
+        name, weight = part.split("=")
+        weights[name.strip()] = float(weight)
+    return weights
+
+
+class VirtualUser:
+    def __init__(self, session: aiohttp.ClientSession, base_url: str, email: str, image_bytes: bytes, samples: list):
+        self.session = session
+        self.base_url = base_url
+        self.email = email
+        self.image_bytes = image_bytes
+        self.samples = samples
+        self.token = None
+        self.record = True
+
+    async def _request(self, endpoint: str, method: str, path: str, **kwargs):
+        t0 = time.perf_counter()
+        status = 0
+        body = None
+        try:
+            async with self.session.request(method, self.base_url + path, **kwargs) as resp:
+                status = resp.status
+                body = await resp.read()
+        except Exception:
+            status = 0
+        if self.record:
+            self.samples.append((endpoint, status, (time.perf_counter() - t0) * 1000))
+        return status, body
+
+    def _auth(self):
+        return {"Authorization": f"Bearer {self.token}"}
+
+    async def login(self):
+        status, body = await self._request("POST /login", "POST", "/login", json={"email": self.email, "password": BENCH_PASSWORD})
+        if status == 200:
+            self.token = json.loads(body)["token"]
+
+    async def upload(self):
+        form = aiohttp.FormData()
+        form.add_field("file", self.image_bytes, filename="label.jpg", content_type="image/jpeg")
+        await self._request("POST /upload/", "POST", "/upload/", data=form, headers=self._auth())
+
+    async def scan_history(self):
+        await self._request("GET /scan-history", "GET", "/scan-history", headers=self._auth())
+
+    async def scan_history_all(self):
+        await self._request("GET /scan-history-all", "GET", "/scan-history-all", headers=self._auth())
+
+    async def recommendation(self):
+        await self._request("POST /recommendation", "POST", "/recommendation", json=RECOMMENDATION_PAYLOAD, headers=self._auth())
+
+    async def recommendation_history(self):
+        await self._request("GET /recommendation/history", "GET", "/recommendation/history", headers=self._auth())
+
+    async def daily_nutrition(self):
+        await self._request("GET /daily-nutrition", "GET", "/daily-nutrition", headers=self._auth())
+
+    async def run(self, weights: dict, stop_at: float):
+        await self.login()
+        names = list(weights)
+        w = [weights[n] for n in names]
+        while time.time() < stop_at:
+            action = random.choices(names, weights=w)[0]
+            if self.token is None:
+                action = "login"
+            await getattr(self, action)()
+
+
+async def run_load(base_url: str, emails: list, concurrency: int, duration: float, warmup: float, weights: dict) -> tuple:
+    with open(SAMPLE_IMAGE, "rb") as f:
+        image_bytes = f.read()
+    samples = []
+    connector = aiohttp.TCPConnector(limit=concurrency * 2)
+    timeout = aiohttp.ClientTimeout(total=60)
+    async with aiohttp.ClientSession(connector=connector, timeout=timeout) as session:
+        users = [VirtualUser(session, base_url, emails[i % len(emails)], image_bytes, samples) for i in range(concurrency)]
+        for u in users:
+            u.record = False
+        stop_at = time.time() + warmup + duration
+        tasks = [asyncio.create_task(u.run(weights, stop_at)) for u in users]
+        await asyncio.sleep(warmup)
+        for u in users:
+            u.record = True
+        t0 = time.perf_counter()
+        await asyncio.gather(*tasks)
+        elapsed = time.perf_counter() - t0
+    return samples, elapsed
+
+
+async def main_async(args):
+    weights = parse_mix(args.mix)
+    workdir = tempfile.mkdtemp(prefix="packfact-bench-")
+    database_url = args.database_url or f"sqlite:///{os.path.join(workdir, 'bench.db')}"
+    stub_port = args.stub_port or free_port()
+    stub_cfg = StubConfig(args.stub_latency_ms, args.stub_jitter_ms, args.stub_error_rate)
+    stub = await start_stub(stub_cfg, port=stub_port)
+    proc = None
+    try:
+        if args.app_url:
+            base_url = args.app_url.rstrip("/")
+        else:
+            port = args.port or free_port()
+            proc = await asyncio.to_thread(
+                start_app, database_url, f"http://127.0.0.1:{stub_port}", port,
+                os.path.join(workdir, "images"), args.workers,
+            )
+            base_url = f"http://127.0.0.1:{port}"
+        emails = await asyncio.to_thread(seed_users, database_url, args.users)
+        print(f"Load test {base_url}: {args.concurrency} VU, {args.duration}s (warmup {args.warmup}s), stub latency {args.stub_latency_ms}ms")
+        samples, elapsed = await run_load(base_url, emails, args.concurrency, args.duration, args.warmup, weights)
+    finally:
+        if proc is not None:
+            proc.terminate()
+            proc.wait(timeout=10)
+        await stub.cleanup()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    report = summarize(samples, elapsed)
+    print_report(report)
+    data = {
+        "config": {
+            "concurrency": args.concurrency, "duration": args.duration, "warmup": args.warmup,
+            "users": args.users, "workers": args.workers, "mix": weights,
+            "stub_latency_ms": args.stub_latency_ms, "stub_jitter_ms": args.stub_jitter_ms,
+            "database": database_url.split(":", 1)[0],
+        },
+        "report": report,
+        "stub_calls": stub_cfg.calls,
+    }
+    path = save_results("loadtest", data, args.output)
+    print(f"Hasil disimpan di {path}")
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            print_comparison(json.load(f), data)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test PackFact backend dengan stub OCR/ML")
+    parser.add_argument("--database-url", help="Default: SQLite sementara")
+    parser.add_argument("--app-url", help="Pakai app yang sudah jalan (BASE_API_URL-nya harus mengarah ke --stub-port)")
+    parser.add_argument("--port", type=int)
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--stub-port", type=int)
+    parser.add_argument("--stub-latency-ms", type=float, default=200)
+    parser.add_argument("--stub-jitter-ms", type=float, default=50)
+    parser.add_argument("--stub-error-rate", type=float, default=0.0)
+    parser.add_argument("--users", type=int, default=20)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--duration", type=float, default=30)
+    parser.add_argument("--warmup", type=float, default=5)
+    parser.add_argument("--mix", default=DEFAULT_MIX)
+    parser.add_argument("--output", help="Path file JSON hasil")
+    parser.add_argument("--compare", help="File JSON hasil sebelumnya untuk dibandingkan")
+    asyncio.run(main_async(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
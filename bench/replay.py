@@ -0,0 +1,237 @@
+# bench/replay.py
+"""
+Replay traffic hasil capture (core/capture.py) ke instance test.
+
+- Request dikirim ulang sesuai urutan & jarak waktu aslinya (``--speed 2`` = 2x lebih cepat).
+- Respons OCR/ML dilayani stub dari capture (key hash request upstream), termasuk latency aslinya.
+- Token dibuat ulang dari claims yang dicapture dan ditandatangani SECRET_KEY instance test;
+  user untuk claims & login (email pseudonim) di-seed ke database test.
+
+Contoh (start app + SQLite sementara otomatis):
+    python -m bench.replay --capture-dir captures/ --speed 1
+Ke instance yang sudah jalan (BASE_API_URL-nya harus ke --stub-port):
+    python -m bench.replay --capture-dir captures/ --app-url http://127.0.0.1:8000 \\
+        --stub-port 9100 --database-url mysql+pymysql://root:pw@localhost/image_db_test
+"""
+import argparse
+import asyncio
+import glob
+import gzip
+import json
+import os
+import re
+import shutil
+import tempfile
+import time
+
+import aiohttp
+import jwt
+
+from bench.common import BENCH_PASSWORD, free_port, print_report, save_results, start_app, summarize
+from bench.stub_ml import StubConfig, start_stub
+from core.capture import CAPTURE_FILE
+
+ID_SEGMENT = re.compile(r"^(\d+|[0-9a-f]{8}-[0-9a-f-]{27}(\.\w+)?)$")
+
+
+def capture_files(capture_dir: str) -> list:
+    """File capture dari yang paling lama (backup terbesar) ke yang terbaru."""
+    base = os.path.join(capture_dir, CAPTURE_FILE)
+    backups = glob.glob(base + ".*.gz")
+    backups.sort(key=lambda p: int(p[len(base) + 1:-3]), reverse=True)
+    return backups + ([base] if os.path.exists(base) else [])
+
+
+def load_capture(capture_dir: str) -> tuple:
+    requests, upstream = [], {}
+    for path in capture_files(capture_dir):
+        opener = gzip.open if path.endswith(".gz") else open
+        with opener(path, "rt", encoding="utf-8") as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                rec = json.loads(line)
+                if rec.get("type") == "upstream":
+                    upstream[(rec["kind"], rec["key"])] = (rec.get("status", 200), rec["response"], rec.get("latency_ms", 0))
+                elif rec.get("type") == "request":
+                    requests.append(rec)
+    requests.sort(key=lambda r: r["t"])
+    return requests, upstream
+
+
+def endpoint_name(rec: dict) -> str:
+    path = "/".join("{id}" if ID_SEGMENT.match(seg) else seg for seg in rec["path"].split("/"))
+    return f"{rec['method']} {path}"
+
+
+def _replace_redacted(obj):
+    if isinstance(obj, dict):
+        return {k: (BENCH_PASSWORD if k.lower() == "password" and v == "***" else _replace_redacted(v)) for k, v in obj.items()}
+    if isinstance(obj, list):
+        return [_replace_redacted(v) for v in obj]
+    return obj
+
+
+def seed_replay_users(database_url: str, requests: list):
+    """Buat user dengan id dari claims + user untuk email pseudonim di body login."""
+    from passlib.context import CryptContext
+    from sqlalchemy import create_engine, select
+    from models import Base, User
+
+    engine = create_engine(database_url)
+    Base.metadata.create_all(bind=engine)
+    hashed = CryptContext(schemes=["bcrypt"], deprecated="auto").hash(BENCH_PASSWORD)
+    by_id, emails = {}, set()
+    for rec in requests:
+        claims = rec.get("claims") or {}
+        if claims.get("user_id"):
+            by_id.setdefault(claims["user_id"], claims)
+        body = rec.get("body")
+        if rec["path"] == "/login" and isinstance(body, dict) and body.get("email"):
+            emails.add(body["email"])
+
+    def user_row(email, claims):
+        return {
+            "nama": "Replay", "email": email, "password": hashed,
+            "bb": 60, "tinggi": 165, "umur": claims.get("umur") or 30,
+            "gender": claims.get("gender"), "umur_satuan": claims.get("umur_satuan") or "tahun",
+            "hamil": 1 if claims.get("hamil") else 0, "usia_kandungan": claims.get("usia_kandungan"),
+            "menyusui": 1 if claims.get("menyusui") else 0, "umur_anak": claims.get("umur_anak"),
+            "timezone": claims.get("timezone") or "Asia/Jakarta", "is_verified": True,
+        }
+
+    with engine.begin() as conn:
+        existing_ids = set(conn.execute(select(User.id)).scalars())
+        existing_emails = set(conn.execute(select(User.email)).scalars())
+        rows = [{"id": uid, **user_row(f"replay-{uid}@replay.invalid", claims)} for uid, claims in by_id.items() if uid not in existing_ids]
+        if rows:
+            conn.execute(User.__table__.insert(), rows)
+        rows = [user_row(email, {}) for email in emails if email not in existing_emails]
+        if rows:
+            conn.execute(User.__table__.insert(), rows)
+    engine.dispose()
+
+
+async def replay(base_url: str, requests: list, capture_dir: str, speed: float, secret_key: str) -> tuple:
+    samples, mismatches, skipped = [], {}, 0
+    blob_dir = os.path.join(capture_dir, "blobs")
+    t_first = requests[0]["t"]
+
+    async def issue(session, rec, t_start):
+        nonlocal skipped
+        delay = t_start + (rec["t"] - t_first) / speed - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        headers = dict(rec.get("headers") or {})
+        claims = rec.get("claims")
+        if claims and not claims.get("invalid"):
+            token = jwt.encode({**claims, "exp": int(time.time()) + 3600}, secret_key, algorithm="HS256")
+            headers["Authorization"] = f"Bearer {token}"
+        kwargs = {}
+        if "multipart" in rec:
+            headers.pop("content-type", None)
+            form = aiohttp.FormData()
+            for part in rec["multipart"]:
+                if "sha256" in part:
+                    with open(os.path.join(blob_dir, part["sha256"]), "rb") as f:
+                        form.add_field(part["name"], f.read(), filename=part["filename"], content_type=part["content_type"])
+                else:
+                    form.add_field(part["name"], BENCH_PASSWORD if part["value"] == "***" else part["value"])
+            kwargs["data"] = form
+        elif "body" in rec:
+            kwargs["data"] = json.dumps(_replace_redacted(rec["body"])).encode("utf-8")
+        elif "body_sha256" in rec:
+            with open(os.path.join(blob_dir, rec["body_sha256"]), "rb") as f:
+                kwargs["data"] = f.read()
+        elif rec.get("body_truncated"):
+            skipped += 1
+            return
+        url = base_url + rec["path"] + (f"?{rec['query']}" if rec.get("query") else "")
+        name = endpoint_name(rec)
+        t0 = time.perf_counter()
+        try:
+            async with session.request(rec["method"], url, headers=headers, **kwargs) as resp:
+                await resp.read()
+                status = resp.status
+        except Exception:
+            status = 0
+        samples.append((name, status, (time.perf_counter() - t0) * 1000))
+        if status != rec.get("status"):
+            key = f"{name} {rec.get('status')}->{status}"
+            mismatches[key] = mismatches.get(key, 0) + 1
+
+    connector = aiohttp.TCPConnector(limit=0)
+    async with aiohttp.ClientSession(connector=connector, timeout=aiohttp.ClientTimeout(total=120)) as session:
+        t_start = time.perf_counter()
+        await asyncio.gather(*(issue(session, rec, t_start) for rec in requests))
+        elapsed = time.perf_counter() - t_start
+    return samples, mismatches, skipped, elapsed
+
+
+async def main_async(args):
+    requests, upstream = load_capture(args.capture_dir)
+    if args.limit:
+        requests = requests[:args.limit]
+    if not requests:
+        raise SystemExit(f"Tidak ada request di {args.capture_dir}")
+    print(f"{len(requests)} request, {len(upstream)} respons upstream dari capture")
+
+    workdir = tempfile.mkdtemp(prefix="packfact-replay-")
+    database_url = args.database_url or f"sqlite:///{os.path.join(workdir, 'replay.db')}"
+    stub_port = args.stub_port or free_port()
+    stub_cfg = StubConfig(args.fallback_latency_ms, 0, replay=upstream)
+    stub = await start_stub(stub_cfg, port=stub_port)
+    proc = None
+    try:
+        if args.app_url:
+            base_url = args.app_url.rstrip("/")
+        else:
+            port = args.port or free_port()
+            proc = await asyncio.to_thread(
+                start_app, database_url, f"http://127.0.0.1:{stub_port}", port,
+                os.path.join(workdir, "images"), args.workers, {"SECRET_KEY": args.secret_key},
+            )
+            base_url = f"http://127.0.0.1:{port}"
+        if args.app_url is None or args.database_url:
+            await asyncio.to_thread(seed_replay_users, database_url, requests)
+        samples, mismatches, skipped, elapsed = await replay(base_url, requests, args.capture_dir, args.speed, args.secret_key)
+    finally:
+        if proc is not None:
+            proc.terminate()
+            proc.wait(timeout=10)
+        await stub.cleanup()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    report = summarize(samples, elapsed)
+    print_report(report)
+    print(f"Upstream replay: {stub_cfg.replay_hits} hit, {stub_cfg.replay_misses} miss; request di-skip: {skipped}")
+    for key, count in sorted(mismatches.items(), key=lambda kv: -kv[1]):
+        print(f"  status berbeda: {key} x{count}")
+    data = {
+        "config": {"capture_dir": args.capture_dir, "speed": args.speed, "requests": len(requests)},
+        "report": report,
+        "status_mismatches": mismatches,
+        "upstream_replay": {"hits": stub_cfg.replay_hits, "misses": stub_cfg.replay_misses},
+        "skipped": skipped,
+    }
+    print(f"Hasil disimpan di {save_results('replay', data, args.output)}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay traffic hasil capture ke instance test")
+    parser.add_argument("--capture-dir", required=True)
+    parser.add_argument("--speed", type=float, default=1.0, help="Faktor kecepatan (2 = dua kali lebih cepat)")
+    parser.add_argument("--limit", type=int, help="Hanya replay N request pertama")
+    parser.add_argument("--app-url")
+    parser.add_argument("--port", type=int)
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--database-url", help="Database instance test (untuk seed user)")
+    parser.add_argument("--stub-port", type=int)
+    parser.add_argument("--secret-key", default=os.environ.get("SECRET_KEY", "secretkey123"))
+    parser.add_argument("--fallback-latency-ms", type=float, default=200, help="Latency stub jika respons tidak ada di capture")
+    parser.add_argument("--output")
+    asyncio.run(main_async(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,139 @@
+# bench/resp_server.py
+"""
+Stand-in server ber-protokol Redis (RESP2) untuk menguji CACHE_BACKEND=redis tanpa Redis asli.
+Mendukung PING, AUTH, SELECT, GET, SET (EX/PX/NX/XX), DEL, EXISTS, SCAN, DBSIZE, FLUSHDB, INFO,
+dengan TTL dan eviction LRU (``--max-keys``, meniru maxmemory-policy allkeys-lru).
+
+    python -m bench.resp_server --port 6390 --max-keys 10000
+lalu set CACHE_BACKEND=redis CACHE_REDIS_URL=redis://127.0.0.1:6390/0 pada app.
+"""
+import argparse
+import asyncio
+import fnmatch
+import time
+from collections import OrderedDict
+
+
+class RespStore:
+    def __init__(self, max_keys: int = 10000):
+        self.max_keys = max_keys
+        self.data = OrderedDict()  # key -> (expires_at | None, value)
+        self.evictions = 0
+        self.commands = 0
+
+    def _live(self, key):
+        item = self.data.get(key)
+        if item is not None and item[0] is not None and item[0] <= time.time():
+            del self.data[key]
+            return None
+        return item
+
+    def execute(self, args: list):
+        self.commands += 1
+        cmd = args[0].upper()
+        if cmd == b"PING":
+            return "+PONG"
+        if cmd in (b"AUTH", b"SELECT"):
+            return "+OK"
+        if cmd == b"GET":
+            item = self._live(args[1])
+            if item is None:
+                return None
+            self.data.move_to_end(args[1])
+            return item[1]
+        if cmd == b"SET":
+            key, value, opts = args[1], args[2], [a.upper() for a in args[3:]]
+            expires_at = None
+            for flag, factor in ((b"EX", 1.0), (b"PX", 0.001)):
+                if flag in opts:
+                    expires_at = time.time() + int(opts[opts.index(flag) + 1]) * factor
+            exists = self._live(key) is not None
+            if (b"NX" in opts and exists) or (b"XX" in opts and not exists):
+                return None
+            self.data[key] = (expires_at, value)
+            self.data.move_to_end(key)
+            while len(self.data) > self.max_keys:
+                self.data.popitem(last=False)
+                self.evictions += 1
+            return "+OK"
+        if cmd == b"DEL":
+            return sum(1 for key in args[1:] if self.data.pop(key, None) is not None)
+        if cmd == b"EXISTS":
+            return sum(1 for key in args[1:] if self._live(key) is not None)
+        if cmd == b"SCAN":
+            pattern = b"*"
+            if b"MATCH" in [a.upper() for a in args]:
+                pattern = args[[a.upper() for a in args].index(b"MATCH") + 1]
+            keys = [k for k in list(self.data) if self._live(k) is not None and fnmatch.fnmatchcase(k.decode(), pattern.decode())]
+            return [b"0", keys]
+        if cmd == b"DBSIZE":
+            return len(self.data)
+        if cmd == b"FLUSHDB":
+            self.data.clear()
+            return "+OK"
+        if cmd == b"INFO":
+            return (f"keys:{len(self.data)}\r\nmax_keys:{self.max_keys}\r\n"
+                    f"evicted_keys:{self.evictions}\r\ncommands:{self.commands}\r\n").encode()
+        return f"-ERR unknown command '{cmd.decode(errors='replace')}'"
+
+
+def encode(reply) -> bytes:
+    if reply is None:
+        return b"$-1\r\n"
+    if isinstance(reply, str):
+        return reply.encode() + b"\r\n"
+    if isinstance(reply, int):
+        return b":%d\r\n" % reply
+    if isinstance(reply, bytes):
+        return b"$%d\r\n%s\r\n" % (len(reply), reply)
+    return b"*%d\r\n" % len(reply) + b"".join(encode(item) for item in reply)
+
+
+async def read_command(reader: asyncio.StreamReader) -> list | None:
+    line = await reader.readline()
+    if not line:
+        return None
+    if not line.startswith(b"*"):
+        return line.split()  # inline command (mis. dari telnet)
+    args = []
+    for _ in range(int(line[1:-2])):
+        length = int((await reader.readline())[1:-2])
+        args.append((await reader.readexactly(length + 2))[:-2])
+    return args
+
+
+async def start_resp_server(store: RespStore, host: str = "127.0.0.1", port: int = 6390) -> asyncio.AbstractServer:
+    async def handle(reader, writer):
+        try:
+            while True:
+                args = await read_command(reader)
+                if not args:
+                    break
+                writer.write(encode(store.execute(args)))
+                await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    return await asyncio.start_server(handle, host, port)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Stand-in server Redis (RESP) untuk test cache")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=6390)
+    parser.add_argument("--max-keys", type=int, default=10000)
+    args = parser.parse_args()
+
+    async def run():
+        server = await start_resp_server(RespStore(args.max_keys), args.host, args.port)
+        print(f"RESP stand-in di {args.host}:{args.port} (max {args.max_keys} key)")
+        async with server:
+            await server.serve_forever()
+
+    asyncio.run(run())
+
+
+if __name__ == "__main__":
+    main()
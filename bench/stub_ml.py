@@ -0,0 +1,141 @@
+# bench/stub_ml.py
+"""
+Stub lokal untuk OCR/ML API (/ocr/, /recommend, /health-score, /predict-dieses)
+dengan latency yang bisa diatur, supaya benchmark tidak tergantung service asli.
+
+Jalankan sendiri:
+    python -m bench.stub_ml --port 9100 --latency-ms 300 --jitter-ms 100
+lalu set BASE_API_URL=http://127.0.0.1:9100 pada app.
+"""
+import argparse
+import asyncio
+import random
+
+from aiohttp import web
+
+from core.capture import upstream_key
+
+OCR_RESULT = {
+    "energi": 210,
+    "protein": 4,
+    "lemak total": 9,
+    "karbohidrat": 28,
+    "serat": 1,
+    "gula": 12,
+    "garam": 160,
+}
+
+
+class StubConfig:
+    """
+    Latency sintetis (gauss latency_ms +- jitter_ms), atau mode replay: ``replay``
+    berisi {(path, key): (status, response, latency_ms)} dari capture produksi
+    (lihat core/capture.py) sehingga respons & latency upstream sama persis.
+    """
+
+    def __init__(self, latency_ms: float = 200, jitter_ms: float = 50, error_rate: float = 0.0, replay: dict | None = None,
+                 capacity: int = 0):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self.replay = replay
+        self.calls = {}
+        self.replay_hits = 0
+        self.replay_misses = 0
+        # capacity > 0: upstream hanya memproses N request bersamaan, sisanya antre (seperti model server)
+        self.capacity = capacity
+        self._slots = None
+        self.queued = 0
+        self.max_queue = 0
+
+    async def respond(self, name: str, key: str, default):
+        self.calls[name] = self.calls.get(name, 0) + 1
+        if self.capacity:
+            if self._slots is None:
+                self._slots = asyncio.Semaphore(self.capacity)
+            self.queued += 1
+            self.max_queue = max(self.max_queue, self.queued)
+            await self._slots.acquire()
+            self.queued -= 1
+            try:
+                return await self._respond(name, key, default)
+            finally:
+                self._slots.release()
+        return await self._respond(name, key, default)
+
+    async def _respond(self, name: str, key: str, default):
+        if self.replay is not None:
+            recorded = self.replay.get((name, key))
+            if recorded is not None:
+                self.replay_hits += 1
+                status, response, latency_ms = recorded
+                await asyncio.sleep(latency_ms / 1000)
+                return web.json_response(response, status=status)
+            self.replay_misses += 1
+        latency = max(0.0, random.gauss(self.latency_ms, self.jitter_ms)) if self.jitter_ms else self.latency_ms
+        await asyncio.sleep(latency / 1000)
+        if self.error_rate and random.random() < self.error_rate:
+            return web.json_response({"detail": "stub error"}, status=503)
+        return web.json_response(default)
+
+
+def make_stub_app(cfg: StubConfig) -> web.Application:
+    async def ocr(request):
+        form = await request.post()
+        field = form.get("file")
+        image_data = field.file.read() if field is not None and hasattr(field, "file") else b""
+        return await cfg.respond("/ocr/", upstream_key(image_data), {"result": OCR_RESULT})
+
+    async def recommend(request):
+        payload = await request.json()
+        return await cfg.respond("/recommend", upstream_key(payload), {
+            "rekomendasi": [
+                {"nutrisi": key, "saran": "Kurangi konsumsi" if val else "Pertahankan"}
+                for key, val in (payload.get("konsumsi") or {}).items()
+            ]
+        })
+
+    async def health_score(request):
+        payload = await request.json()
+        return await cfg.respond("/health-score", upstream_key(payload), {"score": 72.5, "kategori": "Cukup Sehat"})
+
+    async def predict(request):
+        payload = await request.json()
+        return await cfg.respond("/predict-dieses", upstream_key(payload), {"prediksi": [{"penyakit": "Diabetes", "risiko": 0.12}]})
+
+    async def stats(request):
+        return web.json_response({"calls": cfg.calls, "replay_hits": cfg.replay_hits, "replay_misses": cfg.replay_misses,
+                                  "max_queue": cfg.max_queue})
+
+    app = web.Application(client_max_size=20 * 1024 * 1024)
+    app.router.add_post("/ocr/", ocr)
+    app.router.add_post("/recommend", recommend)
+    app.router.add_post("/health-score", health_score)
+    app.router.add_post("/predict-dieses", predict)
+    app.router.add_get("/_stats", stats)
+    return app
+
+
+async def start_stub(cfg: StubConfig, host: str = "127.0.0.1", port: int = 9100) -> web.AppRunner:
+    """Jalankan stub di event loop yang sedang berjalan; panggil ``runner.cleanup()`` untuk berhenti."""
+    runner = web.AppRunner(make_stub_app(cfg), access_log=None)
+    await runner.setup()
+    await web.TCPSite(runner, host, port).start()
+    return runner
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Stub OCR/ML API untuk benchmark")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9100)
+    parser.add_argument("--latency-ms", type=float, default=200)
+    parser.add_argument("--jitter-ms", type=float, default=50)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--capacity", type=int, default=0, help="Request bersamaan yang diproses (0 = tak terbatas)")
+    args = parser.parse_args()
+    cfg = StubConfig(args.latency_ms, args.jitter_ms, args.error_rate, capacity=args.capacity)
+    web.run_app(make_stub_app(cfg), host=args.host, port=args.port, access_log=None)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+# core/archive.py
+"""
+Arsip scan lama: baris images yang lebih tua dari ARCHIVE_AFTER_DAYS dipindah ke tabel
+images_archive dan filenya ke ARCHIVE_DIR, jadi tabel images (+ index) dan folder images/
+tetap kecil untuk query riwayat hari ini / terbaru.
+
+Riwayat yang periodenya menyentuh data arsip dibaca lewat ``scan_select`` (UNION ALL
+images + images_archive); periode yang lebih baru dari batas arsip hanya membaca images.
+"""
+import os
+import shutil
+from datetime import datetime, timedelta
+
+from sqlalchemy import bindparam, delete, func, insert, literal, select, union_all, update
+
+from core import config
+from database import engine
+from models import Image, ImageArchive
+
+# Selisih timezone uploaded_at (jam lokal user) vs batas arsip (UTC) ditutup dengan margin ini
+CUTOFF_MARGIN = timedelta(days=1)
+
+
+def archive_cutoff(now: datetime | None = None) -> datetime:
+    """Scan dengan uploaded_at sebelum batas ini boleh diarsipkan."""
+    return (now or datetime.utcnow()) - timedelta(days=config.ARCHIVE_AFTER_DAYS)
+
+
+def needs_archive(start: datetime | None) -> bool:
+    """Apakah periode mulai ``start`` (None = semua riwayat) bisa berisi baris arsip."""
+    return start is None or start < archive_cutoff() + CUTOFF_MARGIN
+
+
+def scan_select(columns, user_id: int, start: datetime | None = None, end: datetime | None = None, descending: bool = True):
+    """
+    SELECT kolom ``columns`` (nama atribut, misal "filename", "nutrition_json") riwayat scan
+    user dari images, di-UNION ALL dengan images_archive jika periode menyentuh data arsip.
+    Diurutkan menurut uploaded_at ("uploaded_at" harus ada di columns).
+    """
+    def part(model):
+        stmt = select(*(getattr(model, name) for name in columns)).where(model.user_id == user_id)
+        if start is not None:
+            stmt = stmt.where(model.uploaded_at >= start)
+        if end is not None:
+            stmt = stmt.where(model.uploaded_at <= end)
+        return stmt
+
+    stmt = union_all(part(Image), part(ImageArchive)) if needs_archive(start) else part(Image)
+    order = stmt.selected_columns.uploaded_at
+    return stmt.order_by(order.desc() if descending else order)
+
+
+def _move_files(rows, archive_dir: str) -> tuple:
+    """Salin file ke archive_dir. Return ({id: path baru}, file hilang)."""
+    os.makedirs(archive_dir, exist_ok=True)
+    moved, missing = {}, 0
+    for row in rows:
+        if not os.path.isfile(row.filepath):
+            missing += 1
+            continue
+        target = os.path.join(archive_dir, row.filename)
+        shutil.copy2(row.filepath, target)
+        moved[row.id] = target
+    return moved, missing
+
+
+def archive_batch(cutoff: datetime, batch_size: int = config.ARCHIVE_BATCH_SIZE, archive_dir: str = config.ARCHIVE_DIR) -> dict:
+    """
+    Arsipkan satu batch (urut id) scan dengan uploaded_at < cutoff:
+    1. salin file ke archive_dir
+    2. satu transaksi: INSERT .. SELECT ke images_archive, update filepath, DELETE dari images
+    3. hapus file lama
+    Jika langkah 2 gagal, salinan dihapus lagi dan baris tetap di images. Baris dengan id
+    terbesar tidak pernah diarsipkan supaya SQLite tidak memakai ulang id yang sama.
+    """
+    images = Image.__table__
+    archive = ImageArchive.__table__
+    with engine.connect() as conn:
+        max_id = conn.execute(select(func.max(images.c.id))).scalar()
+        rows = conn.execute(
+            select(images.c.id, images.c.filename, images.c.filepath)
+            .where(images.c.uploaded_at < cutoff, images.c.id < (max_id or 0))
+            .order_by(images.c.id).limit(batch_size)
+        ).all()
+    if not rows:
+        return {"rows": 0, "files_moved": 0, "files_missing": 0}
+    ids = [row.id for row in rows]
+    moved, missing = _move_files(rows, archive_dir)
+    try:
+        with engine.begin() as conn:
+            conn.execute(insert(archive).from_select(
+                ["id", "filename", "filepath", "uploaded_at", "user_id", "nutrition_json", "archived_at"],
+                select(images.c.id, images.c.filename, images.c.filepath, images.c.uploaded_at,
+                       images.c.user_id, images.c.nutrition_json, literal(datetime.utcnow()))
+                .where(images.c.id.in_(ids)),
+            ))
+            if moved:
+                conn.execute(
+                    update(archive).where(archive.c.id == bindparam("b_id")).values(filepath=bindparam("b_path")),
+                    [{"b_id": image_id, "b_path": path} for image_id, path in moved.items()],
+                )
+            conn.execute(delete(images).where(images.c.id.in_(ids)))
+    except Exception:
+        for path in moved.values():
+            os.remove(path)
+        raise
+    for row in rows:
+        if row.id in moved:
+            os.remove(row.filepath)
+    return {"rows": len(rows), "files_moved": len(moved), "files_missing": missing}
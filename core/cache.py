@@ -0,0 +1,583 @@
+# core/cache.py
+"""
+Cache pluggable untuk app (hasil OCR, respons ML, profil /me).
+
+Backend dipilih lewat CACHE_BACKEND:
+- "memory": LRU in-process (per worker, paling cepat, hit rate turun jika worker banyak)
+- "sqlite": satu file SQLite (WAL) yang dipakai bersama semua worker di satu node
+- "redis" : server ber-protokol Redis (RESP), dipakai bersama antar node
+- "none"  : cache dimatikan
+
+Semua backend menyimpan bytes (JSON) dengan TTL, dibatasi jumlah entry (LRU) dan
+punya statistik. Kode app memakai ``get_cache(namespace, ttl)`` yang mengembalikan
+view ber-namespace; error backend (mis. Redis mati) hanya dicatat dan dianggap miss.
+"""
+import asyncio
+import logging
+import os
+import queue
+import socket
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from urllib.parse import unquote, urlparse
+
+import orjson
+
+from core import config
+
+logger = logging.getLogger(__name__)
+
+
+class CacheBackend:
+    """Interface backend: key str -> value bytes. ttl dalam detik (None = tanpa kedaluwarsa)."""
+
+    name = "base"
+    shared = False
+
+    def get(self, key: str) -> bytes | None:
+        raise NotImplementedError
+
+    def set(self, key: str, value: bytes, ttl: float | None = None):
+        raise NotImplementedError
+
+    def add(self, key: str, value: bytes, ttl: float | None = None) -> bool:
+        """Set hanya jika key belum ada (atomic). Return True jika berhasil."""
+        raise NotImplementedError
+
+    def delete(self, key: str):
+        raise NotImplementedError
+
+    def clear(self, prefix: str = ""):
+        raise NotImplementedError
+
+    def info(self) -> dict:
+        return {}
+
+    def close(self):
+        pass
+
+
+class NullCache(CacheBackend):
+    name = "none"
+
+    def get(self, key):
+        return None
+
+    def set(self, key, value, ttl=None):
+        pass
+
+    def add(self, key, value, ttl=None):
+        return True
+
+    def delete(self, key):
+        pass
+
+    def clear(self, prefix=""):
+        pass
+
+
+class MemoryCache(CacheBackend):
+    """LRU in-process (OrderedDict + lock, aman dipakai dari threadpool)."""
+
+    name = "memory"
+
+    def __init__(self, max_entries: int = 10000):
+        self.max_entries = max_entries
+        self._data = OrderedDict()  # key -> (expires_at | None, value)
+        self._lock = threading.Lock()
+        self.evictions = 0
+        self.expired = 0
+
+    def _live(self, key, now):
+        item = self._data.get(key)
+        if item is None:
+            return None
+        if item[0] is not None and item[0] <= now:
+            del self._data[key]
+            self.expired += 1
+            return None
+        return item
+
+    def get(self, key):
+        with self._lock:
+            item = self._live(key, time.time())
+            if item is None:
+                return None
+            self._data.move_to_end(key)
+            return item[1]
+
+    def _store(self, key, value, ttl):
+        self._data[key] = (time.time() + ttl if ttl else None, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.max_entries:
+            self._data.popitem(last=False)
+            self.evictions += 1
+
+    def set(self, key, value, ttl=None):
+        with self._lock:
+            self._store(key, value, ttl)
+
+    def add(self, key, value, ttl=None):
+        with self._lock:
+            if self._live(key, time.time()) is not None:
+                return False
+            self._store(key, value, ttl)
+            return True
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self, prefix=""):
+        with self._lock:
+            for key in [k for k in self._data if k.startswith(prefix)]:
+                del self._data[key]
+
+    def info(self):
+        with self._lock:
+            return {
+                "entries": len(self._data),
+                "max_entries": self.max_entries,
+                "evictions": self.evictions,
+                "expired": self.expired,
+            }
+
+
+class SQLiteCache(CacheBackend):
+    """
+    Cache di satu file SQLite (mode WAL) yang dibuka oleh semua worker di node yang sama.
+    Eviction LRU berdasarkan ``accessed_at``; kolom ini hanya di-update jika sudah lebih
+    lama dari TOUCH_INTERVAL_S supaya GET tidak selalu menjadi write.
+    """
+
+    name = "sqlite"
+    shared = True
+    TOUCH_INTERVAL_S = 1.0
+
+    def __init__(self, path: str, max_entries: int = 10000):
+        self.path = path
+        self.max_entries = max_entries
+        self._local = threading.local()
+        self.evictions = 0
+        self.expired = 0
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        with self._conn() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS cache ("
+                "key TEXT PRIMARY KEY, value BLOB NOT NULL, expires_at REAL, accessed_at REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS ix_cache_accessed_at ON cache (accessed_at)")
+            conn.execute("CREATE INDEX IF NOT EXISTS ix_cache_expires_at ON cache (expires_at)")
+
+    def _conn(self) -> sqlite3.Connection:
+        # Satu koneksi per thread per proses (koneksi tidak boleh ikut ter-fork)
+        conn = getattr(self._local, "conn", None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn, self._local.pid = conn, os.getpid()
+        return conn
+
+    def get(self, key):
+        conn = self._conn()
+        row = conn.execute("SELECT value, expires_at, accessed_at FROM cache WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return None
+        value, expires_at, accessed_at = row
+        now = time.time()
+        if expires_at is not None and expires_at <= now:
+            conn.execute("DELETE FROM cache WHERE key = ? AND expires_at <= ?", (key, now))
+            self.expired += 1
+            return None
+        if now - accessed_at > self.TOUCH_INTERVAL_S:
+            conn.execute("UPDATE cache SET accessed_at = ? WHERE key = ?", (now, key))
+        return value
+
+    def _evict(self, conn, now):
+        self.expired += conn.execute("DELETE FROM cache WHERE expires_at <= ?", (now,)).rowcount
+        cur = conn.execute(
+            "DELETE FROM cache WHERE key IN (SELECT key FROM cache ORDER BY accessed_at "
+            "LIMIT max(0, (SELECT COUNT(*) FROM cache) - ?))",
+            (self.max_entries,),
+        )
+        self.evictions += cur.rowcount
+
+    def set(self, key, value, ttl=None):
+        conn = self._conn()
+        now = time.time()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.execute(
+                "INSERT OR REPLACE INTO cache (key, value, expires_at, accessed_at) VALUES (?, ?, ?, ?)",
+                (key, value, now + ttl if ttl else None, now),
+            )
+            self._evict(conn, now)
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    def add(self, key, value, ttl=None):
+        conn = self._conn()
+        now = time.time()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            # Insert, atau timpa hanya jika entry lama sudah kedaluwarsa
+            added = conn.execute(
+                "INSERT INTO cache (key, value, expires_at, accessed_at) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT(key) DO UPDATE SET value = excluded.value, expires_at = excluded.expires_at, "
+                "accessed_at = excluded.accessed_at WHERE cache.expires_at IS NOT NULL AND cache.expires_at <= ?",
+                (key, value, now + ttl if ttl else None, now, now),
+            ).rowcount > 0
+            if added:
+                self._evict(conn, now)
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return added
+
+    def delete(self, key):
+        self._conn().execute("DELETE FROM cache WHERE key = ?", (key,))
+
+    def clear(self, prefix=""):
+        self._conn().execute("DELETE FROM cache WHERE substr(key, 1, ?) = ?", (len(prefix), prefix))
+
+    def info(self):
+        entries = self._conn().execute("SELECT COUNT(*) FROM cache").fetchone()[0]
+        return {
+            "path": self.path,
+            "entries": entries,
+            "max_entries": self.max_entries,
+            # evictions/expired dihitung per worker (yang menjalankan DELETE)
+            "evictions": self.evictions,
+            "expired": self.expired,
+        }
+
+    def close(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+
+class RedisError(Exception):
+    pass
+
+
+class _RespConnection:
+    """Satu koneksi TCP ber-protokol RESP2 (cukup untuk perintah string sederhana)."""
+
+    def __init__(self, host: str, port: int, timeout: float):
+        self.sock = socket.create_connection((host, port), timeout=timeout)
+        self.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self.reader = self.sock.makefile("rb")
+        self.pid = os.getpid()
+
+    def command(self, *args):
+        parts = [b"*%d\r\n" % len(args)]
+        for arg in args:
+            if isinstance(arg, str):
+                arg = arg.encode("utf-8")
+            elif isinstance(arg, (int, float)):
+                arg = str(arg).encode()
+            parts.append(b"$%d\r\n%s\r\n" % (len(arg), arg))
+        self.sock.sendall(b"".join(parts))
+        return self._read_reply()
+
+    def _read_reply(self):
+        line = self.reader.readline()
+        if not line:
+            raise ConnectionError("Koneksi Redis terputus")
+        kind, payload = line[:1], line[1:-2]
+        if kind == b"+":
+            return payload.decode()
+        if kind == b"-":
+            raise RedisError(payload.decode())
+        if kind == b":":
+            return int(payload)
+        if kind == b"$":
+            length = int(payload)
+            if length < 0:
+                return None
+            data = self.reader.read(length + 2)
+            return data[:-2]
+        if kind == b"*":
+            length = int(payload)
+            return None if length < 0 else [self._read_reply() for _ in range(length)]
+        raise RedisError(f"Balasan RESP tidak dikenal: {line!r}")
+
+    def close(self):
+        try:
+            self.reader.close()
+            self.sock.close()
+        except OSError:
+            pass
+
+
+class RedisCache(CacheBackend):
+    """
+    Client Redis minimal (GET/SET PX NX/DEL/SCAN/DBSIZE) dengan pool koneksi blocking.
+    Batas ukuran di Redis diatur server (maxmemory + maxmemory-policy allkeys-lru);
+    ``max_entries`` hanya informasi di stats. Untuk test lokal: ``python -m bench.resp_server``.
+    """
+
+    name = "redis"
+    shared = True
+    # Setelah koneksi gagal, backend dilewati sementara supaya request tidak menunggu connect timeout
+    RETRY_AFTER_S = 5.0
+
+    def __init__(self, url: str, max_entries: int = 10000, pool_size: int = 16, timeout: float = 1.0):
+        parsed = urlparse(url)
+        self.host = parsed.hostname or "127.0.0.1"
+        self.port = parsed.port or 6379
+        self.password = unquote(parsed.password) if parsed.password else None
+        self.db = int(parsed.path.lstrip("/") or 0)
+        self.max_entries = max_entries
+        self.timeout = timeout
+        self._pool = queue.LifoQueue(maxsize=pool_size)
+        self._down_until = 0.0
+
+    def _connect(self) -> _RespConnection:
+        conn = _RespConnection(self.host, self.port, self.timeout)
+        if self.password:
+            conn.command("AUTH", self.password)
+        if self.db:
+            conn.command("SELECT", self.db)
+        return conn
+
+    def _execute(self, *args):
+        if time.monotonic() < self._down_until:
+            raise ConnectionError("Redis tidak tersedia (menunggu retry)")
+        try:
+            try:
+                conn = self._pool.get_nowait()
+                if conn.pid != os.getpid():
+                    conn = self._connect()
+            except queue.Empty:
+                conn = self._connect()
+        except OSError:
+            self._down_until = time.monotonic() + self.RETRY_AFTER_S
+            raise
+        try:
+            result = conn.command(*args)
+        except RedisError:
+            self._release(conn)
+            raise
+        except Exception:
+            conn.close()
+            raise
+        self._release(conn)
+        return result
+
+    def _release(self, conn):
+        try:
+            self._pool.put_nowait(conn)
+        except queue.Full:
+            conn.close()
+
+    def get(self, key):
+        return self._execute("GET", key)
+
+    def set(self, key, value, ttl=None):
+        if ttl:
+            self._execute("SET", key, value, "PX", int(ttl * 1000))
+        else:
+            self._execute("SET", key, value)
+
+    def add(self, key, value, ttl=None):
+        if ttl:
+            return self._execute("SET", key, value, "PX", int(ttl * 1000), "NX") is not None
+        return self._execute("SET", key, value, "NX") is not None
+
+    def delete(self, key):
+        self._execute("DEL", key)
+
+    def clear(self, prefix=""):
+        cursor = b"0"
+        while True:
+            cursor, keys = self._execute("SCAN", cursor, "MATCH", f"{prefix}*", "COUNT", 500)
+            if keys:
+                self._execute("DEL", *keys)
+            if cursor in (b"0", "0"):
+                break
+
+    def info(self):
+        return {"url": f"redis://{self.host}:{self.port}/{self.db}", "entries": self._execute("DBSIZE"),
+                "max_entries": self.max_entries}
+
+    def close(self):
+        while True:
+            try:
+                self._pool.get_nowait().close()
+            except queue.Empty:
+                break
+
+
+class Cache:
+    """
+    View ber-namespace di atas backend: serialisasi JSON (orjson), TTL default dan
+    statistik hit/miss per namespace (per worker). Semua error backend ditelan.
+    """
+
+    def __init__(self, backend: CacheBackend, namespace: str, ttl: float | None = None):
+        self.backend = backend
+        self.namespace = namespace
+        self.prefix = f"{config.CACHE_KEY_PREFIX}{namespace}:"
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.sets = 0
+        self.errors = 0
+
+    def _key(self, key) -> str:
+        return f"{self.prefix}{key}"
+
+    def _failed(self, op: str, e: Exception):
+        self.errors += 1
+        logger.warning(f"[CACHE] {self.backend.name} {op} {self.namespace} gagal: {e}")
+
+    def get(self, key, default=None):
+        try:
+            raw = self.backend.get(self._key(key))
+        except Exception as e:
+            self._failed("get", e)
+            raw = None
+        if raw is None:
+            self.misses += 1
+            return default
+        self.hits += 1
+        return orjson.loads(raw)
+
+    def set(self, key, value, ttl: float | None = None):
+        try:
+            self.backend.set(self._key(key), orjson.dumps(value), ttl if ttl is not None else self.ttl)
+            self.sets += 1
+        except Exception as e:
+            self._failed("set", e)
+
+    def add(self, key, value, ttl: float | None = None) -> bool:
+        """Set hanya jika belum ada. Jika backend error, dianggap gagal (False)."""
+        try:
+            added = self.backend.add(self._key(key), orjson.dumps(value), ttl if ttl is not None else self.ttl)
+        except Exception as e:
+            self._failed("add", e)
+            return False
+        if added:
+            self.sets += 1
+        return added
+
+    def delete(self, key):
+        try:
+            self.backend.delete(self._key(key))
+        except Exception as e:
+            self._failed("delete", e)
+
+    def clear(self):
+        try:
+            self.backend.clear(self.prefix)
+        except Exception as e:
+            self._failed("clear", e)
+
+    # Versi async: backend in-process dipanggil langsung, backend I/O (sqlite/redis) di thread
+    async def aget(self, key, default=None):
+        if not self.backend.shared:
+            return self.get(key, default)
+        return await asyncio.to_thread(self.get, key, default)
+
+    async def aset(self, key, value, ttl: float | None = None):
+        if not self.backend.shared:
+            return self.set(key, value, ttl)
+        return await asyncio.to_thread(self.set, key, value, ttl)
+
+    async def aadd(self, key, value, ttl: float | None = None) -> bool:
+        if not self.backend.shared:
+            return self.add(key, value, ttl)
+        return await asyncio.to_thread(self.add, key, value, ttl)
+
+    async def adelete(self, key):
+        if not self.backend.shared:
+            return self.delete(key)
+        return await asyncio.to_thread(self.delete, key)
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else None,
+            "sets": self.sets,
+            "errors": self.errors,
+            "ttl_s": self.ttl,
+        }
+
+
+_backend = None
+_caches = {}
+_lock = threading.Lock()
+
+
+def create_backend(name: str | None = None) -> CacheBackend:
+    name = (name or config.CACHE_BACKEND).lower()
+    if name == "memory":
+        return MemoryCache(config.CACHE_MAX_ENTRIES)
+    if name == "sqlite":
+        return SQLiteCache(config.CACHE_SQLITE_PATH, config.CACHE_MAX_ENTRIES)
+    if name == "redis":
+        return RedisCache(config.CACHE_REDIS_URL, config.CACHE_MAX_ENTRIES)
+    if name in ("none", "off", ""):
+        return NullCache()
+    raise ValueError(f"CACHE_BACKEND tidak dikenal: {name}")
+
+
+def get_backend() -> CacheBackend:
+    global _backend
+    if _backend is None:
+        with _lock:
+            if _backend is None:
+                _backend = create_backend()
+    return _backend
+
+
+def get_cache(namespace: str, ttl: float | None = None) -> Cache:
+    """Cache ber-namespace (satu instance per namespace per worker)."""
+    cache = _caches.get(namespace)
+    if cache is None:
+        backend = get_backend()  # di luar _lock: get_backend juga mengambil _lock
+        with _lock:
+            cache = _caches.setdefault(namespace, Cache(backend, namespace, ttl))
+    return cache
+
+
+def cache_stats() -> dict:
+    backend = get_backend()
+    try:
+        info = backend.info()
+    except Exception as e:
+        info = {"error": str(e)}
+    return {
+        "backend": backend.name,
+        "pid": os.getpid(),
+        **info,
+        "namespaces": {name: cache.stats() for name, cache in sorted(_caches.items())},
+    }
+
+
+def warm_cache() -> dict:
+    """Buat backend (file SQLite / koneksi Redis) saat startup; gagal tidak menghalangi ready."""
+    backend = get_backend()
+    try:
+        return {"backend": backend.name, **backend.info()}
+    except Exception as e:
+        logger.warning(f"[STARTUP] Cache {backend.name} belum bisa dipakai: {e}")
+        return {"backend": backend.name, "error": str(e)}
+
+
+def close_cache():
+    global _backend
+    if _backend is not None:
+        _backend.close()
@@ -0,0 +1,291 @@
+# core/capture.py
+"""
+Capture traffic produksi untuk replay deterministik (lihat bench/replay.py).
+
+Setiap request dicatat sebagai satu baris JSON di ``CAPTURE_DIR/capture.ndjson``
+(di-rotate per ukuran, file lama di-gzip). Penulisan dilakukan thread background
+supaya event loop tidak pernah menunggu disk.
+
+Redaksi:
+- header Authorization tidak pernah disimpan; yang disimpan hanya claims JWT
+  (tanpa nama/exp) supaya replay bisa membuat token baru untuk user yang sama
+- field password/token/secret di body JSON dan query string diganti ``***``
+- email di body diganti pseudonim (hash) yang konsisten
+- file di body multipart (upload gambar) dan body binary lain disimpan sekali di
+  ``blobs/<sha256>`` dan direferensikan lewat hash
+
+Respons OCR/ML juga dicatat (``record_upstream``) dengan key hash dari request-nya,
+sehingga stub saat replay bisa mengembalikan respons yang sama persis.
+"""
+import contextvars
+import email.policy
+import gzip
+import hashlib
+import json
+import logging
+import os
+import queue
+import shutil
+import threading
+import time
+import uuid
+from email.parser import BytesParser
+from urllib.parse import parse_qsl, urlencode
+
+import jwt
+
+from core import config
+from core.log import get_request_id
+
+logger = logging.getLogger(__name__)
+
+REDACT_KEYS = {"password", "token", "secret", "access_token", "refresh_token"}
+PSEUDONYM_KEYS = {"email"}
+DROP_CLAIMS = {"nama", "exp", "iat"}
+KEEP_HEADERS = {b"content-type", b"idempotency-key", b"user-agent"}
+
+CAPTURE_FILE = "capture.ndjson"
+
+_request_id = contextvars.ContextVar("capture_request_id", default=None)
+
+
+def canonical_json(obj) -> bytes:
+    return json.dumps(obj, sort_keys=True, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+
+
+def upstream_key(data) -> str:
+    """Key untuk mencocokkan request upstream saat capture dan replay (bytes atau objek JSON)."""
+    if not isinstance(data, (bytes, bytearray)):
+        data = canonical_json(data)
+    return hashlib.sha256(data).hexdigest()
+
+
+def pseudonymize(value: str) -> str:
+    return f"user-{hashlib.sha256(value.strip().lower().encode()).hexdigest()[:16]}@replay.invalid"
+
+
+def redact(obj):
+    if isinstance(obj, dict):
+        out = {}
+        for k, v in obj.items():
+            key = str(k).lower()
+            if key in REDACT_KEYS:
+                out[k] = "***"
+            elif key in PSEUDONYM_KEYS and isinstance(v, str):
+                out[k] = pseudonymize(v)
+            else:
+                out[k] = redact(v)
+        return out
+    if isinstance(obj, list):
+        return [redact(v) for v in obj]
+    return obj
+
+
+def _redact_query(query: str) -> str:
+    if not query:
+        return ""
+    pairs = parse_qsl(query, keep_blank_values=True)
+    return urlencode([(k, "***" if k.lower() in REDACT_KEYS else v) for k, v in pairs])
+
+
+def _token_claims(headers: dict) -> dict | None:
+    auth = headers.get(b"authorization", b"").decode("latin-1")
+    if not auth.lower().startswith("bearer "):
+        return None
+    try:
+        claims = jwt.decode(auth[7:], options={"verify_signature": False})
+    except Exception:
+        return {"invalid": True}
+    return {k: v for k, v in claims.items() if k not in DROP_CLAIMS}
+
+
+class CaptureWriter(threading.Thread):
+    """Thread penulis: append NDJSON, rotate per ukuran (gzip), simpan blob per hash."""
+
+    def __init__(self, directory: str, max_bytes: int, backup_count: int):
+        super().__init__(name="capture-writer", daemon=True)
+        self.directory = directory
+        self.blob_dir = os.path.join(directory, "blobs")
+        self.max_bytes = max_bytes
+        self.backup_count = backup_count
+        self.queue = queue.Queue(maxsize=10000)
+        self.dropped = 0
+        os.makedirs(self.blob_dir, exist_ok=True)
+        self.path = os.path.join(directory, CAPTURE_FILE)
+        self._file = open(self.path, "ab")
+
+    def put(self, item):
+        try:
+            self.queue.put_nowait(item)
+        except queue.Full:
+            # Lebih baik kehilangan record capture daripada memperlambat request
+            self.dropped += 1
+
+    def _rotate(self):
+        self._file.close()
+        for i in range(self.backup_count - 1, 0, -1):
+            src = f"{self.path}.{i}.gz"
+            if os.path.exists(src):
+                os.replace(src, f"{self.path}.{i + 1}.gz")
+        with open(self.path, "rb") as src, gzip.open(f"{self.path}.1.gz", "wb") as dst:
+            shutil.copyfileobj(src, dst)
+        self._file = open(self.path, "wb")
+
+    def run(self):
+        while True:
+            kind, payload = self.queue.get()
+            try:
+                if kind == "blob":
+                    sha, data = payload
+                    path = os.path.join(self.blob_dir, sha)
+                    if not os.path.exists(path):
+                        with open(path + ".tmp", "wb") as f:
+                            f.write(data)
+                        os.replace(path + ".tmp", path)
+                else:
+                    self._file.write(json.dumps(payload, separators=(",", ":"), ensure_ascii=False, default=str).encode("utf-8") + b"\n")
+                    if self.queue.empty():
+                        self._file.flush()
+                    if self._file.tell() >= self.max_bytes:
+                        self._rotate()
+            except Exception as e:
+                logger.error(f"[CAPTURE] Gagal menulis capture: {e}")
+
+
+_writer = None
+_writer_lock = threading.Lock()
+
+
+def _get_writer() -> CaptureWriter:
+    global _writer
+    if _writer is None:
+        with _writer_lock:
+            if _writer is None:
+                _writer = CaptureWriter(config.CAPTURE_DIR, config.CAPTURE_MAX_FILE_BYTES, config.CAPTURE_BACKUP_COUNT)
+                _writer.start()
+    return _writer
+
+
+def record_upstream(kind: str, key: str, response, latency_ms: float, status: int = 200):
+    """Catat respons OCR/ML untuk replay. No-op jika capture tidak aktif."""
+    if not config.CAPTURE_ENABLED:
+        return
+    _get_writer().put(("record", {
+        "type": "upstream",
+        "t": time.time(),
+        "request_id": _request_id.get(),
+        "kind": kind,
+        "key": key,
+        "status": status,
+        "latency_ms": round(latency_ms, 2),
+        "response": response,
+    }))
+
+
+def _store_blob(data: bytes) -> str:
+    sha = hashlib.sha256(data).hexdigest()
+    _get_writer().put(("blob", (sha, bytes(data))))
+    return sha
+
+
+def _encode_multipart(body: bytes, content_type: str) -> list:
+    """Pecah multipart jadi field teks (diredaksi) dan file (disimpan sebagai blob per hash)."""
+    msg = BytesParser(policy=email.policy.HTTP).parsebytes(
+        b"Content-Type: " + content_type.encode("latin-1") + b"\r\n\r\n" + body
+    )
+    parts = []
+    for part in msg.iter_parts():
+        name = part.get_param("name", header="content-disposition")
+        data = part.get_payload(decode=True) or b""
+        filename = part.get_filename()
+        if filename is not None:
+            parts.append({"name": name, "filename": filename, "content_type": part.get_content_type(), "sha256": _store_blob(data)})
+        else:
+            value = data.decode("utf-8", "replace")
+            parts.append({"name": name, "value": "***" if str(name).lower() in REDACT_KEYS else value})
+    return parts
+
+
+def _encode_body(body: bytes, content_type: str, truncated: bool) -> dict:
+    if not body:
+        return {}
+    if truncated:
+        return {"body_truncated": True, "body_size": len(body)}
+    if content_type.startswith("multipart/form-data"):
+        try:
+            return {"multipart": _encode_multipart(body, content_type)}
+        except Exception:
+            pass
+    if content_type.startswith("application/json") and len(body) <= config.CAPTURE_MAX_INLINE_BODY:
+        try:
+            return {"body": redact(json.loads(body))}
+        except ValueError:
+            pass
+    if content_type.startswith("application/json"):
+        try:
+            body = canonical_json(redact(json.loads(body)))
+        except ValueError:
+            pass
+    return {"body_sha256": _store_blob(body), "body_size": len(body)}
+
+
+class CaptureMiddleware:
+    """ASGI middleware pencatat request; pass-through jika CAPTURE_ENABLED mati."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not config.CAPTURE_ENABLED:
+            return await self.app(scope, receive, send)
+
+        # Sama dengan request_id di log (RequestIdMiddleware) supaya bisa dikorelasikan
+        request_id = get_request_id() or uuid.uuid4().hex[:16]
+        token = _request_id.set(request_id)
+        chunks = []
+        size = 0
+        truncated = False
+        status = {"code": None}
+        t_wall = time.time()
+        t0 = time.perf_counter()
+
+        async def receive_wrapper():
+            nonlocal size, truncated
+            message = await receive()
+            if message["type"] == "http.request" and not truncated:
+                body = message.get("body", b"")
+                size += len(body)
+                if size > config.CAPTURE_MAX_BLOB_BYTES:
+                    truncated = True
+                    chunks.clear()
+                else:
+                    chunks.append(body)
+            return message
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive_wrapper, send_wrapper)
+        finally:
+            _request_id.reset(token)
+            try:
+                headers = dict(scope.get("headers", []))
+                record = {
+                    "type": "request",
+                    "t": t_wall,
+                    "request_id": request_id,
+                    "method": scope["method"],
+                    "path": scope["path"],
+                    "query": _redact_query(scope.get("query_string", b"").decode("latin-1")),
+                    "headers": {k.decode(): v.decode("latin-1") for k, v in headers.items() if k in KEEP_HEADERS},
+                    "claims": _token_claims(headers),
+                    "status": status["code"],
+                    "latency_ms": round((time.perf_counter() - t0) * 1000, 2),
+                }
+                record.update(_encode_body(b"".join(chunks), headers.get(b"content-type", b"").decode("latin-1"), truncated))
+                _get_writer().put(("record", record))
+            except Exception as e:
+                logger.error(f"[CAPTURE] Gagal mencatat request: {e}")
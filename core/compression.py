@@ -0,0 +1,147 @@
+# core/compression.py
+"""
+Kompresi transparan untuk kolom JSON besar (nutrition_json, rekomendasi_json).
+
+Format nilai tersimpan (BLOB):
+- diawali MARKER (b"\\x00") + 1 byte codec + 1 byte versi, lalu data terkompresi
+    codec b"z": raw deflate (zlib); versi = id preset dictionary (0 = tanpa dictionary)
+    codec b"s": zstd (butuh paket ``zstandard``); versi 0
+- tanpa marker: teks UTF-8 apa adanya (data lama, atau nilai kecil yang tidak mengecil
+  jika dikompresi). JSON tidak pernah diawali byte 0, jadi tidak ambigu.
+
+Isi preset dictionary TIDAK boleh diubah setelah dipakai; tambahkan versi baru saja.
+"""
+import logging
+import zlib
+
+from sqlalchemy import LargeBinary
+from sqlalchemy.ext.hybrid import hybrid_property
+from sqlalchemy.types import TypeDecorator
+
+from core import config
+
+try:
+    import zstandard
+except ImportError:  # opsional
+    zstandard = None
+
+logger = logging.getLogger(__name__)
+
+MARKER = b"\x00"
+CODEC_ZLIB = b"z"
+CODEC_ZSTD = b"s"
+
+# Potongan teks yang sering muncul di JSON hasil OCR / rekomendasi ML (yang paling sering di akhir)
+ZLIB_DICTS = {
+    1: (
+        b'{"rekomendasi": [{"nutrisi": "saran": "Kurangi konsumsi", "Pertahankan", "detail": '
+        b'"kategori": "score": "prediksi": "penyakit": "risiko": null, '
+        b'{"energi": , "protein": , "lemak total": , "karbohidrat": , "serat": , "gula": , "garam": }'
+    ),
+}
+ZLIB_DICT_VERSION = 1
+
+# Kolom BLOB cukup besar untuk rekomendasi ML (MySQL: MEDIUMBLOB)
+BLOB_LENGTH = 16 * 1024 * 1024 - 1
+
+
+def _zlib_compress(data: bytes, level: int) -> bytes:
+    zdict = ZLIB_DICTS[ZLIB_DICT_VERSION]
+    c = zlib.compressobj(level, zlib.DEFLATED, -15, 9, zlib.Z_DEFAULT_STRATEGY, zdict)
+    return MARKER + CODEC_ZLIB + bytes([ZLIB_DICT_VERSION]) + c.compress(data) + c.flush()
+
+
+def _zstd_compress(data: bytes, level: int) -> bytes:
+    return MARKER + CODEC_ZSTD + b"\x00" + zstandard.ZstdCompressor(level=level).compress(data)
+
+
+def active_codec() -> str:
+    codec = config.COMPRESSION_CODEC
+    if codec == "zstd" and zstandard is None:
+        logger.warning("COMPRESSION_CODEC=zstd tapi paket zstandard tidak ter-install; pakai zlib")
+        return "zlib"
+    return codec
+
+
+def compress_text(value, codec: str | None = None, level: int | None = None) -> bytes | None:
+    """str/bytes JSON -> bytes tersimpan. Nilai yang sudah terkompresi dikembalikan apa adanya."""
+    if value is None:
+        return None
+    data = value.encode("utf-8") if isinstance(value, str) else bytes(value)
+    if data[:1] == MARKER:
+        return data
+    codec = codec or active_codec()
+    if codec == "none" or not data:
+        return data
+    if codec == "zstd":
+        packed = _zstd_compress(data, level or 3)
+    else:
+        packed = _zlib_compress(data, level or config.COMPRESSION_LEVEL)
+    # Nilai yang sangat kecil bisa jadi lebih besar setelah diberi header
+    return packed if len(packed) < len(data) else data
+
+
+def decompress_bytes(value) -> bytes | None:
+    """Bytes tersimpan (terkompresi atau teks lama) -> bytes UTF-8 JSON."""
+    if value is None:
+        return None
+    if isinstance(value, str):
+        return value.encode("utf-8")
+    value = bytes(value)
+    if value[:1] != MARKER:
+        return value
+    codec, version, payload = value[1:2], value[2], value[3:]
+    if codec == CODEC_ZLIB:
+        d = zlib.decompressobj(-15, ZLIB_DICTS[version]) if version else zlib.decompressobj(-15)
+        return d.decompress(payload) + d.flush()
+    if codec == CODEC_ZSTD:
+        if zstandard is None:
+            raise RuntimeError("Data terkompresi zstd tapi paket zstandard tidak ter-install")
+        return zstandard.ZstdDecompressor().decompress(payload)
+    raise ValueError(f"Codec kompresi tidak dikenal: {codec!r}")
+
+
+def decompress_text(value) -> str | None:
+    if isinstance(value, str) or value is None:
+        return value
+    return decompress_bytes(value).decode("utf-8")
+
+
+def is_compressed(value) -> bool:
+    return isinstance(value, (bytes, bytearray, memoryview)) and bytes(value[:1]) == MARKER
+
+
+class CompressedText(TypeDecorator):
+    """
+    Kolom BLOB berisi teks terkompresi. Kompresi saat write; saat read nilai mentah
+    dikembalikan apa adanya dan baru di-dekompresi ketika dipakai (lihat ``compressed_property``,
+    ``core.responses.json_fragment``), jadi baris yang kolomnya tidak dibaca tidak ikut didekompresi.
+    """
+
+    impl = LargeBinary(length=BLOB_LENGTH)
+    cache_ok = True
+
+    def process_bind_param(self, value, dialect):
+        return compress_text(value)
+
+    def process_result_value(self, value, dialect):
+        return value
+
+
+def compressed_property(raw_attr: str) -> hybrid_property:
+    """
+    Atribut teks di model untuk kolom CompressedText ``raw_attr``: getter mendekompresi
+    (lazy, saat diakses), setter menyimpan teks (dikompresi saat flush). Di level class
+    (query) mengacu ke kolom mentah.
+    """
+    def getter(self):
+        return decompress_text(getattr(self, raw_attr))
+
+    def setter(self, value):
+        setattr(self, raw_attr, value)
+
+    def expression(cls):
+        # Label = nama atribut publik supaya row hasil query bisa diakses dengan row.<nama>
+        return getattr(cls, raw_attr).label(raw_attr.lstrip("_"))
+
+    return hybrid_property(getter, setter, expr=expression)
@@ -1,6 +1,164 @@
 # core/config.py
 import os
 
+BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
 IMAGE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'static', 'images'))
 
+# Folder penyimpanan file upload (di-mount ke /images)
+UPLOAD_DIR = os.path.abspath(os.environ.get("UPLOAD_DIR", os.path.join(BASE_DIR, 'images')))
+
+
+def env_bool(name: str, default: bool = False) -> bool:
+    """Baca env var boolean ("1", "true", "yes", "on")."""
+    val = os.environ.get(name)
+    if val is None:
+        return default
+    return val.strip().lower() in ("1", "true", "yes", "on")
+
+
+# --- Profiling per-request (opt-in) ---
+# Header X-Profile harus berisi token bertanda tangan (lihat core/profiling.py).
+# Kosongkan PROFILE_SECRET untuk mematikan profiling via header.
+PROFILE_SECRET = os.environ.get("PROFILE_SECRET", "")
+# Fraksi request yang diprofile secara acak (0 = mati, 0.01 = 1%)
+PROFILE_SAMPLE_RATE = float(os.environ.get("PROFILE_SAMPLE_RATE", "0"))
+# "sample" (stack sampling, ikut thread pool) atau "cprofile" (thread event loop saja)
+PROFILE_MODE = os.environ.get("PROFILE_MODE", "sample")
+PROFILE_SAMPLE_INTERVAL_MS = float(os.environ.get("PROFILE_SAMPLE_INTERVAL_MS", "5"))
+PROFILE_DIR = os.environ.get("PROFILE_DIR", os.path.join(BASE_DIR, 'profiles'))
+# Statement yang sama dieksekusi >= N kali dalam satu request ditandai sebagai N+1
+PROFILE_REPEAT_THRESHOLD = int(os.environ.get("PROFILE_REPEAT_THRESHOLD", "5"))
+
+# --- Capture traffic produksi (untuk replay) ---
+CAPTURE_ENABLED = env_bool("CAPTURE_ENABLED")
+CAPTURE_DIR = os.environ.get("CAPTURE_DIR", os.path.join(BASE_DIR, 'captures'))
+CAPTURE_MAX_FILE_BYTES = int(os.environ.get("CAPTURE_MAX_FILE_BYTES", str(50 * 1024 * 1024)))
+CAPTURE_BACKUP_COUNT = int(os.environ.get("CAPTURE_BACKUP_COUNT", "20"))
+# Body JSON lebih kecil dari ini disimpan inline, selebihnya (dan semua body binary) sebagai blob
+CAPTURE_MAX_INLINE_BODY = int(os.environ.get("CAPTURE_MAX_INLINE_BODY", str(16 * 1024)))
+CAPTURE_MAX_BLOB_BYTES = int(os.environ.get("CAPTURE_MAX_BLOB_BYTES", str(20 * 1024 * 1024)))
+
+# --- Tracing per request (core/tracing.py) ---
+TRACING_ENABLED = env_bool("TRACING_ENABLED", True)
+# Trace dengan total >= ini ditulis ke TRACE_DIR/traces.ndjson (0 = semua, negatif = tidak ada)
+TRACE_SLOW_MS = float(os.environ.get("TRACE_SLOW_MS", "2000"))
+TRACE_DIR = os.environ.get("TRACE_DIR", os.path.join(BASE_DIR, 'traces'))
+TRACE_MAX_FILE_BYTES = int(os.environ.get("TRACE_MAX_FILE_BYTES", str(50 * 1024 * 1024)))
+TRACE_BACKUP_COUNT = int(os.environ.get("TRACE_BACKUP_COUNT", "5"))
+# Detail span per trace dibatasi (total per jenis span di Server-Timing tetap dihitung)
+TRACE_MAX_SPANS = int(os.environ.get("TRACE_MAX_SPANS", "200"))
+
+# --- Logging (core/log.py) ---
+LOG_LEVEL = os.environ.get("LOG_LEVEL", "INFO").upper()
+# "json" (satu objek per baris, default) atau "text" (dev)
+LOG_FORMAT = os.environ.get("LOG_FORMAT", "json")
+# Log yang tidak muat di queue dibuang (tidak pernah memblokir request)
+LOG_QUEUE_SIZE = int(os.environ.get("LOG_QUEUE_SIZE", "10000"))
+# Body request/response OCR/ML di log; mati = body tidak pernah ditulis (produksi)
+LOG_PAYLOADS = env_bool("LOG_PAYLOADS")
+LOG_PAYLOAD_SAMPLE_RATE = float(os.environ.get("LOG_PAYLOAD_SAMPLE_RATE", "0.01"))
+LOG_PAYLOAD_MAX_BYTES = int(os.environ.get("LOG_PAYLOAD_MAX_BYTES", "2048"))
+
+# --- Startup & readiness ---
+# "check": cocokkan revisi Alembic di DB dengan head (default, jalankan `alembic upgrade head`)
+# "create": Base.metadata.create_all saat startup (dev / benchmark)
+DB_SCHEMA_MODE = os.environ.get("DB_SCHEMA_MODE", "check")
+# Jumlah koneksi DB yang dibuka saat warm-up (default = pool_size engine)
+DB_POOL_WARM = int(os.environ.get("DB_POOL_WARM", "0"))
+STARTUP_RETRY_MAX_S = float(os.environ.get("STARTUP_RETRY_MAX_S", "30"))
+
+# --- Pool koneksi DB (per worker) ---
+DB_POOL_SIZE = int(os.environ.get("DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW = int(os.environ.get("DB_MAX_OVERFLOW", "10"))
+# Lama menunggu koneksi kosong sebelum error (detik)
+DB_POOL_TIMEOUT_S = float(os.environ.get("DB_POOL_TIMEOUT_S", "30"))
+# Koneksi yang lebih tua dari ini dibuka ulang (MySQL memutus koneksi idle setelah wait_timeout)
+DB_POOL_RECYCLE_S = int(os.environ.get("DB_POOL_RECYCLE_S", "1800"))
+
+# --- Read replica (lihat core/replica.py) ---
+# URL replica dipisah koma; kosong = semua query ke DATABASE_URL
+DATABASE_REPLICA_URLS = [u.strip() for u in os.environ.get("DATABASE_REPLICA_URLS", "").split(",") if u.strip()]
+# Setelah user menulis, bacaannya tetap ke primary selama ini (>= DB_REPLICA_MAX_LAG_S)
+DB_REPLICA_STICKY_S = float(os.environ.get("DB_REPLICA_STICKY_S", "10"))
+# Replica yang lag-nya di atas ini atau gagal di-ping dilewati sampai cek berikutnya
+DB_REPLICA_MAX_LAG_S = float(os.environ.get("DB_REPLICA_MAX_LAG_S", "5"))
+DB_REPLICA_CHECK_S = float(os.environ.get("DB_REPLICA_CHECK_S", "5"))
+
+# --- HTTP client ke OCR/ML API (satu session bersama per worker) ---
+UPSTREAM_TIMEOUT_S = float(os.environ.get("UPSTREAM_TIMEOUT_S", "300"))
+UPSTREAM_POOL_LIMIT = int(os.environ.get("UPSTREAM_POOL_LIMIT", "100"))
+UPSTREAM_WARM_TIMEOUT_S = float(os.environ.get("UPSTREAM_WARM_TIMEOUT_S", "3"))
+
+# --- Cache (lihat core/cache.py) ---
+# "memory" (per worker), "sqlite" (file bersama semua worker di node), "redis", atau "none"
+CACHE_BACKEND = os.environ.get("CACHE_BACKEND", "memory")
+CACHE_MAX_ENTRIES = int(os.environ.get("CACHE_MAX_ENTRIES", "10000"))
+CACHE_SQLITE_PATH = os.environ.get("CACHE_SQLITE_PATH", os.path.join(BASE_DIR, 'cache', 'cache.sqlite3'))
+CACHE_REDIS_URL = os.environ.get("CACHE_REDIS_URL", "redis://127.0.0.1:6379/0")
+CACHE_KEY_PREFIX = os.environ.get("CACHE_KEY_PREFIX", "packfact:")
+# TTL per cache (detik)
+CACHE_TTL_OCR_S = float(os.environ.get("CACHE_TTL_OCR_S", str(7 * 24 * 3600)))
+CACHE_TTL_ML_S = float(os.environ.get("CACHE_TTL_ML_S", "3600"))
+CACHE_TTL_PROFILE_S = float(os.environ.get("CACHE_TTL_PROFILE_S", "300"))
+
+# --- Rate limit & admission control (lihat core/ratelimit.py) ---
+SECRET_KEY = os.environ.get("SECRET_KEY", "secretkey123")
+RATE_LIMIT_ENABLED = env_bool("RATE_LIMIT_ENABLED", True)
+# route=jumlah/detik (per user per worker); route tanpa entry tidak dibatasi
+RATE_LIMITS = os.environ.get("RATE_LIMITS", "upload=20/60,recommendation=30/60,predict=30/60,health_scoring=30/60,dashboard=30/60")
+# Panggilan OCR/ML bersamaan per worker (0 = tanpa batas) dan panjang antrean sebelum ditolak 503
+UPSTREAM_MAX_INFLIGHT = int(os.environ.get("UPSTREAM_MAX_INFLIGHT", "32"))
+UPSTREAM_MAX_QUEUE = int(os.environ.get("UPSTREAM_MAX_QUEUE", "64"))
+UPSTREAM_QUEUE_TIMEOUT_S = float(os.environ.get("UPSTREAM_QUEUE_TIMEOUT_S", "10"))
+# POST /dashboard: batas tunggu per bagian ML; yang lebih lambat dikembalikan "timeout"
+# (panggilannya tetap diselesaikan di background dan masuk cache ML untuk refresh berikutnya)
+DASHBOARD_SECTION_TIMEOUT_S = float(os.environ.get("DASHBOARD_SECTION_TIMEOUT_S", "8"))
+# /health-scoring: jika ML health-score belum menjawab dalam budget ini (atau error 5xx),
+# kembalikan skor lokal (nutrition_engine.health_scores) bertanda "approximate"
+HEALTH_SCORE_HEDGE_ENABLED = env_bool("HEALTH_SCORE_HEDGE_ENABLED", True)
+HEALTH_SCORE_BUDGET_S = float(os.environ.get("HEALTH_SCORE_BUDGET_S", "2"))
+
+# --- Kompresi kolom JSON (nutrition_json, rekomendasi_json) ---
+# "zlib" (default, dengan preset dictionary), "zstd" (butuh paket zstandard) atau "none"
+COMPRESSION_CODEC = os.environ.get("COMPRESSION_CODEC", "zlib")
+COMPRESSION_LEVEL = int(os.environ.get("COMPRESSION_LEVEL", "6"))
+
+# Export riwayat (GET /export): jumlah baris per batch dari server-side cursor
+EXPORT_BATCH_SIZE = int(os.environ.get("EXPORT_BATCH_SIZE", "1000"))
+
+# Arsip scan lama (python -m scripts.archive_scans): scan lebih tua dari ARCHIVE_AFTER_DAYS
+# dipindah ke tabel images_archive dan filenya ke ARCHIVE_DIR (di-mount ke /images-archive)
+ARCHIVE_AFTER_DAYS = int(os.environ.get("ARCHIVE_AFTER_DAYS", "180"))
+ARCHIVE_DIR = os.path.abspath(os.environ.get("ARCHIVE_DIR", os.path.join(BASE_DIR, 'images_archive')))
+ARCHIVE_BATCH_SIZE = int(os.environ.get("ARCHIVE_BATCH_SIZE", "500"))
+
+# --- Mode SQLite (DATABASE_URL=sqlite:///path/ke/packfact.db) ---
+# Pragma per koneksi: WAL + synchronous=NORMAL (aman dari korupsi, commit tanpa fsync per transaksi)
+SQLITE_SYNCHRONOUS = os.environ.get("SQLITE_SYNCHRONOUS", "NORMAL")
+# Lama menunggu lock tulis sebelum "database is locked"
+SQLITE_BUSY_TIMEOUT_MS = int(os.environ.get("SQLITE_BUSY_TIMEOUT_MS", "5000"))
+# Page cache per koneksi (KB) dan memory-mapped I/O (MB, 0 = mati)
+SQLITE_CACHE_SIZE_KB = int(os.environ.get("SQLITE_CACHE_SIZE_KB", "16384"))
+SQLITE_MMAP_SIZE_MB = int(os.environ.get("SQLITE_MMAP_SIZE_MB", "256"))
+
+# --- Deteksi foto label hampir sama (core/phash.py, butuh Pillow) ---
+# Upload yang dHash-nya berjarak Hamming <= PHASH_MAX_DISTANCE (dari 64 bit) dari scan
+# sebelumnya milik user yang sama memakai ulang hasil OCR scan tersebut
+PHASH_ENABLED = env_bool("PHASH_ENABLED", True)
+PHASH_MAX_DISTANCE = int(os.environ.get("PHASH_MAX_DISTANCE", "8"))
+# Jumlah scan terbaru per user di index, dan jumlah user yang index-nya disimpan per worker
+PHASH_RECENT_SCANS = int(os.environ.get("PHASH_RECENT_SCANS", "500"))
+PHASH_INDEX_MAX_USERS = int(os.environ.get("PHASH_INDEX_MAX_USERS", "10000"))
+
+# --- Idempotency-Key untuk /upload/ dan /recommendation/save (core/idempotency.py) ---
+IDEMPOTENCY_ENABLED = env_bool("IDEMPOTENCY_ENABLED", True)
+# Lama response pertama disimpan untuk di-replay ke retry dengan key yang sama
+IDEMPOTENCY_TTL_S = float(os.environ.get("IDEMPOTENCY_TTL_S", str(24 * 3600)))
+# Tanda "sedang diproses" kedaluwarsa setelah ini (worker mati di tengah request)
+IDEMPOTENCY_LOCK_TTL_S = float(os.environ.get("IDEMPOTENCY_LOCK_TTL_S", str(UPSTREAM_TIMEOUT_S + 30)))
+# Request duplikat menunggu request pertama selesai paling lama ini, lalu 409
+IDEMPOTENCY_WAIT_S = float(os.environ.get("IDEMPOTENCY_WAIT_S", "60"))
+IDEMPOTENCY_MAX_BODY_BYTES = int(os.environ.get("IDEMPOTENCY_MAX_BODY_BYTES", str(1024 * 1024)))
+
 # Tambahkan config lain jika perlu
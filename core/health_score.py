@@ -0,0 +1,126 @@
+# core/health_score.py
+"""
+Hedge untuk ML health-score (``/health-scoring`` dan bagian ``health_score`` di /dashboard).
+
+Skor lokal dihitung dulu dari payload (``perbandingan`` hasil compare_nutrition, atau
+``kandungan_gizi``/``konsumsi`` + ``kebutuhan_harian``/``target_harian`` dari nutrition.csv)
+dengan ``nutrition_engine.health_scores``, lalu ML dipanggil:
+- ML menjawab dalam HEALTH_SCORE_BUDGET_S -> respons ML dikembalikan apa adanya
+- lebih lambat, atau error 5xx / upstream penuh -> skor lokal dengan ``"approximate": true``
+  (``"sumber": "lokal"``); panggilan ML yang lambat tetap diselesaikan di background (masuk
+  cache ML)
+
+Setiap kali skor ML didapat, selisihnya dengan skor lokal dicatat (``hedge.stats()`` di
+/readyz?verbose=true) untuk menilai / menyetel bobot skor lokal. Payload yang tidak dikenali
+atau tanpa kebutuhan harian langsung diteruskan ke ML seperti sebelumnya.
+"""
+import asyncio
+import logging
+from collections import deque
+from functools import partial
+
+import numpy as np
+from fastapi import HTTPException
+
+from core import config
+from nutrition_engine import health_category, health_scores, intake_vector, requirement_vector
+from utils import proxy_ml_api
+
+logger = logging.getLogger(__name__)
+
+
+def payload_vectors(payload) -> tuple | None:
+    """(intake, requirement) vektor (7,) dari payload health-score, atau None jika tidak dikenali."""
+    if not isinstance(payload, dict):
+        return None
+    items = payload.get("perbandingan")
+    if isinstance(items, list):
+        intake, requirement = {}, {}
+        for item in items:
+            if isinstance(item, dict):
+                key = str(item.get("label", "")).lower().replace("_", " ")
+                intake[key], requirement[key] = item.get("hasil_ocr"), item.get("kebutuhan_harian")
+    else:
+        intake = payload.get("kandungan_gizi") or payload.get("konsumsi")
+        requirement = payload.get("kebutuhan_harian") or payload.get("target_harian")
+    if not isinstance(intake, dict) or not isinstance(requirement, dict):
+        return None
+    return intake_vector(intake), requirement_vector(requirement)
+
+
+def local_health_score(payload) -> dict | None:
+    vectors = payload_vectors(payload)
+    if vectors is None:
+        return None
+    score = float(health_scores(*vectors)[0])
+    if np.isnan(score):
+        return None
+    return {"score": round(score, 1), "kategori": health_category(score)}
+
+
+class HealthScoreHedge:
+    def __init__(self, window: int = 1000):
+        self.counts = {"remote": 0, "local_timeout": 0, "local_error": 0, "remote_only": 0}
+        self.compared = 0
+        self.same_category = 0
+        self.abs_diffs = deque(maxlen=window)  # selisih |lokal - ML| terakhir
+        self._background = set()
+
+    async def score(self, url: str, payload) -> dict:
+        local = local_health_score(payload) if config.HEALTH_SCORE_HEDGE_ENABLED else None
+        if local is None:
+            self.counts["remote_only"] += 1
+            return await proxy_ml_api(url, payload)
+        task = asyncio.ensure_future(proxy_ml_api(url, payload))
+        try:
+            remote = await asyncio.wait_for(asyncio.shield(task), config.HEALTH_SCORE_BUDGET_S)
+        except asyncio.TimeoutError:
+            self._background.add(task)
+            task.add_done_callback(partial(self._remote_done, local))
+            return self._approximate(local, "timeout")
+        except HTTPException as e:
+            if e.status_code < 500:
+                raise  # payload ditolak ML: bukan masalah latency, teruskan ke client
+            return self._approximate(local, "error")
+        self.counts["remote"] += 1
+        self.record(local, remote)
+        return remote
+
+    def _remote_done(self, local: dict, task: asyncio.Task):
+        self._background.discard(task)
+        if not task.cancelled() and task.exception() is None:
+            self.record(local, task.result())
+
+    def _approximate(self, local: dict, reason: str) -> dict:
+        self.counts[f"local_{reason}"] += 1
+        logger.info("health_score_local", extra={"reason": reason, "score": local["score"]})
+        return {**local, "approximate": True, "sumber": "lokal", "alasan": reason}
+
+    def record(self, local: dict, remote):
+        """Catat kecocokan skor lokal dengan skor ML (respons ML tanpa "score" angka diabaikan)."""
+        remote_score = remote.get("score") if isinstance(remote, dict) else None
+        if not isinstance(remote_score, (int, float)) or isinstance(remote_score, bool):
+            return
+        self.compared += 1
+        self.abs_diffs.append(abs(local["score"] - remote_score))
+        if remote.get("kategori") == local["kategori"]:
+            self.same_category += 1
+
+    def stats(self) -> dict:
+        diffs = np.array(self.abs_diffs)
+        return {
+            "enabled": config.HEALTH_SCORE_HEDGE_ENABLED,
+            "budget_s": config.HEALTH_SCORE_BUDGET_S,
+            "counts": dict(self.counts),
+            "pending_remote": len(self._background),
+            "agreement": {
+                "compared": self.compared,
+                "same_category_rate": round(self.same_category / self.compared, 3) if self.compared else None,
+                "abs_diff_mean": round(float(diffs.mean()), 2) if len(diffs) else None,
+                "abs_diff_p95": round(float(np.percentile(diffs, 95)), 2) if len(diffs) else None,
+                "within_10": round(float((diffs <= 10).mean()), 3) if len(diffs) else None,
+            },
+        }
+
+
+hedge = HealthScoreHedge()
@@ -0,0 +1,46 @@
+# core/http.py
+"""
+Satu aiohttp.ClientSession bersama per worker untuk panggilan OCR/ML, supaya koneksi
+(TCP + TLS) dipakai ulang, bukan dibuat baru di setiap request.
+"""
+import logging
+
+import aiohttp
+
+from core import config
+from core.tracing import aiohttp_trace_config
+
+logger = logging.getLogger(__name__)
+
+_session = None
+
+
+def get_http_session() -> aiohttp.ClientSession:
+    """Session dibuat lazy di event loop yang sedang berjalan."""
+    global _session
+    if _session is None or _session.closed:
+        _session = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(limit=config.UPSTREAM_POOL_LIMIT, keepalive_timeout=60),
+            timeout=aiohttp.ClientTimeout(total=config.UPSTREAM_TIMEOUT_S),
+            trace_configs=[aiohttp_trace_config()],  # traceparent + X-Request-ID ke OCR/ML
+        )
+    return _session
+
+
+async def close_http_session():
+    global _session
+    if _session is not None and not _session.closed:
+        await _session.close()
+    _session = None
+
+
+async def warm_http_session(base_url: str) -> dict:
+    """Buat session dan buka satu koneksi ke upstream (DNS + TCP + TLS) sebelum traffic datang."""
+    session = get_http_session()
+    try:
+        async with session.head(base_url, timeout=aiohttp.ClientTimeout(total=config.UPSTREAM_WARM_TIMEOUT_S), allow_redirects=False) as resp:
+            return {"connected": True, "status": resp.status}
+    except Exception as e:
+        # Upstream belum bisa dihubungi bukan alasan app tidak ready
+        logger.warning(f"[STARTUP] Warm-up koneksi ke {base_url} gagal: {e}")
+        return {"connected": False, "error": str(e)}
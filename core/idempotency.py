@@ -0,0 +1,165 @@
+# core/idempotency.py
+"""
+Dukungan header ``Idempotency-Key`` untuk endpoint yang memicu OCR / ML dan menulis data
+(``IDEMPOTENT_ROUTES``), supaya retry client setelah timeout tidak menyimpan scan /
+rekomendasi dua kali dan tidak memanggil upstream lagi.
+
+Per (token Authorization, method, path, key):
+1. request pertama menandai key "pending" dengan ``cache.add`` (atomic) lalu dijalankan;
+   response-nya (status, header, body) disimpan selama IDEMPOTENCY_TTL_S
+2. request duplikat yang datang saat masih diproses menunggu hasilnya (maks
+   IDEMPOTENCY_WAIT_S, lalu 409 + Retry-After)
+3. retry berikutnya menerima response tersimpan (header ``Idempotent-Replayed: true``)
+   tanpa menjalankan endpoint lagi
+
+Response 5xx / 408 / 409 / 429 tidak disimpan (tanda pending dihapus) supaya retry
+benar-benar dicoba ulang; begitu juga response yang ditandai route dengan
+``skip_store(request)`` (mis. /recommendation/save yang tetap 200 walau ML gagal). Dedup antar worker butuh CACHE_BACKEND sqlite / redis; dengan
+"memory" hanya dalam satu worker, dengan "none" fitur ini nonaktif.
+"""
+import asyncio
+import base64
+import hashlib
+import logging
+import time
+
+import orjson
+
+from core import config
+from core.cache import get_cache
+
+logger = logging.getLogger(__name__)
+
+IDEMPOTENT_ROUTES = {("POST", "/upload/"), ("POST", "/recommendation/save")}
+HEADER = b"idempotency-key"
+MAX_KEY_LENGTH = 255
+# Status yang tidak disimpan: error sementara, retry harus dijalankan ulang
+RETRYABLE_STATUS = {408, 409, 425, 429}
+SKIP_HEADERS = {b"date", b"server", b"x-request-id"}
+
+_waiters = {}  # key -> asyncio.Event, bangunkan request duplikat di worker yang sama
+
+
+def _cache():
+    return get_cache("idempotency", config.IDEMPOTENCY_TTL_S)
+
+
+def scoped_key(headers: dict, method: str, path: str, key: str) -> str:
+    # Token lengkap (bukan claim user_id yang belum diverifikasi) supaya key tidak bisa dipakai user lain
+    auth = headers.get(b"authorization", b"")
+    return hashlib.sha256(b"\0".join((auth, method.encode(), path.encode(), key.encode()))).hexdigest()
+
+
+async def _send_json(send, status: int, detail: str, extra_headers: list = ()):
+    body = orjson.dumps({"detail": detail})
+    await send({"type": "http.response.start", "status": status, "headers": [
+        (b"content-type", b"application/json"), (b"content-length", str(len(body)).encode()), *extra_headers,
+    ]})
+    await send({"type": "http.response.body", "body": body})
+
+
+async def _replay(send, stored: dict):
+    headers = [(k.encode("latin-1"), v.encode("latin-1")) for k, v in stored["headers"]]
+    await send({"type": "http.response.start", "status": stored["status"],
+                "headers": headers + [(b"idempotent-replayed", b"true")]})
+    await send({"type": "http.response.body", "body": base64.b64decode(stored["body"])})
+
+
+def skip_store(request):
+    """Dipanggil route: response request ini jangan disimpan (upstream gagal, retry harus dicoba ulang)."""
+    request.state.idempotency_skip_store = True
+
+
+def _wake(key: str):
+    event = _waiters.pop(key, None)
+    if event is not None:
+        event.set()
+
+
+class IdempotencyMiddleware:
+    """ASGI middleware; pass-through untuk route lain / request tanpa Idempotency-Key."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not config.IDEMPOTENCY_ENABLED or (scope["method"], scope["path"]) not in IDEMPOTENT_ROUTES:
+            return await self.app(scope, receive, send)
+        headers = dict(scope.get("headers", []))
+        raw_key = headers.get(HEADER)
+        if raw_key is None:
+            return await self.app(scope, receive, send)
+        idem_key = raw_key.decode("latin-1").strip()
+        if not idem_key or len(idem_key) > MAX_KEY_LENGTH:
+            return await _send_json(send, 400, f"Idempotency-Key harus 1-{MAX_KEY_LENGTH} karakter")
+
+        cache = _cache()
+        key = scoped_key(headers, scope["method"], scope["path"], idem_key)
+        deadline = time.monotonic() + config.IDEMPOTENCY_WAIT_S
+        misses = 0
+        while True:
+            if await cache.aadd(key, {"state": "pending"}, config.IDEMPOTENCY_LOCK_TTL_S):
+                return await self._execute(scope, receive, send, cache, key)
+            stored = await cache.aget(key)
+            if stored is None:
+                # Key hilang di antara add dan get (request pertama gagal / kedaluwarsa): coba ambil lagi.
+                # Jika terus begini backend cache bermasalah -> jalankan tanpa jaminan idempotency
+                misses += 1
+                if misses >= 3:
+                    logger.warning("Idempotency cache tidak tersedia, request dijalankan tanpa dedup")
+                    return await self.app(scope, receive, send)
+                continue
+            if stored.get("state") == "done":
+                return await _replay(send, stored)
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return await _send_json(send, 409, "Request dengan Idempotency-Key ini masih diproses, coba lagi nanti.",
+                                        [(b"retry-after", b"5")])
+            # Tunggu request pertama: event (worker yang sama) atau polling (worker lain)
+            event = _waiters.setdefault(key, asyncio.Event())
+            try:
+                await asyncio.wait_for(event.wait(), timeout=min(0.5, remaining))
+            except asyncio.TimeoutError:
+                # Request pertama di worker lain tidak akan memanggil _wake di sini: jangan tinggalkan event
+                if _waiters.get(key) is event:
+                    del _waiters[key]
+
+    async def _execute(self, scope, receive, send, cache, key: str):
+        response = {"status": None, "headers": [], "body": [], "size": 0, "complete": False}
+        state = scope.setdefault("state", {})  # request.state route (skip_store)
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                response["status"] = message["status"]
+                response["headers"] = [
+                    (k.decode("latin-1"), v.decode("latin-1")) for k, v in message.get("headers", []) if k.lower() not in SKIP_HEADERS
+                ]
+            elif message["type"] == "http.response.body":
+                body = message.get("body", b"")
+                response["size"] += len(body)
+                if response["size"] <= config.IDEMPOTENCY_MAX_BODY_BYTES:
+                    response["body"].append(body)
+                response["complete"] = not message.get("more_body", False)
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        except BaseException:
+            await cache.adelete(key)
+            _wake(key)
+            raise
+        status = response["status"]
+        storable = (
+            response["complete"] and not state.get("idempotency_skip_store") and status is not None and status < 500 and status not in RETRYABLE_STATUS
+            and response["size"] <= config.IDEMPOTENCY_MAX_BODY_BYTES
+        )
+        if storable:
+            await cache.aset(key, {
+                "state": "done",
+                "status": status,
+                "headers": response["headers"],
+                "body": base64.b64encode(b"".join(response["body"])).decode("ascii"),
+            })
+        else:
+            await cache.adelete(key)
+        _wake(key)
@@ -0,0 +1,178 @@
+# core/log.py
+"""
+Logging terstruktur yang tidak memblokir event loop.
+
+- ``setup_logging``: root logger hanya punya ``QueueHandler`` (put_nowait ke queue
+  terbatas; log dibuang + dihitung jika penuh), penulisan ke stderr dilakukan
+  ``QueueListener`` di thread background.
+- Output JSON satu baris per log (``LOG_FORMAT=text`` untuk dev) berisi request_id;
+  field tambahan lewat ``extra={...}`` ikut ditulis.
+- ``RequestIdMiddleware``: request_id dari header ``X-Request-ID`` (atau dibuat baru),
+  disimpan di contextvar dan dikembalikan di header response.
+- ``log_payload``: body request/response upstream hanya dicatat jika ``LOG_PAYLOADS``
+  aktif, terpilih sampling (``LOG_PAYLOAD_SAMPLE_RATE``, per request), diredaksi seperti
+  capture dan dipotong ke ``LOG_PAYLOAD_MAX_BYTES``. Biarkan LOG_PAYLOADS mati di produksi.
+"""
+import atexit
+import contextvars
+import logging
+import logging.handlers
+import queue
+import random
+import re
+import sys
+import uuid
+import zlib
+from datetime import datetime, timezone
+
+import orjson
+
+from core import config
+
+REQUEST_ID_HEADER = b"x-request-id"
+_VALID_REQUEST_ID = re.compile(r"^[A-Za-z0-9._-]{1,64}$")
+
+request_id_var = contextvars.ContextVar("request_id", default=None)
+
+# Atribut bawaan LogRecord; selebihnya dianggap field dari extra={...}
+_RECORD_ATTRS = set(vars(logging.LogRecord("", 0, "", 0, "", None, None))) | {"message", "request_id"}
+
+_listener = None
+_handler = None
+
+
+def get_request_id() -> str | None:
+    return request_id_var.get()
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+            "request_id": getattr(record, "request_id", None),
+        }
+        for key, value in record.__dict__.items():
+            if key not in _RECORD_ATTRS and not key.startswith("_"):
+                entry[key] = value
+        if record.exc_text:
+            entry["exc"] = record.exc_text
+        return orjson.dumps(entry, default=str).decode("utf-8")
+
+
+class TextFormatter(logging.Formatter):
+    def __init__(self):
+        super().__init__("%(asctime)s %(levelname)s %(name)s [%(request_id)s] %(message)s")
+
+
+class NonBlockingQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler yang tidak pernah menunggu: log dibuang (dihitung) jika queue penuh."""
+
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Dijalankan di thread pemanggil: request_id dari contextvar, pesan & traceback
+        # dirender di sini (args / traceback tidak aman dibaca dari thread listener)
+        record = logging.makeLogRecord(record.__dict__)
+        record.request_id = request_id_var.get()
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+        record.exc_info = None
+        record.stack_info = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+def setup_logging():
+    """Pasang QueueHandler di root logger + listener thread ke stderr (idempotent)."""
+    global _listener, _handler
+    if _listener is not None:
+        return
+    log_queue = queue.Queue(maxsize=config.LOG_QUEUE_SIZE)
+    stream = logging.StreamHandler(sys.stderr)
+    stream.setFormatter(TextFormatter() if config.LOG_FORMAT == "text" else JsonFormatter())
+    _handler = NonBlockingQueueHandler(log_queue)
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.addHandler(_handler)
+    root.setLevel(config.LOG_LEVEL)
+    _listener = logging.handlers.QueueListener(log_queue, stream, respect_handler_level=True)
+    _listener.start()
+    atexit.register(stop_logging)
+
+
+def stop_logging():
+    """Flush sisa log di queue lalu hentikan thread listener."""
+    global _listener
+    if _listener is None:
+        return
+    try:
+        _listener.stop()
+    except queue.Full:
+        pass
+    _listener = None
+
+
+def stats() -> dict:
+    return {"dropped": _handler.dropped if _handler else 0}
+
+
+def payload_sampled() -> bool:
+    """Apakah payload request ini dicatat; sampling per request_id (request & response ikut bersama)."""
+    if not config.LOG_PAYLOADS or config.LOG_PAYLOAD_SAMPLE_RATE <= 0:
+        return False
+    rid = request_id_var.get()
+    if rid:
+        return (zlib.crc32(rid.encode()) % 10000) < config.LOG_PAYLOAD_SAMPLE_RATE * 10000
+    return random.random() < config.LOG_PAYLOAD_SAMPLE_RATE
+
+
+def truncate_payload(payload) -> str:
+    """Serialisasi payload (field rahasia diredaksi) dan potong ke LOG_PAYLOAD_MAX_BYTES."""
+    from core.capture import redact
+    data = orjson.dumps(redact(payload), default=str)
+    if len(data) > config.LOG_PAYLOAD_MAX_BYTES:
+        return data[:config.LOG_PAYLOAD_MAX_BYTES].decode("utf-8", "ignore") + f"...(+{len(data) - config.LOG_PAYLOAD_MAX_BYTES} bytes)"
+    return data.decode("utf-8")
+
+
+def log_payload(logger: logging.Logger, event: str, payload, **fields):
+    """Catat body jika payload logging aktif dan request ini terpilih sampling."""
+    if payload_sampled() and logger.isEnabledFor(logging.INFO):
+        logger.info(event, extra={"event": event, "payload": truncate_payload(payload), **fields})
+
+
+class RequestIdMiddleware:
+    """ASGI middleware: set request_id (header X-Request-ID atau baru) untuk log + response."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        incoming = dict(scope.get("headers", [])).get(REQUEST_ID_HEADER, b"").decode("latin-1")
+        request_id = incoming if _VALID_REQUEST_ID.match(incoming) else uuid.uuid4().hex[:16]
+        token = request_id_var.set(request_id)
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                message["headers"] = [*message.get("headers", []), (REQUEST_ID_HEADER, request_id.encode("latin-1"))]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            request_id_var.reset(token)
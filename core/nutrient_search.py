@@ -0,0 +1,146 @@
+# core/nutrient_search.py
+"""
+Pencarian / filter scan berdasarkan nilai gizi.
+
+Nilai di nutrition_json (JSON terkompresi) disalin sebagai kolom angka ke tabel
+scan_nutrients (satu baris per scan, id sama dengan images / images_archive) yang punya
+index (user_id, <nutrisi>) dan (user_id, uploaded_at). Filter "gula > 10", urut "garam
+tertinggi" dan rentang tanggal jadi range scan di index, tanpa membaca + decode JSON
+seluruh riwayat user.
+
+Baris scan_nutrients ditulis ulang (``reindex``) di transaksi yang sama setiap kali
+nutrition_json berubah (upload, re-OCR, update-nutrition, backfill OCR); data lama diisi
+dengan ``python -m scripts.index_nutrients``.
+"""
+import re
+
+import orjson
+from sqlalchemy import delete, insert, select
+
+from core.compression import decompress_bytes
+from models import Image, ImageArchive, ScanNutrient
+from nutrition_engine import ALIASES, NUTRIENTS
+
+# Nama nutrisi (key nutrition_json) -> kolom di scan_nutrients
+COLUMNS = {key: key.replace(" ", "_") for key in NUTRIENTS}
+OPERATORS = {">": "__gt__", ">=": "__ge__", "<": "__lt__", "<=": "__le__", "=": "__eq__"}
+
+_NUMBER = re.compile(r"-?\d+(?:[.,]\d+)?")
+_FILTER = re.compile(r"^\s*([a-z_ ]+?)\s*(>=|<=|>|<|=)\s*(-?\d+(?:[.,]\d+)?)\s*$")
+
+
+class InvalidQuery(ValueError):
+    """Parameter filter / sort tidak valid (dikembalikan sebagai 400)."""
+
+
+def parse_value(val) -> float | None:
+    """Nilai gizi dari OCR (angka, "1,5", "10 g") -> float; None jika tidak ada / bukan angka."""
+    if isinstance(val, bool) or val is None:
+        return None
+    if isinstance(val, (int, float)):
+        return float(val)
+    match = _NUMBER.search(str(val))
+    return float(match.group().replace(",", ".")) if match else None
+
+
+def nutrient_values(nutrition_json) -> dict | None:
+    """nutrition_json tersimpan -> {kolom: float/None}; None jika kosong / bukan objek JSON."""
+    if not nutrition_json:
+        return None
+    try:
+        gizi = orjson.loads(decompress_bytes(nutrition_json))
+    except orjson.JSONDecodeError:
+        return None
+    if not isinstance(gizi, dict) or not gizi:
+        return None
+    values = {}
+    for key, column in COLUMNS.items():
+        val = gizi.get(key)
+        if val is None and key in ALIASES:
+            val = gizi.get(ALIASES[key])
+        values[column] = parse_value(val)
+    return values
+
+
+def index_rows(rows) -> list:
+    """rows (id, user_id, uploaded_at, filename, nutrition_json mentah) -> baris scan_nutrients."""
+    out = []
+    for row in rows:
+        values = nutrient_values(row.nutrition_json)
+        if values is None or row.user_id is None:
+            continue
+        out.append({"image_id": row.id, "user_id": row.user_id, "uploaded_at": row.uploaded_at,
+                    "filename": row.filename, **values})
+    return out
+
+
+def reindex(db, image_ids) -> int:
+    """
+    Tulis ulang baris scan_nutrients untuk image_ids dari images / images_archive, dalam
+    transaksi pemanggil (``db`` Session atau Connection). Scan tanpa gizi tidak diindex.
+    """
+    ids = list(image_ids)
+    if not ids:
+        return 0
+    rows = []
+    for model in (Image, ImageArchive):
+        rows += db.execute(
+            select(model.id, model.user_id, model.uploaded_at, model.filename, model.nutrition_json).where(model.id.in_(ids))
+        ).all()
+    values = index_rows(rows)
+    db.execute(delete(ScanNutrient).where(ScanNutrient.image_id.in_(ids)))
+    if values:
+        db.execute(insert(ScanNutrient), values)
+    return len(values)
+
+
+def remove(db, image_ids):
+    db.execute(delete(ScanNutrient).where(ScanNutrient.image_id.in_(list(image_ids))))
+
+
+def parse_filter(expr: str) -> tuple:
+    """ "gula>10", "lemak total <= 5" -> (kolom, operator, nilai)."""
+    match = _FILTER.match(expr.lower())
+    if not match:
+        raise InvalidQuery(f"Filter tidak valid: '{expr}' (contoh: gula>10, garam<=500)")
+    name, op, value = match.groups()
+    column = COLUMNS.get(name.strip()) or (name.strip() if name.strip() in COLUMNS.values() else None)
+    if column is None:
+        raise InvalidQuery(f"Nutrisi tidak dikenal: '{name.strip()}' (pilihan: {', '.join(NUTRIENTS)})")
+    return column, op, float(value.replace(",", "."))
+
+
+def search_stmt(user_id: int, filters: list, sort: str = "waktu", descending: bool = True,
+                start=None, end=None, limit: int = 50, offset: int = 0):
+    """
+    SELECT scan_nutrients user dengan filter (kolom, operator, nilai), rentang uploaded_at
+    [start, end] dan urutan ``sort`` ("waktu" atau nama nutrisi). Urut nutrisi hanya
+    menampilkan scan yang punya nilai nutrisi itu.
+    """
+    table = ScanNutrient.__table__
+    stmt = select(table).where(table.c.user_id == user_id)
+    for column, op, value in filters:
+        stmt = stmt.where(getattr(table.c[column], OPERATORS[op])(value))
+    if start is not None:
+        stmt = stmt.where(table.c.uploaded_at >= start)
+    if end is not None:
+        stmt = stmt.where(table.c.uploaded_at <= end)
+    if sort == "waktu":
+        key = table.c.uploaded_at
+    else:
+        column = COLUMNS.get(sort) or (sort if sort in COLUMNS.values() else None)
+        if column is None:
+            raise InvalidQuery(f"Sort tidak dikenal: '{sort}' (waktu atau nama nutrisi)")
+        key = table.c[column]
+        stmt = stmt.where(key.is_not(None))
+    order = (key.desc(), table.c.image_id.desc()) if descending else (key.asc(), table.c.image_id.asc())
+    return stmt.order_by(*order).limit(limit).offset(offset)
+
+
+def result_item(row) -> dict:
+    return {
+        "id": row.image_id,
+        "filename": row.filename,
+        "uploaded_at": row.uploaded_at,
+        "kandungan_gizi": {key: row._mapping[column] for key, column in COLUMNS.items() if row._mapping[column] is not None},
+    }
@@ -0,0 +1,163 @@
+# core/phash.py
+"""
+Deteksi foto label yang hampir sama (difoto ulang dengan sudut / cahaya sedikit berbeda)
+dengan perceptual hash, supaya hasil OCR scan sebelumnya bisa dipakai ulang.
+
+- ``dhash``: difference hash 64-bit (grayscale 9x8, bandingkan piksel bersebelahan);
+  tahan terhadap perubahan ukuran, kompresi, kecerahan dan kontras.
+- ``BKTree``: index metrik Hamming; cari semua hash dalam jarak <= d tanpa scan linear.
+- ``PhashIndex``: BK-tree per user (LRU antar user, per worker) berisi scan terbaru user
+  itu. Diisi dari kolom images.phash dan disegarkan secara inkremental (id > id terakhir
+  yang dimuat), jadi upload lewat worker lain juga ikut terbaca.
+
+Butuh Pillow (opsional); tanpa Pillow fitur ini nonaktif dan upload selalu memanggil OCR.
+"""
+import io
+import logging
+import threading
+from collections import OrderedDict
+
+from sqlalchemy import select
+
+from core import config
+
+try:
+    from PIL import Image as PILImage, ImageOps
+except ImportError:  # opsional
+    PILImage = None
+
+logger = logging.getLogger(__name__)
+
+HASH_SIZE = 8
+
+
+def enabled() -> bool:
+    return config.PHASH_ENABLED and PILImage is not None
+
+
+def dhash(image_bytes: bytes) -> int | None:
+    """dHash 64-bit dari bytes gambar; None jika gambar tidak bisa dibaca."""
+    try:
+        img = PILImage.open(io.BytesIO(image_bytes))
+        # JPEG: decode langsung di resolusi kecil (jauh lebih cepat untuk foto kamera)
+        img.draft("L", (HASH_SIZE * 8, HASH_SIZE * 8))
+        img = ImageOps.exif_transpose(img).convert("L").resize((HASH_SIZE + 1, HASH_SIZE), PILImage.Resampling.LANCZOS)
+    except Exception as e:
+        logger.warning(f"Gagal menghitung perceptual hash: {e}")
+        return None
+    pixels = img.tobytes()
+    value = 0
+    for row in range(HASH_SIZE):
+        offset = row * (HASH_SIZE + 1)
+        for col in range(HASH_SIZE):
+            value = (value << 1) | (pixels[offset + col] < pixels[offset + col + 1])
+    return value
+
+
+def to_hex(value: int) -> str:
+    return f"{value:016x}"
+
+
+def hamming(a: int, b: int) -> int:
+    return (a ^ b).bit_count()
+
+
+class BKTree:
+    """BK-tree untuk jarak Hamming. Node = [hash, item, {jarak: child}]."""
+
+    def __init__(self):
+        self.root = None
+        self.size = 0
+
+    def add(self, value: int, item):
+        self.size += 1
+        if self.root is None:
+            self.root = [value, item, {}]
+            return
+        node = self.root
+        while True:
+            dist = hamming(value, node[0])
+            child = node[2].get(dist)
+            if child is None:
+                node[2][dist] = [value, item, {}]
+                return
+            node = child
+
+    def search(self, value: int, max_dist: int) -> list:
+        """Semua (jarak, item) dengan jarak <= max_dist, urut dari yang terdekat."""
+        found = []
+        stack = [self.root] if self.root is not None else []
+        while stack:
+            node = stack.pop()
+            dist = hamming(value, node[0])
+            if dist <= max_dist:
+                found.append((dist, node[1]))
+            # Ketidaksamaan segitiga: hanya child dengan jarak di [dist - d, dist + d] yang mungkin cocok
+            for child_dist, child in node[2].items():
+                if dist - max_dist <= child_dist <= dist + max_dist:
+                    stack.append(child)
+        found.sort(key=lambda x: (x[0], -x[1]))  # jarak sama: scan terbaru (id terbesar) dulu
+        return found
+
+
+class PhashIndex:
+    """BK-tree scan terbaru per user, dimuat lazy dari DB (kolom images.phash)."""
+
+    def __init__(self, max_users: int, recent_per_user: int):
+        self.max_users = max_users
+        self.recent_per_user = recent_per_user
+        self._users = OrderedDict()  # user_id -> {"tree", "last_id"}
+        self._lock = threading.Lock()
+        self.lookups = 0
+        self.matches = 0
+
+    def _load(self, db, user_id: int, after_id: int, limit: int | None) -> list:
+        from models import Image
+        stmt = select(Image.id, Image.phash).where(Image.user_id == user_id, Image.phash.is_not(None))
+        if after_id:
+            stmt = stmt.where(Image.id > after_id)
+        if limit:
+            stmt = stmt.order_by(Image.id.desc()).limit(limit)
+        return db.execute(stmt).all()
+
+    def find(self, db, user_id: int, value: int, max_dist: int) -> list:
+        """(jarak, image_id) scan user dengan hash dalam jarak <= max_dist, terdekat dulu."""
+        with self._lock:
+            self.lookups += 1
+            entry = self._users.get(user_id)
+            # Bangun ulang dari N scan terbaru (BK-tree tidak mendukung hapus)
+            rebuild = entry is None or entry["tree"].size > 2 * self.recent_per_user
+        # Query DB di luar lock: lookup user lain tidak ikut menunggu DB
+        if rebuild:
+            rows = self._load(db, user_id, 0, self.recent_per_user)
+        else:
+            rows = self._load(db, user_id, entry["last_id"], None)
+        with self._lock:
+            if rebuild:
+                entry = {"tree": BKTree(), "last_id": 0}
+            # Request lain untuk user yang sama bisa sudah menambahkan sebagian baris ini
+            known_id = entry["last_id"]
+            for row in rows:
+                if row.id > known_id:
+                    entry["tree"].add(int(row.phash, 16), row.id)
+                    entry["last_id"] = max(entry["last_id"], row.id)
+            self._users.pop(user_id, None)
+            self._users[user_id] = entry
+            if len(self._users) > self.max_users:
+                self._users.popitem(last=False)
+            matches = entry["tree"].search(value, max_dist)
+            if matches:
+                self.matches += 1
+            return matches
+
+    def stats(self) -> dict:
+        return {
+            "enabled": enabled(),
+            "max_distance": config.PHASH_MAX_DISTANCE,
+            "users": len(self._users),
+            "lookups": self.lookups,
+            "matches": self.matches,
+        }
+
+
+phash_index = PhashIndex(config.PHASH_INDEX_MAX_USERS, config.PHASH_RECENT_SCANS)
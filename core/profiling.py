@@ -0,0 +1,290 @@
+# core/profiling.py
+"""
+Profiler per-request yang opt-in + pencatat SQL / detektor N+1.
+
+Request diprofile jika:
+- membawa header ``X-Profile`` berisi token bertanda tangan HMAC
+  (buat dengan ``python -m core.profiling``), atau
+- terpilih secara acak sesuai ``PROFILE_SAMPLE_RATE``.
+
+Hasil ditulis ke ``PROFILE_DIR``:
+- ``<id>.json``   ringkasan: durasi, semua statement SQL, statement berulang
+- ``<id>.folded`` stack yang disampling (format flamegraph), atau
+- ``<id>.prof``   output cProfile (buka dengan ``python -m pstats``)
+
+Batasan: sampler mengambil stack seluruh proses (thread event loop + worker threadpool
+yang menjalankan kode app), dan cProfile hanya melihat thread event loop (termasuk task
+request lain, tanpa endpoint sync). Request lain yang berjalan bersamaan ikut tercampur;
+jumlahnya dicatat di ``concurrent_requests`` ringkasan (0 = profile murni request ini) dan
+setiap stack ``.folded`` diawali nama thread-nya. Daftar SQL selalu hanya milik request ini.
+"""
+import contextvars
+import cProfile
+import hashlib
+import hmac
+import io
+import json
+import logging
+import os
+import pstats
+import random
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+
+from starlette.concurrency import run_in_threadpool
+
+from core import config
+
+logger = logging.getLogger(__name__)
+
+PROFILE_HEADER = b"x-profile"
+TOKEN_MAX_AGE = 300  # detik
+
+_current = contextvars.ContextVar("profile_session", default=None)
+# cProfile / sampler tidak bisa berjalan paralel dengan aman, jadi satu per proses
+_active_lock = threading.Lock()
+_active_session = None
+_in_flight = 0  # request HTTP yang sedang berjalan di worker ini
+
+
+def sign_profile_token(secret: str, ts: int | None = None) -> str:
+    """Buat token untuk header X-Profile: ``<unix_ts>.<hmac_sha256>``."""
+    ts = int(ts if ts is not None else time.time())
+    sig = hmac.new(secret.encode(), str(ts).encode(), hashlib.sha256).hexdigest()
+    return f"{ts}.{sig}"
+
+
+def verify_profile_token(token: str, secret: str, max_age: int = TOKEN_MAX_AGE) -> bool:
+    if not secret or not token or "." not in token:
+        return False
+    ts, sig = token.split(".", 1)
+    try:
+        age = time.time() - int(ts)
+    except ValueError:
+        return False
+    if age < -60 or age > max_age:
+        return False
+    expected = hmac.new(secret.encode(), ts.encode(), hashlib.sha256).hexdigest()
+    return hmac.compare_digest(expected, sig)
+
+
+class StackSampler(threading.Thread):
+    """Sampling stack thread event loop + worker threadpool yang sedang menjalankan kode app (semua request)."""
+
+    def __init__(self, loop_thread_id: int, interval: float):
+        super().__init__(name="profile-sampler", daemon=True)
+        self.loop_thread_id = loop_thread_id
+        self.interval = interval
+        self.stacks = Counter()
+        self.samples = 0
+        self._stop_event = threading.Event()
+
+    def run(self):
+        own_id = threading.get_ident()
+        names = {}
+        while not self._stop_event.wait(self.interval):
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_id:
+                    continue
+                stack = []
+                in_app = False
+                while frame is not None:
+                    code = frame.f_code
+                    if code.co_filename.startswith(config.BASE_DIR) and "site-packages" not in code.co_filename:
+                        in_app = True
+                    stack.append(f"{os.path.basename(code.co_filename)}:{code.co_name}")
+                    frame = frame.f_back
+                # Worker thread yang idle (menunggu antrian) tidak relevan
+                if thread_id != self.loop_thread_id and not in_app:
+                    continue
+                if thread_id == self.loop_thread_id:
+                    name = "loop"
+                else:
+                    if thread_id not in names:
+                        names.update((t.ident, t.name) for t in threading.enumerate())
+                    name = names.get(thread_id, str(thread_id))
+                stack.append(f"[{name}]")
+                self.stacks[";".join(reversed(stack))] += 1
+            self.samples += 1
+
+    def stop(self):
+        self._stop_event.set()
+        self.join()
+
+
+class ProfileSession:
+    def __init__(self, method: str, path: str, reason: str):
+        self.id = f"{time.strftime('%Y%m%d-%H%M%S')}-{uuid.uuid4().hex[:8]}"
+        self.method = method
+        self.path = path
+        self.reason = reason
+        self.queries = []
+        self.status = None
+        self._lock = threading.Lock()
+        self._profiler = None
+        self._sampler = None
+        self._t0 = 0.0
+        self.duration_ms = 0.0
+        self.concurrent_requests = 0  # request lain yang berjalan selama profile
+
+    def record_query(self, statement: str, duration_ms: float):
+        # Dipanggil dari thread event loop maupun threadpool (endpoint sync)
+        with self._lock:
+            self.queries.append((statement, duration_ms))
+
+    def start(self):
+        self._t0 = time.perf_counter()
+        if config.PROFILE_MODE == "cprofile":
+            self._profiler = cProfile.Profile()
+            self._profiler.enable()
+        else:
+            self._sampler = StackSampler(threading.get_ident(), config.PROFILE_SAMPLE_INTERVAL_MS / 1000)
+            self._sampler.start()
+
+    def stop(self):
+        if self._profiler is not None:
+            self._profiler.disable()
+        if self._sampler is not None:
+            self._sampler.stop()
+        self.duration_ms = (time.perf_counter() - self._t0) * 1000
+
+    def repeated_statements(self) -> dict:
+        counts = Counter(stmt for stmt, _ in self.queries)
+        return {stmt: n for stmt, n in counts.items() if n >= config.PROFILE_REPEAT_THRESHOLD}
+
+    def save(self) -> str:
+        os.makedirs(config.PROFILE_DIR, exist_ok=True)
+        base = os.path.join(config.PROFILE_DIR, self.id)
+        repeated = self.repeated_statements()
+        summary = {
+            "id": self.id,
+            "method": self.method,
+            "path": self.path,
+            "status": self.status,
+            "reason": self.reason,
+            "duration_ms": round(self.duration_ms, 2),
+            "profile_scope": "thread event loop" if self._profiler is not None else "proses (loop + threadpool)",
+            "concurrent_requests": self.concurrent_requests,
+            "sql_count": len(self.queries),
+            "sql_total_ms": round(sum(d for _, d in self.queries), 2),
+            "sql": [{"statement": s, "duration_ms": round(d, 3)} for s, d in self.queries],
+            "repeated_statements": repeated,
+            "n_plus_one": bool(repeated),
+        }
+        if self._profiler is not None:
+            self._profiler.dump_stats(base + ".prof")
+            out = io.StringIO()
+            pstats.Stats(self._profiler, stream=out).sort_stats("cumulative").print_stats(30)
+            summary["top_functions"] = out.getvalue()
+        if self._sampler is not None:
+            with open(base + ".folded", "w", encoding="utf-8") as f:
+                for stack, count in self._sampler.stacks.most_common():
+                    f.write(f"{stack} {count}\n")
+            summary["samples"] = self._sampler.samples
+        with open(base + ".json", "w", encoding="utf-8") as f:
+            json.dump(summary, f, ensure_ascii=False, indent=2)
+        if repeated:
+            logger.warning(
+                f"[PROFILE] {self.method} {self.path}: kemungkinan N+1, "
+                f"{len(repeated)} statement diulang hingga {max(repeated.values())}x ({self.id})"
+            )
+        return base
+
+
+def _should_profile(scope) -> str | None:
+    if config.PROFILE_SECRET:
+        for name, value in scope.get("headers", []):
+            if name == PROFILE_HEADER:
+                if verify_profile_token(value.decode("latin-1"), config.PROFILE_SECRET):
+                    return "header"
+                break
+    if config.PROFILE_SAMPLE_RATE > 0 and random.random() < config.PROFILE_SAMPLE_RATE:
+        return "sampled"
+    return None
+
+
+class ProfilingMiddleware:
+    """ASGI middleware; tidak ada overhead selain cek header jika request tidak diprofile."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        global _in_flight
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        _in_flight += 1
+        try:
+            if _active_session is not None:
+                _active_session.concurrent_requests += 1
+            reason = _should_profile(scope)
+            if reason is None or not _active_lock.acquire(blocking=False):
+                return await self.app(scope, receive, send)
+            await self._profile(scope, receive, send, reason)
+        finally:
+            _in_flight -= 1
+
+    async def _profile(self, scope, receive, send, reason: str):
+        global _active_session
+        session = ProfileSession(scope["method"], scope["path"], reason)
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                session.status = message["status"]
+                headers = list(message.get("headers", []))
+                headers.append((b"x-profile-id", session.id.encode()))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        token = _current.set(session)
+        session.concurrent_requests = _in_flight - 1  # sudah berjalan sebelum profile dimulai
+        _active_session = session
+        session.start()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            session.stop()
+            _active_session = None
+            _current.reset(token)
+            _active_lock.release()
+            try:
+                await run_in_threadpool(session.save)
+            except Exception as e:
+                logger.error(f"[PROFILE] Gagal menyimpan profile {session.id}: {e}")
+
+
+def install_sql_hooks(engine):
+    """Catat setiap statement SQL ke sesi profile yang aktif (jika ada)."""
+    from sqlalchemy import event
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        if _current.get() is not None:
+            conn.info.setdefault("profile_query_start", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        session = _current.get()
+        if session is None:
+            return
+        starts = conn.info.get("profile_query_start")
+        if not starts:
+            return
+        session.record_query(statement, (time.perf_counter() - starts.pop()) * 1000)
+
+    @event.listens_for(engine, "handle_error")
+    def _error(context):
+        # Statement gagal tidak memanggil after_cursor_execute: buang waktu mulainya
+        starts = context.connection.info.get("profile_query_start") if context.connection is not None else None
+        if starts:
+            starts.pop()
+
+
+if __name__ == "__main__":
+    # Cetak token untuk header X-Profile
+    if not config.PROFILE_SECRET:
+        sys.exit("PROFILE_SECRET belum di-set")
+    print(sign_profile_token(config.PROFILE_SECRET))
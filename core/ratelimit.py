@@ -0,0 +1,211 @@
+# core/ratelimit.py
+"""
+Rate limiting per user + admission control untuk endpoint yang memanggil OCR/ML API.
+
+- Token bucket per (route, user_id dari JWT; IP client jika tanpa token valid) dengan
+  budget per route dari RATE_LIMITS, contoh "upload=20/60" = 20 request per 60 detik
+  (burst 20). Melebihi budget -> 429 + Retry-After.
+- ``upstream_gate``: batas panggilan upstream yang sedang berjalan (UPSTREAM_MAX_INFLIGHT)
+  dan antrean (UPSTREAM_MAX_QUEUE). Jika penuh, request ditolak cepat dengan 503 +
+  Retry-After supaya latency user lain tidak ikut membengkak.
+
+Keduanya per worker (in-process); budget efektif per user = budget x jumlah worker.
+"""
+import asyncio
+import math
+import time
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+
+import jwt
+from fastapi import HTTPException, Request
+
+from core import config
+
+
+class RateLimited(HTTPException):
+    def __init__(self, retry_after: float):
+        super().__init__(
+            status_code=429,
+            detail="Terlalu banyak request, coba lagi nanti.",
+            headers={"Retry-After": str(max(1, math.ceil(retry_after)))},
+        )
+
+
+class Overloaded(HTTPException):
+    def __init__(self, retry_after: float):
+        super().__init__(
+            status_code=503,
+            detail="Layanan OCR/ML sedang penuh, coba lagi nanti.",
+            headers={"Retry-After": str(max(1, math.ceil(retry_after)))},
+        )
+
+
+class TokenBucketLimiter:
+    """Token bucket per key; bucket yang lama tidak dipakai dibuang (LRU) jika melebihi max_keys."""
+
+    def __init__(self, capacity: float, period_s: float, max_keys: int = 100_000):
+        self.capacity = capacity
+        self.rate = capacity / period_s
+        self.max_keys = max_keys
+        self._buckets = OrderedDict()  # key -> (tokens, updated_at)
+        self.allowed = 0
+        self.limited = 0
+
+    def take(self, key: str, cost: float = 1.0) -> float:
+        """Ambil token. Return 0 jika diizinkan, atau jumlah detik sampai token cukup."""
+        now = time.monotonic()
+        tokens, updated_at = self._buckets.pop(key, (self.capacity, now))
+        tokens = min(self.capacity, tokens + (now - updated_at) * self.rate)
+        wait = 0.0
+        if tokens >= cost:
+            tokens -= cost
+            self.allowed += 1
+        else:
+            wait = (cost - tokens) / self.rate
+            self.limited += 1
+        self._buckets[key] = (tokens, now)
+        if len(self._buckets) > self.max_keys:
+            self._buckets.popitem(last=False)
+        return wait
+
+    def stats(self) -> dict:
+        return {
+            "capacity": self.capacity,
+            "per_second": round(self.rate, 4),
+            "keys": len(self._buckets),
+            "allowed": self.allowed,
+            "limited": self.limited,
+        }
+
+
+class UpstreamGate:
+    """Batasi panggilan upstream yang berjalan bersamaan + antrean; tolak (shed) jika penuh."""
+
+    def __init__(self, max_inflight: int, max_queue: int, queue_timeout_s: float):
+        self.max_inflight = max_inflight
+        self.max_queue = max_queue
+        self.queue_timeout_s = queue_timeout_s
+        self.in_flight = 0
+        self.waiting = 0
+        self.admitted = 0
+        self.shed = 0
+        self.timeouts = 0
+        self.latency_ewma_ms = 1000.0
+        self._semaphore = None
+
+    def retry_after(self) -> float:
+        """Perkiraan waktu sampai antrean saat ini habis diproses."""
+        return (self.waiting + 1) * self.latency_ewma_ms / 1000 / max(1, self.max_inflight)
+
+    def overloaded(self) -> bool:
+        return self.max_inflight > 0 and self.in_flight >= self.max_inflight and self.waiting >= self.max_queue
+
+    def check(self):
+        """Tolak cepat sebelum request mengerjakan apa pun (upload file, insert DB)."""
+        if self.overloaded():
+            self.shed += 1
+            raise Overloaded(self.retry_after())
+
+    @asynccontextmanager
+    async def slot(self):
+        if self.max_inflight <= 0:
+            yield
+            return
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_inflight)
+        self.check()
+        self.waiting += 1
+        # Bukan wait_for: di Python 3.11 wait_for bisa mendapat permit lalu tetap TimeoutError
+        # (permit bocor). Task acquire yang dibatalkan / terlambat selesai mengembalikan permit-nya.
+        acquire = asyncio.ensure_future(self._semaphore.acquire())
+        try:
+            done, _ = await asyncio.wait({acquire}, timeout=self.queue_timeout_s)
+        except BaseException:
+            self._abandon(acquire)
+            raise
+        finally:
+            self.waiting -= 1
+        if not done:
+            self._abandon(acquire)
+            self.timeouts += 1
+            raise Overloaded(self.retry_after())
+        self.in_flight += 1
+        self.admitted += 1
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.in_flight -= 1
+            self._semaphore.release()
+            self.latency_ewma_ms = 0.8 * self.latency_ewma_ms + 0.2 * (time.perf_counter() - t0) * 1000
+
+    def _abandon(self, acquire: asyncio.Future):
+        acquire.cancel()
+        acquire.add_done_callback(self._release_unused)
+
+    def _release_unused(self, acquire: asyncio.Future):
+        if not acquire.cancelled() and acquire.exception() is None:
+            self._semaphore.release()
+
+    def stats(self) -> dict:
+        return {
+            "max_inflight": self.max_inflight,
+            "max_queue": self.max_queue,
+            "in_flight": self.in_flight,
+            "waiting": self.waiting,
+            "admitted": self.admitted,
+            "shed": self.shed,
+            "queue_timeouts": self.timeouts,
+            "latency_ewma_ms": round(self.latency_ewma_ms, 1),
+        }
+
+
+def parse_rate_limits(spec: str) -> dict:
+    """'upload=20/60,predict=60/60' -> {"upload": (20.0, 60.0), ...}"""
+    limits = {}
+    for part in filter(None, (p.strip() for p in spec.split(","))):
+        route, budget = part.split("=")
+        count, _, period = budget.partition("/")
+        limits[route.strip()] = (float(count), float(period or 1))
+    return limits
+
+
+limiters = {
+    route: TokenBucketLimiter(count, period)
+    for route, (count, period) in parse_rate_limits(config.RATE_LIMITS).items()
+}
+upstream_gate = UpstreamGate(config.UPSTREAM_MAX_INFLIGHT, config.UPSTREAM_MAX_QUEUE, config.UPSTREAM_QUEUE_TIMEOUT_S)
+
+
+def client_key(request: Request) -> str:
+    """user_id dari JWT yang valid, atau IP client (token tidak di-trust tanpa verifikasi)."""
+    auth = request.headers.get("authorization", "")
+    if auth.lower().startswith("bearer "):
+        try:
+            user_id = jwt.decode(auth[7:], config.SECRET_KEY, algorithms=["HS256"]).get("user_id")
+            if user_id is not None:
+                return f"user:{user_id}"
+        except Exception:
+            pass
+    return f"ip:{request.client.host if request.client else 'unknown'}"
+
+
+def rate_limit(route: str):
+    """Dependency FastAPI: cek budget route untuk user ini, lalu admission control upstream."""
+    async def dependency(request: Request):
+        limiter = limiters.get(route)
+        if config.RATE_LIMIT_ENABLED and limiter is not None:
+            wait = limiter.take(client_key(request))
+            if wait:
+                raise RateLimited(wait)
+        upstream_gate.check()
+    return dependency
+
+
+def ratelimit_stats() -> dict:
+    return {
+        "enabled": config.RATE_LIMIT_ENABLED,
+        "routes": {route: limiter.stats() for route, limiter in limiters.items()},
+        "upstream": upstream_gate.stats(),
+    }
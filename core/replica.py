@@ -0,0 +1,225 @@
+# core/replica.py
+"""
+Routing bacaan ke read replica (``DATABASE_REPLICA_URLS``).
+
+Route baca riwayat / profil memakai ``Depends(get_read_db)``: session ke replica sehat
+(round-robin), atau ke primary (``SessionLocal``) jika:
+- user ini baru saja menulis (POST/PUT/PATCH/DELETE) dalam ``DB_REPLICA_STICKY_S`` detik
+  terakhir (read-your-writes; ditandai ``ReadYourWritesMiddleware`` saat response write
+  dimulai, disimpan di cache namespace ``db_sticky`` + per worker)
+- tidak ada replica sehat: dicek di background tiap ``DB_REPLICA_CHECK_S`` (ping + lag
+  replikasi MySQL / PostgreSQL), lag > ``DB_REPLICA_MAX_LAG_S`` atau error = dilewati
+- koneksi ke replica gagal saat request (replica ditandai down sampai cek berikutnya)
+
+Tanpa DATABASE_REPLICA_URLS semua bacaan tetap ke primary.
+"""
+import asyncio
+import logging
+import threading
+import time
+
+import jwt
+from fastapi import Request
+from sqlalchemy import text
+from sqlalchemy.engine import make_url
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.orm import sessionmaker
+
+from core import config
+from core.cache import get_cache
+from database import SessionLocal, create_db_engine
+
+logger = logging.getLogger(__name__)
+
+SAFE_METHODS = {"GET", "HEAD", "OPTIONS"}
+
+ReplicaSession = sessionmaker(autocommit=False, autoflush=False)
+
+PG_LAG_SQL = text("""
+    SELECT CASE
+        WHEN NOT pg_is_in_recovery() THEN 0
+        WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+        ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0)
+    END
+""")
+
+
+def replication_lag(conn) -> float:
+    """Lag replikasi (detik) dari sisi replica; 0 jika DB bukan replica (mis. dua DB lokal untuk test)."""
+    dialect = conn.dialect.name
+    if dialect == "mysql":
+        for statement in ("SHOW REPLICA STATUS", "SHOW SLAVE STATUS"):  # MySQL >= 8.0.22 / versi lama
+            try:
+                row = conn.exec_driver_sql(statement).mappings().first()
+            except DBAPIError:
+                continue
+            if row is None:
+                return 0.0
+            lag = row.get("Seconds_Behind_Source", row.get("Seconds_Behind_Master"))
+            if lag is None:
+                raise RuntimeError("Replikasi berhenti (Seconds_Behind_Source NULL)")
+            return float(lag)
+        raise RuntimeError("Tidak bisa membaca status replikasi (butuh privilege REPLICATION CLIENT)")
+    if dialect == "postgresql":
+        return float(conn.execute(PG_LAG_SQL).scalar() or 0)
+    conn.execute(text("SELECT 1"))
+    return 0.0
+
+
+class Replica:
+    def __init__(self, url: str):
+        self.url = make_url(url).render_as_string(hide_password=True)
+        self.engine = create_db_engine(url)
+        self.healthy = False  # belum dicek: bacaan ke primary dulu
+        self.lag_s = None
+        self.error = None
+        self.checked_at = None
+        self.reads = 0
+
+    def check(self):
+        try:
+            with self.engine.connect() as conn:
+                self.lag_s = replication_lag(conn)
+            self.error = None if self.lag_s <= config.DB_REPLICA_MAX_LAG_S else f"lag {self.lag_s:.1f} s"
+        except Exception as e:
+            self.lag_s, self.error = None, str(e)
+        changed = self.checked_at is None or self.healthy != (self.error is None)
+        self.healthy = self.error is None
+        self.checked_at = time.time()
+        if changed and self.healthy:
+            logger.info(f"[REPLICA] {self.url} sehat (lag {self.lag_s:.1f} s)")
+        elif changed:
+            logger.warning(f"[REPLICA] {self.url} dilewati: {self.error}")
+
+    def mark_down(self, error: Exception):
+        self.healthy, self.error = False, str(error)
+        logger.warning(f"[REPLICA] {self.url} gagal dipakai, fallback ke primary: {error}")
+
+    def stats(self) -> dict:
+        return {
+            "url": self.url,
+            "healthy": self.healthy,
+            "lag_s": self.lag_s,
+            "error": self.error,
+            "checked_s_ago": round(time.time() - self.checked_at, 1) if self.checked_at else None,
+            "reads": self.reads,
+        }
+
+
+class ReplicaSet:
+    def __init__(self, urls: list):
+        self.replicas = [Replica(url) for url in urls]
+        self._lock = threading.Lock()
+        self._next = 0
+        self._sticky = {}  # user_id -> monotonic kedaluwarsa (worker ini)
+        self.primary_reads = {"sticky": 0, "no_replica": 0, "connect_failed": 0}
+
+    def pick(self) -> Replica | None:
+        healthy = [r for r in self.replicas if r.healthy]
+        if not healthy:
+            return None
+        with self._lock:
+            self._next += 1
+            return healthy[self._next % len(healthy)]
+
+    def check(self) -> dict:
+        for replica in self.replicas:
+            replica.check()
+        return {"replicas": len(self.replicas), "healthy": sum(r.healthy for r in self.replicas)}
+
+    async def monitor(self):
+        while True:
+            await asyncio.sleep(config.DB_REPLICA_CHECK_S)
+            await asyncio.to_thread(self.check)
+
+    async def mark_write(self, user_id):
+        self._sticky[user_id] = time.monotonic() + config.DB_REPLICA_STICKY_S
+        await get_cache("db_sticky", config.DB_REPLICA_STICKY_S).aset(str(user_id), 1)
+
+    def is_sticky(self, user_id) -> bool:
+        until = self._sticky.get(user_id)
+        if until is not None:
+            if until > time.monotonic():
+                return True
+            self._sticky.pop(user_id, None)
+        # Write di worker lain (cache sqlite / redis)
+        return get_cache("db_sticky", config.DB_REPLICA_STICKY_S).get(str(user_id)) is not None
+
+    def session(self, user_id=None):
+        """Session baca untuk user ini: replica sehat, atau primary (lihat docstring modul)."""
+        if not self.replicas:
+            return SessionLocal()
+        if user_id is not None and self.is_sticky(user_id):
+            self.primary_reads["sticky"] += 1
+            return SessionLocal()
+        replica = self.pick()
+        if replica is None:
+            self.primary_reads["no_replica"] += 1
+            return SessionLocal()
+        db = ReplicaSession(bind=replica.engine)
+        try:
+            db.connection()  # checkout sekarang: replica mati -> fallback sebelum query route
+        except Exception as e:
+            db.close()
+            replica.mark_down(e)
+            self.primary_reads["connect_failed"] += 1
+            return SessionLocal()
+        replica.reads += 1
+        return db
+
+    def dispose(self):
+        for replica in self.replicas:
+            replica.engine.dispose()
+
+    def stats(self) -> dict:
+        return {
+            "replicas": [r.stats() for r in self.replicas],
+            "primary_reads": dict(self.primary_reads),
+            "sticky_s": config.DB_REPLICA_STICKY_S,
+            "max_lag_s": config.DB_REPLICA_MAX_LAG_S,
+        }
+
+
+replicas = ReplicaSet(config.DATABASE_REPLICA_URLS)
+
+
+def token_user_id(authorization: str):
+    """user_id dari JWT yang valid di header Authorization, atau None."""
+    if not authorization.lower().startswith("bearer "):
+        return None
+    try:
+        return jwt.decode(authorization[7:], config.SECRET_KEY, algorithms=["HS256"],
+                          options={"verify_exp": False}).get("user_id")
+    except Exception:
+        return None
+
+
+def get_read_db(request: Request):
+    """Dependency FastAPI untuk route read-only (pengganti get_db)."""
+    db = replicas.session(token_user_id(request.headers.get("authorization", "")))
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+class ReadYourWritesMiddleware:
+    """Tandai user yang menulis supaya bacaannya ke primary selama DB_REPLICA_STICKY_S."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not replicas.replicas or scope["method"] in SAFE_METHODS:
+            return await self.app(scope, receive, send)
+        user_id = token_user_id(dict(scope.get("headers", [])).get(b"authorization", b"").decode("latin-1"))
+        if user_id is None:
+            return await self.app(scope, receive, send)
+
+        async def send_wrapper(message):
+            # Ditandai setelah commit route, sebelum client menerima response (dan membaca lagi)
+            if message["type"] == "http.response.start":
+                await replicas.mark_write(user_id)
+            await send(message)
+
+        await self.app(scope, receive, send_wrapper)
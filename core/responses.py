@@ -0,0 +1,34 @@
+# core/responses.py
+import orjson
+from fastapi.responses import ORJSONResponse
+
+from core.compression import decompress_text
+
+
+class FastJSONResponse(ORJSONResponse):
+    """
+    Response class default app (orjson). Selain tipe biasa, ``content`` boleh berisi
+    ``orjson.Fragment`` (JSON yang sudah ter-serialize, misal kolom *_json di DB)
+    sehingga tidak perlu decode -> encode ulang.
+    """
+
+
+def json_fragment(text, default=None):
+    """
+    Bungkus string JSON hasil ``json.dumps`` (nutrition_json / rekomendasi_json) sebagai
+    Fragment supaya dikirim apa adanya (tanpa encode ulang). orjson tidak memvalidasi
+    Fragment, jadi teks divalidasi dulu dengan ``orjson.loads`` (cepat, tanpa membuat
+    ulang string JSON); teks yang bukan JSON valid -> ``default`` ({}), seperti sebelumnya.
+    """
+    if not text:
+        return {} if default is None else default
+    try:
+        # Nilai kolom CompressedText baru didekompresi di sini (saat benar-benar dikirim)
+        text = decompress_text(text)
+        stripped = text.strip()
+        value = orjson.loads(stripped)
+    except Exception:
+        return {} if default is None else default
+    if isinstance(value, (dict, list)) or value is None:
+        return orjson.Fragment(stripped)
+    return value
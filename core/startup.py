@@ -0,0 +1,158 @@
+# core/startup.py
+"""
+Fase startup app: import, cek schema (revisi Alembic), warm-up, lalu readiness.
+
+- Kegagalan DB saat startup tidak membuat worker crash; app tetap hidup (/healthz 200),
+  /readyz 503, dan startup diulang di background dengan backoff sampai berhasil.
+- Laporan waktu per modul/fase tersedia di ``report`` (dan /readyz?verbose=true).
+"""
+import asyncio
+import importlib
+import logging
+import os
+import time
+
+from sqlalchemy import text
+
+from core import config
+
+logger = logging.getLogger(__name__)
+
+PROCESS_START = time.perf_counter()
+
+
+class StartupState:
+    def __init__(self):
+        self.ready = False
+        self.attempts = 0
+        self.schema = None
+        self.last_error = None
+        self.report = []
+
+    def record(self, kind: str, name: str, started: float, ok: bool = True, **extra):
+        self.report.append({
+            "kind": kind,
+            "name": name,
+            "ms": round((time.perf_counter() - started) * 1000, 2),
+            "ok": ok,
+            **extra,
+        })
+
+    def summary(self) -> dict:
+        return {
+            "ready": self.ready,
+            "attempts": self.attempts,
+            "since_process_start_ms": round((time.perf_counter() - PROCESS_START) * 1000, 2),
+            "schema": self.schema,
+            "last_error": self.last_error,
+            "phases": self.report,
+        }
+
+
+state = StartupState()
+
+
+def timed_import(module_name: str):
+    """Import modul dan catat biaya import pertamanya (termasuk dependensi yang belum ter-load)."""
+    t0 = time.perf_counter()
+    module = importlib.import_module(module_name)
+    state.record("import", module_name, t0)
+    return module
+
+
+def check_schema(engine) -> dict:
+    """Bandingkan revisi Alembic di DB dengan head di alembic/versions (satu query)."""
+    from alembic.config import Config
+    from alembic.runtime.migration import MigrationContext
+    from alembic.script import ScriptDirectory
+
+    script = ScriptDirectory.from_config(Config(os.path.join(config.BASE_DIR, "alembic.ini")))
+    heads = set(script.get_heads())
+    with engine.connect() as conn:
+        current = set(MigrationContext.configure(conn).get_current_heads())
+    return {"ok": current == heads, "current": sorted(current), "head": sorted(heads)}
+
+
+def warm_db_pool(engine) -> int:
+    """Buka N koneksi sekaligus lalu kembalikan ke pool supaya request pertama tidak connect."""
+    size = config.DB_POOL_WARM or getattr(engine.pool, "size", lambda: 1)()
+    conns = []
+    try:
+        for _ in range(size):
+            conn = engine.connect()
+            conn.execute(text("SELECT 1"))
+            conns.append(conn)
+    finally:
+        for conn in conns:
+            conn.close()
+    return len(conns)
+
+
+def ping_db(engine) -> bool:
+    with engine.connect() as conn:
+        conn.execute(text("SELECT 1"))
+    return True
+
+
+async def _phase(kind: str, name: str, fn, *args, **kwargs):
+    t0 = time.perf_counter()
+    try:
+        if asyncio.iscoroutinefunction(fn):
+            result = await fn(*args, **kwargs)
+        else:
+            result = await asyncio.to_thread(fn, *args, **kwargs)
+    except Exception as e:
+        state.record(kind, name, t0, ok=False, error=str(e))
+        raise
+    state.record(kind, name, t0, result=result if isinstance(result, (dict, int, str, bool)) else None)
+    return result
+
+
+async def run_startup_once(engine, base_api_url: str) -> bool:
+    """Satu percobaan startup. Return True jika app siap menerima traffic."""
+    from utils import load_nutrition_rows
+    from core.http import warm_http_session
+    from core.cache import warm_cache
+    from core.replica import replicas
+
+    state.attempts += 1
+    # Simpan laporan import + fase dari percobaan terakhir saja
+    state.report = [p for p in state.report if p["kind"] == "import"]
+    try:
+        if config.DB_SCHEMA_MODE == "create":
+            from database import Base
+            await _phase("schema", "create_all", Base.metadata.create_all, bind=engine)
+            state.schema = {"ok": True, "mode": "create"}
+        else:
+            state.schema = await _phase("schema", "alembic_revision", check_schema, engine)
+            if not state.schema["ok"]:
+                raise RuntimeError(
+                    f"Schema DB {state.schema['current'] or '(belum di-stamp)'} != head {state.schema['head']}; "
+                    "jalankan `alembic upgrade head`"
+                )
+        await _phase("warmup", "db_pool", warm_db_pool, engine)
+        if replicas.replicas:
+            await _phase("warmup", "db_replicas", replicas.check)
+        await _phase("warmup", "nutrition_csv", lambda: len(load_nutrition_rows()))
+        await _phase("warmup", "http_client", warm_http_session, base_api_url)
+        await _phase("warmup", "cache", warm_cache)
+    except Exception as e:
+        state.last_error = str(e)
+        logger.error(f"[STARTUP] Percobaan {state.attempts} gagal: {e}")
+        return False
+    state.ready = True
+    state.last_error = None
+    logger.info(f"[STARTUP] Siap setelah {state.summary()['since_process_start_ms']} ms: " + ", ".join(
+        f"{p['name']}={p['ms']}ms" for p in state.report
+    ))
+    return True
+
+
+async def retry_startup(engine, base_api_url: str):
+    """Ulangi startup di background (backoff eksponensial) sampai berhasil."""
+    delay = 1.0
+    while not state.ready:
+        await asyncio.sleep(delay)
+        if await run_startup_once(engine, base_api_url):
+            return
+        delay = min(delay * 2, config.STARTUP_RETRY_MAX_S)
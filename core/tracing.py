@@ -0,0 +1,257 @@
+# core/tracing.py
+"""
+Tracing ringan per request: span untuk query DB, commit, disk, lookup CSV kebutuhan gizi,
+OCR dan ML, supaya upload yang lambat bisa dipecah per bagian.
+
+- ``TracingMiddleware``: satu trace per request (trace id dari header ``traceparent``
+  client jika ada, selain itu baru). Response membawa header ``Server-Timing``
+  (total durasi + jumlah per jenis span, mis. ``db;dur=12.4;desc="6x", ocr;dur=2310.2``).
+- ``span(name)`` / ``@traced(name)``: catat durasi blok kode ke trace aktif (contextvar,
+  ikut ke run_in_threadpool / asyncio.to_thread); tanpa trace aktif tidak melakukan apa-apa.
+- ``install_sql_hooks(engine)``: setiap statement SQL = span "db"; commit Session = "db.commit".
+- ``aiohttp_trace_config``: panggilan OCR/ML membawa ``traceparent`` (W3C) + ``X-Request-ID``.
+- Trace dengan total >= TRACE_SLOW_MS ditulis sebagai NDJSON ke TRACE_DIR/traces.ndjson
+  (rotate per ukuran) oleh thread background; request tidak pernah menunggu penulisan.
+"""
+import functools
+import logging
+import logging.handlers
+import os
+import queue
+import re
+import secrets
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime, timezone
+
+import aiohttp
+import orjson
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from core import config
+from core.log import NonBlockingQueueHandler, get_request_id
+
+_TRACEPARENT = re.compile(r"^00-([0-9a-f]{32})-[0-9a-f]{16}-[0-9a-f]{2}$")
+
+_current = ContextVar("trace", default=None)
+
+_export_logger = logging.getLogger("packfact.trace")
+_export_logger.propagate = False
+_listener = None
+_handler = None
+_exported = 0
+
+
+class Trace:
+    def __init__(self, trace_id: str, method: str, path: str):
+        self.trace_id = trace_id
+        self.method = method
+        self.path = path
+        self.started_at = time.time()
+        self.start = time.perf_counter()
+        self.spans = []  # (name, mulai ms dari awal request, durasi ms, attrs)
+        self.totals = {}  # name -> [total ms, jumlah]
+        self.dropped_spans = 0
+        self._lock = threading.Lock()
+
+    def add(self, name: str, t0: float, t1: float, attrs: dict | None = None):
+        ms = (t1 - t0) * 1000
+        with self._lock:
+            total = self.totals.setdefault(name, [0.0, 0])
+            total[0] += ms
+            total[1] += 1
+            if len(self.spans) < config.TRACE_MAX_SPANS:
+                self.spans.append((name, round((t0 - self.start) * 1000, 2), round(ms, 2), attrs))
+            else:
+                self.dropped_spans += 1
+
+    def elapsed_ms(self) -> float:
+        return (time.perf_counter() - self.start) * 1000
+
+    def server_timing(self) -> str:
+        with self._lock:
+            parts = [
+                f'{name};dur={ms:.1f}' + (f';desc="{count}x"' if count > 1 else "")
+                for name, (ms, count) in self.totals.items()
+            ]
+        parts.append(f"total;dur={self.elapsed_ms():.1f}")
+        return ", ".join(parts)
+
+    def to_dict(self, status: int | None, total_ms: float) -> dict:
+        return {
+            "ts": datetime.fromtimestamp(self.started_at, timezone.utc).isoformat(timespec="milliseconds"),
+            "trace_id": self.trace_id,
+            "request_id": get_request_id(),
+            "method": self.method,
+            "path": self.path,
+            "status": status,
+            "total_ms": round(total_ms, 2),
+            "summary": {name: {"ms": round(ms, 2), "count": count} for name, (ms, count) in self.totals.items()},
+            "spans": [{"name": n, "start_ms": s, "ms": ms, **(a or {})} for n, s, ms, a in self.spans],
+            "dropped_spans": self.dropped_spans,
+        }
+
+
+def current_trace() -> Trace | None:
+    return _current.get()
+
+
+@contextmanager
+def span(name: str, **attrs):
+    trace = _current.get()
+    if trace is None:
+        yield
+        return
+    t0 = time.perf_counter()
+    try:
+        yield
+    finally:
+        trace.add(name, t0, time.perf_counter(), attrs or None)
+
+
+def traced(name: str):
+    """Decorator fungsi sync: seluruh pemanggilan = satu span ``name``."""
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with span(name):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def install_sql_hooks(engine):
+    """Span "db" per statement SQL (dengan potongan SQL-nya) pada request yang sedang di-trace."""
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        if _current.get() is not None:
+            conn.info.setdefault("trace_query_start", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        trace, starts = _current.get(), conn.info.get("trace_query_start")
+        if trace is not None and starts:
+            trace.add("db", starts.pop(), time.perf_counter(), {"sql": " ".join(statement.split())[:120]})
+
+    @event.listens_for(engine, "handle_error")
+    def _error(context):
+        starts = context.connection.info.get("trace_query_start") if context.connection is not None else None
+        if starts:
+            starts.pop()
+
+
+def _install_session_hooks():
+    # Durasi commit (flush + COMMIT di DB, termasuk fsync) untuk semua Session
+    @event.listens_for(Session, "before_commit")
+    def _before_commit(session):
+        if _current.get() is not None:
+            session.info["trace_commit_start"] = time.perf_counter()
+
+    @event.listens_for(Session, "after_commit")
+    def _after_commit(session):
+        t0, trace = session.info.pop("trace_commit_start", None), _current.get()
+        if t0 is not None and trace is not None:
+            trace.add("db.commit", t0, time.perf_counter())
+
+    @event.listens_for(Session, "after_rollback")
+    def _after_rollback(session):
+        session.info.pop("trace_commit_start", None)
+
+
+def aiohttp_trace_config() -> aiohttp.TraceConfig:
+    """TraceConfig untuk session OCR/ML: header traceparent + X-Request-ID di setiap request."""
+
+    async def on_request_start(session, context, params):
+        trace = _current.get()
+        if trace is not None:
+            params.headers["traceparent"] = f"00-{trace.trace_id}-{secrets.token_hex(8)}-01"
+        request_id = get_request_id()
+        if request_id:
+            params.headers["X-Request-ID"] = request_id
+
+    trace_config = aiohttp.TraceConfig()
+    trace_config.on_request_start.append(on_request_start)
+    return trace_config
+
+
+def setup_tracing():
+    """Hook commit Session + thread penulis trace lambat ke TRACE_DIR (idempotent)."""
+    global _listener, _handler
+    if _listener is not None or not config.TRACING_ENABLED:
+        return
+    _install_session_hooks()
+    if config.TRACE_SLOW_MS < 0:
+        return
+    os.makedirs(config.TRACE_DIR, exist_ok=True)
+    file_handler = logging.handlers.RotatingFileHandler(
+        os.path.join(config.TRACE_DIR, "traces.ndjson"), maxBytes=config.TRACE_MAX_FILE_BYTES,
+        backupCount=config.TRACE_BACKUP_COUNT, encoding="utf-8", delay=True,
+    )
+    file_handler.setFormatter(logging.Formatter("%(message)s"))
+    trace_queue = queue.Queue(maxsize=config.LOG_QUEUE_SIZE)
+    _handler = NonBlockingQueueHandler(trace_queue)
+    _export_logger.addHandler(_handler)
+    _export_logger.setLevel(logging.INFO)
+    _listener = logging.handlers.QueueListener(trace_queue, file_handler)
+    _listener.start()
+
+
+def stop_tracing():
+    global _listener
+    if _listener is None:
+        return
+    _listener.stop()
+    _listener = None
+
+
+def export(trace: Trace, status: int | None):
+    global _exported
+    if _handler is None:
+        return
+    total_ms = trace.elapsed_ms()
+    if total_ms < config.TRACE_SLOW_MS:
+        return
+    _exported += 1
+    _export_logger.info(orjson.dumps(trace.to_dict(status, total_ms), default=str).decode("utf-8"))
+
+
+def stats() -> dict:
+    return {
+        "enabled": config.TRACING_ENABLED,
+        "slow_ms": config.TRACE_SLOW_MS,
+        "exported": _exported,
+        "dropped": _handler.dropped if _handler else 0,
+    }
+
+
+class TracingMiddleware:
+    """ASGI middleware: trace per request, header Server-Timing, export trace lambat."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not config.TRACING_ENABLED:
+            return await self.app(scope, receive, send)
+        match = _TRACEPARENT.match(dict(scope.get("headers", [])).get(b"traceparent", b"").decode("latin-1"))
+        trace_id = match.group(1) if match and match.group(1) != "0" * 32 else secrets.token_hex(16)
+        trace = Trace(trace_id, scope["method"], scope["path"])
+        token = _current.set(trace)
+        status = None
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                message["headers"] = [*message.get("headers", []), (b"server-timing", trace.server_timing().encode("latin-1"))]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _current.reset(token)
+            export(trace, status)
@@ -1,5 +1,42 @@
-from sqlalchemy.orm import Session
-from models import Product
+"""
+Query yang dipakai route riwayat / laporan gizi, dalam bentuk statement SELECT.
 
-def get_product_by_name(db: Session, name: str):
-    return db.query(Product).filter(Product.name == name).first()
+Dipakai route (``db.execute(...)``) dan suite performa query
+(``python -m bench.bench_queries``), jadi yang diukur + di-EXPLAIN sama persis dengan
+yang dijalankan di produksi.
+"""
+from datetime import date, datetime
+
+from sqlalchemy import select
+
+from core.archive import scan_select
+from models import Recommendation, User
+
+SCAN_HISTORY_COLUMNS = ("filename", "uploaded_at", "nutrition_json")
+
+
+def user_by_id(user_id: int):
+    return select(User).where(User.id == user_id)
+
+
+def recommendation_history(user_id: int):
+    return select(Recommendation.id, Recommendation.created_at, Recommendation.rekomendasi_json).where(
+        Recommendation.user_id == user_id
+    ).order_by(Recommendation.created_at.desc())
+
+
+def scan_history_all(user_id: int):
+    # Termasuk scan yang sudah diarsipkan (UNION ALL images_archive)
+    return scan_select(SCAN_HISTORY_COLUMNS, user_id)
+
+
+def scan_history_day(user_id: int, day: date):
+    return scan_select(
+        SCAN_HISTORY_COLUMNS, user_id,
+        start=datetime.combine(day, datetime.min.time()),
+        end=datetime.combine(day, datetime.max.time())
+    )
+
+
+def nutrition_report_scans(user_id: int, start: datetime, end: datetime):
+    return scan_select(("uploaded_at", "nutrition_json"), user_id, start=start, end=end, descending=False)
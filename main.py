@@ -1,19 +1,71 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI, HTTPException, Request
 from fastapi.responses import JSONResponse
 from fastapi.exception_handlers import RequestValidationError
 from fastapi.staticfiles import StaticFiles
 from fastapi.middleware.cors import CORSMiddleware
-from database import Base, engine
+import asyncio
+import logging
 import os
-from routes.auth import router as auth_router
-from routes.image import router as image_router
-from routes.nutrition import router as nutrition_router
+from core import startup
+from core.log import RequestIdMiddleware, setup_logging, stop_logging
+from core import tracing
+from core.config import UPLOAD_DIR, ARCHIVE_DIR
+from core.profiling import ProfilingMiddleware, install_sql_hooks
+from core.capture import CaptureMiddleware
+from core.idempotency import IdempotencyMiddleware
+from core.replica import ReadYourWritesMiddleware, replicas
+from core.responses import FastJSONResponse
+from core.http import close_http_session
+from core.cache import close_cache
 
-app = FastAPI()
+# Logging via queue + thread background (JSON, request_id); dipasang sebelum modul lain di-import
+setup_logging()
+tracing.setup_tracing()
+logger = logging.getLogger("packfact")
+
+# Import dicatat per modul untuk laporan startup (/readyz?verbose=true)
+engine = startup.timed_import("database").engine
+auth_router = startup.timed_import("routes.auth").router
+image_router = startup.timed_import("routes.image").router
+nutrition_router = startup.timed_import("routes.nutrition").router
+health_router = startup.timed_import("routes.health").router
+export_router = startup.timed_import("routes.export").router
+BASE_API_URL = startup.timed_import("routes.global_config").BASE_API_URL
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Cek schema + warm-up sebelum menerima traffic; jika DB belum siap,
+    # worker tetap jalan (/readyz 503) dan startup diulang di background.
+    retry_task = None
+    if not await startup.run_startup_once(engine, BASE_API_URL):
+        retry_task = asyncio.create_task(startup.retry_startup(engine, BASE_API_URL))
+    # Cek lag / kesehatan read replica berkala (core/replica.py)
+    replica_task = asyncio.create_task(replicas.monitor()) if replicas.replicas else None
+    yield
+    if retry_task is not None:
+        retry_task.cancel()
+    if replica_task is not None:
+        replica_task.cancel()
+    await close_http_session()
+    close_cache()
+    engine.dispose()
+    replicas.dispose()
+    tracing.stop_tracing()
+    stop_logging()
+
+
+# orjson untuk semua response default
+app = FastAPI(default_response_class=FastJSONResponse, lifespan=lifespan)
 
 # Mount folder images sebagai static files
-IMAGES_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), 'images'))
+IMAGES_DIR = UPLOAD_DIR
+os.makedirs(IMAGES_DIR, exist_ok=True)
 app.mount("/images", StaticFiles(directory=IMAGES_DIR), name="images")
+# File scan yang sudah diarsipkan (core/archive.py)
+os.makedirs(ARCHIVE_DIR, exist_ok=True)
+app.mount("/images-archive", StaticFiles(directory=ARCHIVE_DIR), name="images-archive")
 
 # Setup CORS
 app.add_middleware(
@@ -24,15 +76,36 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Create tables
-Base.metadata.create_all(bind=engine)
+# Profiling per-request (opt-in via header X-Profile / PROFILE_SAMPLE_RATE)
+app.add_middleware(ProfilingMiddleware)
+install_sql_hooks(engine)
+tracing.install_sql_hooks(engine)
+for replica in replicas.replicas:
+    install_sql_hooks(replica.engine)
+    tracing.install_sql_hooks(replica.engine)
+
+# Capture traffic untuk replay (aktif jika CAPTURE_ENABLED=true)
+app.add_middleware(CaptureMiddleware)
+
+# Read-your-writes: user yang baru menulis membaca dari primary (aktif jika DATABASE_REPLICA_URLS diisi)
+app.add_middleware(ReadYourWritesMiddleware)
+
+# Idempotency-Key untuk /upload/ dan /recommendation/save: retry di-replay tanpa OCR/ML ulang
+app.add_middleware(IdempotencyMiddleware)
+
+# Span DB / disk / CSV / OCR / ML per request -> header Server-Timing + export trace lambat
+app.add_middleware(tracing.TracingMiddleware)
+
+# Request id untuk log + capture (paling luar, jadi dipasang terakhir)
+app.add_middleware(RequestIdMiddleware)
 
 # 1. Error Handling (Best Practice: di main.py, bukan di router)
 @app.exception_handler(HTTPException)
 async def http_exception_handler(request: Request, exc: HTTPException):
     return JSONResponse(
         status_code=exc.status_code,
-        content={"detail": exc.detail or "Terjadi kesalahan pada server."}
+        content={"detail": exc.detail or "Terjadi kesalahan pada server."},
+        headers=getattr(exc, "headers", None)
     )
 
 @app.exception_handler(RequestValidationError)
@@ -44,13 +117,15 @@ async def validation_exception_handler(request: Request, exc: RequestValidationE
 
 @app.exception_handler(Exception)
 async def unhandled_exception_handler(request: Request, exc: Exception):
-    import traceback
-    print('UNHANDLED ERROR:', traceback.format_exc())
+    # Traceback dirender di thread ini, ditulis oleh thread logging
+    logger.error("Unhandled error", exc_info=exc, extra={"method": request.method, "path": request.url.path})
     return JSONResponse(
         status_code=500,
         content={"detail": "Internal server error. Silakan coba lagi nanti."}
     )
 
+app.include_router(health_router)
 app.include_router(auth_router)
 app.include_router(image_router)
 app.include_router(nutrition_router)
+app.include_router(export_router)
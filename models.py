@@ -1,5 +1,6 @@
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Text, Boolean
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Text, Boolean, Index, Float
 from database import Base
+from core.compression import CompressedText, compressed_property
 from datetime import datetime
 
 class Image(Base):
@@ -10,7 +11,49 @@ class Image(Base):
     filepath = Column(String(255), nullable=False)
     uploaded_at = Column(DateTime, default=datetime.utcnow)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=True)
-    nutrition_json = Column(Text, nullable=True)  # simpan hasil OCR (JSON string)
+    _nutrition_json = Column("nutrition_json", CompressedText, nullable=True)  # hasil OCR (JSON, terkompresi)
+    nutrition_json = compressed_property("_nutrition_json")
+    phash = Column(String(16), nullable=True)  # dHash 64-bit (hex), lihat core/phash.py
+
+    # Riwayat / laporan gizi: filter user_id + rentang uploaded_at, urut uploaded_at
+    __table_args__ = (Index("ix_images_user_uploaded", "user_id", "uploaded_at"),)
+
+class ImageArchive(Base):
+    """Scan lama yang dipindah dari images oleh job arsip (core/archive.py); id tetap sama."""
+    __tablename__ = "images_archive"
+
+    id = Column(Integer, primary_key=True, autoincrement=False)
+    filename = Column(String(255), nullable=False)
+    filepath = Column(String(255), nullable=False)  # path di ARCHIVE_DIR
+    uploaded_at = Column(DateTime)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=True)
+    _nutrition_json = Column("nutrition_json", CompressedText, nullable=True)
+    nutrition_json = compressed_property("_nutrition_json")
+    archived_at = Column(DateTime, default=datetime.utcnow)
+
+    __table_args__ = (Index("ix_images_archive_user_uploaded", "user_id", "uploaded_at"),)
+
+class ScanNutrient(Base):
+    """Nilai gizi per scan sebagai kolom angka untuk pencarian / filter (core/nutrient_search.py)."""
+    __tablename__ = "scan_nutrients"
+
+    image_id = Column(Integer, primary_key=True, autoincrement=False)  # id di images / images_archive
+    user_id = Column(Integer, nullable=False)
+    uploaded_at = Column(DateTime, nullable=True)
+    filename = Column(String(255), nullable=False)
+    energi = Column(Float, nullable=True)
+    protein = Column(Float, nullable=True)
+    lemak_total = Column(Float, nullable=True)
+    karbohidrat = Column(Float, nullable=True)
+    serat = Column(Float, nullable=True)
+    gula = Column(Float, nullable=True)
+    garam = Column(Float, nullable=True)
+
+    __table_args__ = (
+        Index("ix_scan_nutrients_user_uploaded", "user_id", "uploaded_at"),
+        *(Index(f"ix_scan_nutrients_user_{name}", "user_id", name)
+          for name in ("energi", "protein", "lemak_total", "karbohidrat", "serat", "gula", "garam")),
+    )
 
 class Recommendation(Base):
     __tablename__ = "recommendations"
@@ -18,7 +61,10 @@ class Recommendation(Base):
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
     created_at = Column(DateTime, default=datetime.utcnow)
-    rekomendasi_json = Column(Text, nullable=False)  # hasil rekomendasi gizi (JSON string)
+    _rekomendasi_json = Column("rekomendasi_json", CompressedText, nullable=False)  # hasil rekomendasi gizi (JSON, terkompresi)
+    rekomendasi_json = compressed_property("_rekomendasi_json")
+
+    __table_args__ = (Index("ix_recommendations_user_created", "user_id", "created_at"),)
 
 class User(Base):
     __tablename__ = "users"
@@ -0,0 +1,216 @@
+# nutrition_engine.py
+"""
+Engine perbandingan gizi untuk banyak scan sekaligus (laporan mingguan/bulanan).
+
+N scan x 7 nutrisi dimuat ke satu array NumPy, lalu total harian, kumulatif, persen
+kebutuhan dan hari yang melebihi batas dihitung dalam satu pass vektor (tanpa loop
+dict + float() per scan seperti ``utils.compare_nutrition``).
+"""
+import logging
+from datetime import date, datetime
+
+import numpy as np
+import orjson
+
+from core.compression import decompress_bytes
+from utils import CSV_KEY_MAP
+
+NUTRIENTS = tuple(CSV_KEY_MAP)
+# Nama lain dari OCR untuk nutrisi yang sama (lihat utils.extract_main_nutrition)
+ALIASES = {"lemak total": "total lemak"}
+
+logger = logging.getLogger(__name__)
+
+
+def _to_float(val) -> float:
+    if isinstance(val, (int, float)):
+        return float(val)
+    try:
+        return float(str(val).strip().replace(',', '.'))
+    except (TypeError, ValueError):
+        return 0.0
+
+
+def _parse_all(values: list) -> list:
+    """
+    Decode semua nutrition_json (teks atau BLOB terkompresi) dalam satu panggilan orjson;
+    fallback per baris jika ada yang rusak. Nilai yang rusak dihitung tanpa data ({}),
+    sama seperti baris tanpa nutrition_json.
+    """
+    texts = [_decompress(v) if v else None for v in values]
+    try:
+        parsed = orjson.loads(b"[" + b",".join(t or b"null" for t in texts) + b"]")
+    except orjson.JSONDecodeError:
+        parsed = []
+        for text in texts:
+            try:
+                parsed.append(orjson.loads(text) if text else None)
+            except orjson.JSONDecodeError:
+                parsed.append(None)
+    return [g if isinstance(g, dict) else {} for g in parsed]
+
+
+def _decompress(value) -> bytes | None:
+    try:
+        return decompress_bytes(value)
+    except Exception as e:  # zlib.error, codec tidak dikenal, zstandard tidak ter-install
+        logger.warning(f"nutrition_json tidak bisa didekompresi, dihitung tanpa data: {e}")
+        return None
+
+
+def _column(dicts: list, key: str) -> np.ndarray:
+    alias = ALIASES.get(key)
+    values = (g.get(key, g.get(alias, 0)) for g in dicts) if alias else (g.get(key, 0) for g in dicts)
+    try:
+        return np.fromiter(values, dtype=np.float64, count=len(dicts))
+    except (TypeError, ValueError):
+        # Ada nilai string/None dari OCR (mis. "1,5"): konversi per nilai
+        values = (g.get(key, g.get(alias, 0)) for g in dicts) if alias else (g.get(key, 0) for g in dicts)
+        return np.fromiter((_to_float(v) for v in values), dtype=np.float64, count=len(dicts))
+
+
+def scans_to_matrix(rows) -> tuple:
+    """
+    rows: list (uploaded_at, nutrition_json). Return (days, matrix):
+    days = nomor hari (date.toordinal) int64 per scan, matrix = float64 (N, 7) urut sesuai
+    NUTRIENTS. Nilai kosong / bukan angka dihitung 0; scan tanpa uploaded_at dilewati.
+    """
+    rows = [row for row in rows if row[0] is not None]
+    n = len(rows)
+    days = np.fromiter((row[0].toordinal() for row in rows), dtype=np.int64, count=n)
+    dicts = _parse_all([row[1] for row in rows])
+    matrix = np.empty((n, len(NUTRIENTS)), dtype=np.float64)
+    for j, key in enumerate(NUTRIENTS):
+        matrix[:, j] = _column(dicts, key)
+    np.nan_to_num(matrix, copy=False, nan=0.0, posinf=0.0, neginf=0.0)
+    return days, matrix
+
+
+def requirement_vector(kebutuhan_gizi: dict) -> np.ndarray:
+    """Dict kebutuhan harian (hasil map_kebutuhan_gizi) -> vektor (7,); nutrisi tanpa data = 0."""
+    return np.array([_to_float(kebutuhan_gizi.get(k, 0)) for k in NUTRIENTS], dtype=np.float64)
+
+
+def compute_report(days: np.ndarray, matrix: np.ndarray, requirement: np.ndarray) -> dict:
+    """
+    Hitung total per hari, kumulatif, persen kebutuhan dan flag melebihi batas.
+    Return array mentah (dipakai build_report dan benchmark).
+    """
+    if len(days):
+        order = np.argsort(days, kind="stable")
+        days, matrix = days[order], matrix[order]
+        starts = np.flatnonzero(np.r_[True, days[1:] != days[:-1]])
+        unique_days = days[starts]
+        daily = np.add.reduceat(matrix, starts, axis=0)
+        scan_counts = np.diff(np.r_[starts, len(days)])
+    else:
+        unique_days = days
+        daily = np.zeros((0, len(NUTRIENTS)))
+        scan_counts = np.zeros(0, dtype=np.int64)
+    has_req = requirement > 0
+    safe_req = np.where(has_req, requirement, 1.0)
+    percent = np.where(has_req, daily / safe_req * 100, np.nan)
+    over = (daily > requirement) & has_req
+    return {
+        "days": unique_days,
+        "scan_counts": scan_counts,
+        "daily": daily,
+        "cumulative": np.cumsum(daily, axis=0),
+        "percent": percent,
+        "over": over,
+    }
+
+
+def _round(values) -> list:
+    return [None if np.isnan(v) else round(float(v), 2) for v in values]
+
+
+def build_report(rows, kebutuhan_gizi: dict, date_from: date, date_to: date) -> dict:
+    """Laporan gizi periode [date_from, date_to] dari rows (uploaded_at, nutrition_json)."""
+    requirement = requirement_vector(kebutuhan_gizi)
+    days, matrix = scans_to_matrix(rows)
+    r = compute_report(days, matrix, requirement)
+    period_days = (date_to - date_from).days + 1
+    total = r["daily"].sum(axis=0)
+    period_req = requirement * period_days
+    period_percent = np.where(requirement > 0, total / np.where(requirement > 0, period_req, 1.0) * 100, np.nan)
+
+    daily_rows = r["daily"].round(2).tolist()
+    cumulative_rows = r["cumulative"].round(2).tolist()
+    over_rows = r["over"].tolist()
+    hari = []
+    for i, day in enumerate(r["days"].tolist()):
+        hari.append({
+            "tanggal": date.fromordinal(day).isoformat(),
+            "jumlah_scan": int(r["scan_counts"][i]),
+            "asupan": dict(zip(NUTRIENTS, daily_rows[i])),
+            "kumulatif": dict(zip(NUTRIENTS, cumulative_rows[i])),
+            "persen_kebutuhan": dict(zip(NUTRIENTS, _round(r["percent"][i]))),
+            "melebihi": [k for k, flag in zip(NUTRIENTS, over_rows[i]) if flag],
+        })
+    return {
+        "from": date_from.isoformat(),
+        "to": date_to.isoformat(),
+        "kebutuhan_harian": dict(zip(NUTRIENTS, requirement.round(2).tolist())),
+        "ringkasan": {
+            "jumlah_hari": period_days,
+            "hari_dengan_scan": len(hari),
+            "jumlah_scan": int(len(matrix)),
+            "total_asupan": dict(zip(NUTRIENTS, total.round(2).tolist())),
+            "rata_rata_harian": dict(zip(NUTRIENTS, (total / period_days).round(2).tolist())),
+            "persen_kebutuhan_periode": dict(zip(NUTRIENTS, _round(period_percent))),
+            "hari_melebihi": int(r["over"].any(axis=1).sum()),
+            "hari_melebihi_per_nutrisi": dict(zip(NUTRIENTS, r["over"].sum(axis=0).tolist())),
+        },
+        "hari": hari,
+    }
+
+
+# --- Skor kesehatan lokal per produk (cadangan ML health-score, lihat core/health_score.py) ---
+# Nutrisi yang dibatasi: skor turun linear dari 100 ke 0 saat produk = 100% kebutuhan harian
+LIMIT_WEIGHTS = {"energi": 1.0, "lemak total": 1.5, "karbohidrat": 0.5, "gula": 2.0, "garam": 2.0}
+# Nutrisi yang dianjurkan: skor dasar 50, penuh saat produk >= 50% kebutuhan harian
+BENEFIT_WEIGHTS = {"protein": 1.0, "serat": 1.0}
+HEALTH_CATEGORIES = ((80, "Sehat"), (60, "Cukup Sehat"), (40, "Kurang Sehat"), (0, "Tidak Sehat"))
+
+_IS_LIMIT = np.array([key in LIMIT_WEIGHTS for key in NUTRIENTS])
+_HEALTH_WEIGHTS = np.array([LIMIT_WEIGHTS.get(key, BENEFIT_WEIGHTS.get(key, 0.0)) for key in NUTRIENTS])
+
+
+def intake_vector(kandungan_gizi: dict) -> np.ndarray:
+    """Dict gizi satu produk -> vektor (7,); nutrisi yang tidak ada = NaN (tidak dinilai)."""
+    values = []
+    for key in NUTRIENTS:
+        val = kandungan_gizi.get(key)
+        if val is None and key in ALIASES:
+            val = kandungan_gizi.get(ALIASES[key])
+        values.append(np.nan if val in (None, "") else _to_float(val))
+    return np.array(values, dtype=np.float64)
+
+
+def health_scores(intake: np.ndarray, requirement: np.ndarray) -> np.ndarray:
+    """
+    Skor 0-100 untuk N produk sekaligus: intake (N, 7) dan requirement (7,) atau (N, 7) urut
+    NUTRIENTS. Rata-rata berbobot skor per nutrisi; nutrisi tanpa nilai (NaN) atau tanpa
+    kebutuhan (0) tidak dinilai. NaN jika tidak ada nutrisi yang bisa dinilai.
+    """
+    intake = np.atleast_2d(intake)
+    requirement = np.broadcast_to(requirement, intake.shape)
+    valid = (requirement > 0) & ~np.isnan(intake)
+    ratio = np.where(valid, np.nan_to_num(intake) / np.where(valid, requirement, 1.0), 0.0)
+    per_nutrient = np.where(_IS_LIMIT, 1.0 - np.clip(ratio, 0, 1), np.clip(0.5 + ratio, 0, 1)) * 100
+    weights = _HEALTH_WEIGHTS * valid
+    total = weights.sum(axis=1)
+    return np.where(total > 0, (per_nutrient * weights).sum(axis=1) / np.where(total > 0, total, 1.0), np.nan)
+
+
+def health_category(score: float) -> str:
+    for threshold, label in HEALTH_CATEGORIES:
+        if score >= threshold:
+            return label
+    return HEALTH_CATEGORIES[-1][1]
+
+
+def day_bounds(date_from: date, date_to: date) -> tuple:
+    """Batas datetime [awal date_from, akhir date_to] untuk filter uploaded_at."""
+    return datetime.combine(date_from, datetime.min.time()), datetime.combine(date_to, datetime.max.time())
@@ -10,13 +10,18 @@ from pydantic import BaseModel, EmailStr
 from passlib.context import CryptContext
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 import jwt
+import logging
 import os
 from models import User
 from database import SessionLocal
 from utils import verify_token
+from core.cache import get_cache
+from core.config import CACHE_TTL_PROFILE_S
+from core.replica import get_read_db
 from sqlalchemy.exc import SQLAlchemyError
 
 router = APIRouter()
+logger = logging.getLogger(__name__)
 
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 SECRET_KEY = os.environ.get("SECRET_KEY", "secretkey123")
@@ -80,7 +85,7 @@ def send_verification_email(email, token):
         smtp.sendmail(sender, [receiver], msg.as_string())
         smtp.quit()
     except Exception as e:
-        print(f"Gagal mengirim email verifikasi: {e}")
+        logger.warning(f"Gagal mengirim email verifikasi: {e}")
 
 @router.post("/register")
 def register(req: RegisterRequest, db: Session = Depends(get_db)):
@@ -151,14 +156,18 @@ def login(
     return {"userId": user.id, "name": user.nama, "token": token}
 
 @router.get("/me", response_model=UserProfileResponse)
-def get_profile(credentials: HTTPAuthorizationCredentials = Depends(security), user_data: dict = Depends(verify_token_dependency), db: Session = Depends(get_db)):
+def get_profile(credentials: HTTPAuthorizationCredentials = Depends(security), user_data: dict = Depends(verify_token_dependency), db: Session = Depends(get_read_db)):
     user_id = user_data.get("user_id")
     if not user_id:
         raise HTTPException(status_code=401, detail="User tidak ditemukan di token")
+    cache = profile_cache()
+    profile = cache.get(user_id) if cache is not None else None
+    if profile is not None:
+        return profile
     user = db.query(User).filter(User.id == user_id).first()
     if not user:
         raise HTTPException(status_code=404, detail="User tidak ditemukan di database")
-    return {
+    profile = {
         "id": user.id,
         "nama": user.nama,
         "email": user.email,
@@ -173,6 +182,17 @@ def get_profile(credentials: HTTPAuthorizationCredentials = Depends(security), u
         "umur_anak": user.umur_anak,
         "timezone": user.timezone
     }
+    if cache is not None:
+        cache.set(user_id, profile)
+    return profile
+
+def profile_cache():
+    """
+    Cache profil /me, hanya untuk backend bersama (sqlite / redis): PUT /me menghapus entry
+    di worker yang menangani write saja, jadi cache "memory" per worker bisa basi sampai TTL.
+    """
+    cache = get_cache("profile", CACHE_TTL_PROFILE_S)
+    return cache if cache.backend.shared else None
 
 @router.put("/me", response_model=UserProfileResponse)
 def update_profile(
@@ -221,6 +241,9 @@ def update_profile(
         user.timezone = timezone
     db.commit()
     db.refresh(user)
+    cache = profile_cache()
+    if cache is not None:
+        cache.delete(user_id)
     return {
         "message": "Profil berhasil diupdate",
         "id": user.id,
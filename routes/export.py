@@ -0,0 +1,179 @@
+# routes/export.py
+"""
+Export riwayat scan + rekomendasi user sebagai CSV atau NDJSON yang di-stream.
+
+Baris dibaca per batch dari server-side cursor (yield_per / stream_results) dan langsung
+ditulis ke response, jadi memori tetap konstan berapa pun jumlah riwayatnya.
+"""
+import csv
+import io
+import logging
+import os
+from datetime import date
+
+import orjson
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import StreamingResponse
+from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
+from sqlalchemy import select
+
+from core.archive import scan_select
+from core.compression import decompress_bytes
+from core.config import EXPORT_BATCH_SIZE
+from core.responses import json_fragment
+from database import SessionLocal
+from models import Recommendation
+from nutrition_engine import ALIASES, NUTRIENTS
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter()
+security = HTTPBearer()
+
+_INVALID = object()  # penanda nilai tersimpan yang tidak bisa didekompresi / di-decode
+
+CSV_COLUMNS = ("tipe", "id", "waktu", "filename", *NUTRIENTS, "rekomendasi_json")
+MEDIA_TYPES = {"csv": "text/csv; charset=utf-8", "ndjson": "application/x-ndjson"}
+
+
+def verify_token_dependency(credentials: HTTPAuthorizationCredentials = Depends(security)):
+    from utils import verify_token
+    SECRET_KEY = os.environ.get("SECRET_KEY", "secretkey123")
+    ALGORITHM = "HS256"
+    return verify_token(credentials, SECRET_KEY, ALGORITHM)
+
+
+def _skip_invalid(rec: dict, error):
+    logger.warning(f"[EXPORT] {rec['tipe']} id={rec['id']}: kolom JSON tidak bisa dibaca, dikosongkan ({error})")
+
+
+def _decompress_text(rec: dict, key: str) -> str:
+    """Teks JSON tersimpan; "" (dan dicatat) jika kosong atau rusak (zlib / codec / zstd tidak ada)."""
+    if not rec[key]:
+        return ""
+    try:
+        return decompress_bytes(rec[key]).decode("utf-8")
+    except Exception as e:
+        _skip_invalid(rec, e)
+        return ""
+
+
+def _parse_json(rec: dict, key: str) -> dict | list | None:
+    text = _decompress_text(rec, key)
+    if not text:
+        return None
+    try:
+        return orjson.loads(text)
+    except orjson.JSONDecodeError as e:
+        _skip_invalid(rec, e)
+        return None
+
+
+def flatten_nutrition(gizi) -> list:
+    """nutrition_json (dict) -> nilai per kolom NUTRIENTS (kosong jika tidak ada)."""
+    if not isinstance(gizi, dict):
+        return [""] * len(NUTRIENTS)
+    values = []
+    for key in NUTRIENTS:
+        val = gizi.get(key)
+        if val is None and key in ALIASES:
+            val = gizi.get(ALIASES[key])
+        values.append("" if val is None else val)
+    return values
+
+
+def iter_records(user_id: int, include: set, batch_size: int = EXPORT_BATCH_SIZE):
+    """
+    Generator batch record (list dict) riwayat user; kolom JSON masih mentah (tersimpan).
+    Punya session sendiri karena dijalankan selama response di-stream (session dari get_db
+    sudah ditutup saat itu); satu koneksi DB dipakai selama export berjalan.
+    """
+    db = SessionLocal()
+    try:
+        if "scans" in include:
+            # images + images_archive (scan lama yang sudah diarsipkan)
+            stmt = scan_select(("id", "uploaded_at", "filename", "nutrition_json"), user_id, descending=False)
+            stmt = stmt.execution_options(yield_per=batch_size)
+            for rows in db.execute(stmt).partitions():
+                yield [
+                    {
+                        "tipe": "scan",
+                        "id": row.id,
+                        "waktu": row.uploaded_at,
+                        "filename": row.filename,
+                        "kandungan_gizi": row.nutrition_json,
+                    }
+                    for row in rows
+                ]
+        if "recommendations" in include:
+            stmt = select(Recommendation.id, Recommendation.created_at, Recommendation.rekomendasi_json).where(
+                Recommendation.user_id == user_id
+            ).order_by(Recommendation.created_at, Recommendation.id).execution_options(yield_per=batch_size)
+            for rows in db.execute(stmt).partitions():
+                yield [
+                    {
+                        "tipe": "rekomendasi",
+                        "id": row.id,
+                        "waktu": row.created_at,
+                        "rekomendasi": row.rekomendasi_json,
+                    }
+                    for row in rows
+                ]
+    finally:
+        db.close()
+
+
+def stream_csv(batches):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(CSV_COLUMNS)
+    for records in batches:
+        for rec in records:
+            waktu = rec["waktu"].isoformat() if rec["waktu"] else ""
+            if rec["tipe"] == "scan":
+                writer.writerow(["scan", rec["id"], waktu, rec["filename"], *flatten_nutrition(_parse_json(rec, "kandungan_gizi")), ""])
+            else:
+                rekomendasi = _decompress_text(rec, "rekomendasi")
+                writer.writerow(["rekomendasi", rec["id"], waktu, "", *[""] * len(NUTRIENTS), rekomendasi])
+        yield buffer.getvalue().encode("utf-8")
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode("utf-8")
+
+
+def stream_ndjson(batches):
+    # JSON tersimpan dikirim apa adanya (Fragment), tanpa decode -> encode ulang
+    for records in batches:
+        for rec in records:
+            key = "kandungan_gizi" if rec["tipe"] == "scan" else "rekomendasi"
+            value = json_fragment(rec[key], default=_INVALID) if rec[key] else None
+            if value is _INVALID:
+                _skip_invalid(rec, "bukan JSON valid")
+                value = None
+            rec[key] = value
+        yield b"".join(orjson.dumps(rec) + b"\n" for rec in records)
+
+
+@router.get("/export")
+def export_history(
+    format: str = Query("csv", pattern="^(csv|ndjson)$"),
+    include: str = Query("scans,recommendations", description="scans dan/atau recommendations, pisahkan koma"),
+    credentials: HTTPAuthorizationCredentials = Depends(security),
+    user_data: dict = Depends(verify_token_dependency)
+):
+    """Export seluruh riwayat scan (gizi di-flatten per kolom untuk CSV) dan rekomendasi user."""
+    user_id = user_data.get("user_id")
+    if not user_id:
+        raise HTTPException(status_code=401, detail="User tidak ditemukan di token")
+    parts = {p.strip() for p in include.split(",") if p.strip()}
+    if not parts or parts - {"scans", "recommendations"}:
+        raise HTTPException(status_code=400, detail="Parameter include hanya boleh 'scans' dan/atau 'recommendations'")
+    batches = iter_records(user_id, parts)
+    body = stream_csv(batches) if format == "csv" else stream_ndjson(batches)
+    filename = f"packfact-riwayat-{user_id}-{date.today().isoformat()}.{format}"
+    return StreamingResponse(
+        body,
+        media_type=MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
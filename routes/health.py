@@ -0,0 +1,59 @@
+# routes/health.py
+from fastapi import APIRouter, Header
+from fastapi.responses import JSONResponse
+from starlette.concurrency import run_in_threadpool
+
+from core import startup, tracing
+from core.cache import cache_stats
+from core.health_score import hedge as health_score_hedge
+from core.log import stats as log_stats
+from core.ratelimit import ratelimit_stats
+from core.phash import phash_index
+from core.profiling import verify_profile_token
+from core.config import PROFILE_SECRET
+from core.replica import replicas
+from database import engine, pool_stats
+
+router = APIRouter()
+
+
+@router.get("/healthz")
+async def healthz():
+    """Liveness: proses hidup dan event loop merespons (tidak menyentuh DB)."""
+    return {"status": "ok"}
+
+
+@router.get("/readyz")
+async def readyz(verbose: bool = False, x_debug_token: str | None = Header(None)):
+    """
+    Readiness: startup & warm-up selesai, schema cocok, dan DB bisa di-query.
+    Publik hanya status; detail (error, statistik internal) butuh ``verbose=true`` + header
+    ``X-Debug-Token`` (token HMAC PROFILE_SECRET, buat dengan ``python -m core.profiling``).
+    """
+    if verbose and not verify_profile_token(x_debug_token or "", PROFILE_SECRET):
+        return JSONResponse(status_code=403, content={"detail": "verbose butuh header X-Debug-Token yang valid"})
+    body = {"status": "ready" if startup.state.ready else "not_ready"}
+    status_code = 200 if startup.state.ready else 503
+    error = startup.state.last_error if not startup.state.ready else None
+    if startup.state.ready:
+        try:
+            await run_in_threadpool(startup.ping_db, engine)
+        except Exception as e:
+            body["status"] = "not_ready"
+            error = f"DB tidak bisa dihubungi: {e}"
+            status_code = 503
+    if not verbose:
+        return JSONResponse(status_code=status_code, content=body)
+    if error:
+        body["error"] = error
+    body["startup"] = startup.state.summary()
+    body["cache"] = await run_in_threadpool(cache_stats)
+    body["ratelimit"] = ratelimit_stats()
+    body["phash"] = phash_index.stats()
+    body["db_pool"] = pool_stats(engine)
+    if replicas.replicas:
+        body["db_replicas"] = replicas.stats()
+    body["log"] = log_stats()
+    body["tracing"] = tracing.stats()
+    body["health_score_hedge"] = health_score_hedge.stats()
+    return JSONResponse(status_code=status_code, content=body)
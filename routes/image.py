@@ -1,13 +1,15 @@
 # routes/image.py
 # Pindahan dari image_routes.py
 from fastapi import APIRouter, UploadFile, File, Depends, HTTPException, Body, Form
+from sqlalchemy import update
 from sqlalchemy.orm import Session
-from models import Image
+from starlette.concurrency import run_in_threadpool
+from models import Image, ImageArchive
 from database import SessionLocal
-import os, uuid, shutil
+import os, uuid, shutil, time, asyncio
 from datetime import datetime
 import pytz
-from utils import allowed_file, extract_main_nutrition, map_kebutuhan_gizi, compare_nutrition
+from utils import allowed_file, extract_main_nutrition, map_kebutuhan_gizi, compare_nutrition, CSV_KEY_MAP
 import logging
 from fastapi.responses import HTMLResponse, JSONResponse
 import aiohttp
@@ -15,12 +17,22 @@ from fastapi.security import HTTPAuthorizationCredentials
 from routes.auth import security, verify_token_dependency  # Ganti ke dependency yang benar
 from routes.nutrition import get_daily_nutrition  # Import from routes.nutrition
 from routes.global_config import BASE_API_URL
+from core.config import UPLOAD_DIR, CACHE_TTL_OCR_S, PHASH_MAX_DISTANCE
+from core.cache import get_cache
+from core.capture import record_upstream, upstream_key
+from core.responses import FastJSONResponse
+from core.http import get_http_session
+from core.log import log_payload
+from core.ratelimit import Overloaded, rate_limit, upstream_gate
+from core.phash import dhash, enabled as phash_enabled, phash_index, to_hex
+from core import nutrient_search
+from core.tracing import span
 import json
 
 router = APIRouter()
 
-IMAGE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'images'))
-IMAGES_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '../images'))
+IMAGE_DIR = UPLOAD_DIR
+IMAGES_DIR = UPLOAD_DIR
 os.makedirs(IMAGE_DIR, exist_ok=True)
 logger = logging.getLogger(__name__)
 
@@ -33,13 +45,15 @@ def get_db():
     finally:
         db.close()
 
-@router.post("/upload/")
+@router.post("/upload/", dependencies=[Depends(rate_limit("upload"))])
 async def upload_image(
     file: UploadFile = File(...),
-    db: Session = Depends(get_db),
+    force_ocr: bool = Form(False),
     credentials: HTTPAuthorizationCredentials = Depends(security),
     user_data: dict = Depends(verify_token_dependency)
 ):
+    # Tanpa Depends(get_db): akses DB dibagi jadi unit kerja pendek (create_scan, save_scan_nutrition)
+    # di thread pool, jadi tidak ada koneksi DB yang dipegang selama menunggu OCR.
     if file is None:
         raise HTTPException(status_code=422, detail="File tidak ditemukan di form-data. Pastikan field bernama 'file'.")
     if not allowed_file(file.filename):
@@ -60,8 +74,12 @@ async def upload_image(
         unique_filename = f"{unique_id}{ext}"
         file_location = os.path.join(IMAGE_DIR, unique_filename)
         os.makedirs(IMAGE_DIR, exist_ok=True)
-        with open(file_location, "wb") as buffer:
-            shutil.copyfileobj(file.file, buffer)
+        image_bytes = await file.read()
+        with span("disk.write", bytes=len(image_bytes)):
+            await asyncio.to_thread(write_file, file_location, image_bytes)
+        # Foto label yang hampir sama dengan scan sebelumnya: pakai ulang hasil OCR-nya
+        with span("phash"):
+            phash = await asyncio.to_thread(dhash, image_bytes) if phash_enabled() else None
         # Ambil timezone user, default ke Asia/Jakarta jika tidak ada
         user_timezone = user_data.get("timezone", "Asia/Jakarta")
         try:
@@ -69,64 +87,183 @@ async def upload_image(
         except Exception:
             tz = pytz.timezone("Asia/Jakarta")
         now = datetime.now(tz)
-        image = Image(
-            filename=unique_filename,
-            filepath=file_location,
-            uploaded_at=now,
-            user_id=user_data.get("user_id")
+        image_id, duplicate = await run_in_threadpool(
+            create_scan, user_data.get("user_id"), unique_filename, file_location, now, phash, force_ocr
         )
-        db.add(image)
-        db.commit()
-        db.refresh(image)
-        # Panggil OCR API
-        ocr_result = await call_ocr_api(file_location)
-        csv_key_map = {
-            "energi": "Energi (kkal)",
-            "protein": "Protein (g)",
-            "lemak total": "Total Lemak (g)",
-            "karbohidrat": "Karbohidrat (g)",
-            "serat": "Serat (g)",
-            "gula": "Gula (g)",
-            "garam": "Garam (mg)"
-        }
-        kandungan_gizi = extract_main_nutrition(ocr_result)
-        kebutuhan_gizi = map_kebutuhan_gizi(kebutuhan, csv_key_map)
+        if duplicate is not None:
+            kandungan_gizi = duplicate.pop("kandungan_gizi")
+        else:
+            # Panggil OCR API (tanpa koneksi DB), lalu simpan hasilnya di unit kerja terpisah
+            ocr_result = await call_ocr_api(file_location, image_data=image_bytes)
+            kandungan_gizi = extract_main_nutrition(ocr_result)
+            await run_in_threadpool(save_scan_nutrition, image_id, kandungan_gizi)
+        kebutuhan_gizi = map_kebutuhan_gizi(kebutuhan, CSV_KEY_MAP)
         comparison = compare_nutrition(kandungan_gizi, kebutuhan_gizi)
-        image.nutrition_json = json.dumps(kandungan_gizi, ensure_ascii=False)
-        db.commit()
-        return JSONResponse(content={
+        content = {
             "message": "File uploaded successfully",
-            "id": image.id,
-            "filename": image.filename,
+            "id": image_id,
+            "filename": unique_filename,
             "kandungan_gizi": kandungan_gizi,
             "kebutuhan_harian": kebutuhan_gizi,
-            "perbandingan": comparison
-        })
+            "perbandingan": comparison,
+            "sumber_gizi": "ocr"
+        }
+        if duplicate is not None:
+            # Client bisa konfirmasi, atau minta OCR ulang lewat POST /reocr/{id} (atau upload dengan force_ocr=true)
+            content["sumber_gizi"] = "duplikat"
+            content["duplikat_dari"] = duplicate
+        return FastJSONResponse(content=content)
+    except Overloaded:
+        raise
     except Exception as e:
-        print(f"Error uploading file: {str(e)}")
+        logger.error(f"Error uploading file: {str(e)}", extra={"user_id": user_data.get("user_id")})
         return JSONResponse(status_code=500, content={"error": f"File upload failed: {str(e)}"})
 
-async def call_ocr_api(image_path: str):
+def write_file(path: str, data: bytes):
+    with open(path, "wb") as buffer:
+        buffer.write(data)
+
+def read_file(path: str) -> bytes:
+    with open(path, "rb") as img_file:
+        return img_file.read()
+
+def create_scan(user_id, filename: str, filepath: str, uploaded_at: datetime, phash: int | None, force_ocr: bool):
+    """
+    Unit kerja 1 upload: cari scan duplikat (perceptual hash) lalu insert baris Image.
+    Return (image_id, info duplikat atau None); koneksi sudah kembali ke pool saat return.
+    """
+    with SessionLocal() as db:
+        duplicate = None
+        if phash is not None and not force_ocr:
+            duplicate = find_duplicate_scan(db, user_id, phash)
+        image = Image(
+            filename=filename,
+            filepath=filepath,
+            uploaded_at=uploaded_at,
+            user_id=user_id,
+            phash=to_hex(phash) if phash is not None else None
+        )
+        info = None
+        if duplicate is not None:
+            duplicate_image, distance, kandungan_gizi = duplicate
+            image.nutrition_json = json.dumps(kandungan_gizi, ensure_ascii=False)
+            info = {
+                "id": duplicate_image.id,
+                "filename": duplicate_image.filename,
+                "uploaded_at": duplicate_image.uploaded_at,
+                "jarak": distance,
+                "kandungan_gizi": kandungan_gizi
+            }
+        db.add(image)
+        db.flush()
+        image_id = image.id
+        if duplicate is not None:
+            nutrient_search.reindex(db, [image_id])
+        db.commit()
+        return image_id, info
+
+def save_scan_nutrition(image_id: int, kandungan_gizi: dict):
+    """Unit kerja 2 upload / re-OCR: simpan hasil gizi (satu UPDATE, satu commit)."""
+    nutrition_json = json.dumps(kandungan_gizi, ensure_ascii=False)
+    with SessionLocal() as db:
+        for model in (Image, ImageArchive):
+            table = model.__table__
+            # Re-OCR scan yang sudah diarsipkan: barisnya ada di images_archive
+            if db.execute(update(table).where(table.c.id == image_id).values(nutrition_json=nutrition_json)).rowcount:
+                break
+        nutrient_search.reindex(db, [image_id])
+        db.commit()
+
+def find_duplicate_scan(db: Session, user_id, phash: int):
+    """
+    Scan user sebelumnya (dengan hasil gizi) yang fotonya hampir sama -> (Image, jarak, gizi) atau None.
+    Kandidat = scan terbaru di index phash (images.phash); images_archive tidak punya kolom phash,
+    jadi scan yang sudah diarsipkan hanya ikut jika sempat masuk index sebelum dipindah.
+    """
+    if not user_id:
+        return None
+    matches = phash_index.find(db, user_id, phash, PHASH_MAX_DISTANCE)[:10]
+    if not matches:
+        return None
+    candidates = {}
+    for model in (Image, ImageArchive):
+        missing = [image_id for _, image_id in matches if image_id not in candidates]
+        if not missing:
+            break
+        candidates.update(
+            (img.id, img) for img in db.query(model).filter(model.id.in_(missing), model._nutrition_json.is_not(None))
+        )
+    for distance, image_id in matches:
+        if image_id in candidates:
+            kandungan_gizi = json.loads(candidates[image_id].nutrition_json)
+            if kandungan_gizi:  # hasil OCR kosong tidak dipakai ulang
+                return candidates[image_id], distance, kandungan_gizi
+    return None
+
+async def call_ocr_api(image_path: str, use_cache: bool = True, image_data: bytes | None = None):
+    """OCR file gambar; ``image_data`` (isi file yang sudah ada di memori) melewati baca ulang dari disk."""
     try:
-        with open(image_path, "rb") as img_file:
-            image_data = img_file.read()
-        async with aiohttp.ClientSession() as session:
-            form_data = aiohttp.FormData()
-            form_data.add_field('file', image_data, filename='image.png', content_type='image/png')
-            async with session.post(OCR_API_URL, data=form_data) as response:
-                print(f"Status OCR API response: {response.status}")
-                if response.status == 200:
-                    result = await response.json()
-                    return result["result"]
-                else:
-                    raise HTTPException(status_code=500, detail="OCR API error")
+        if image_data is None:
+            with span("disk.read"):
+                image_data = await asyncio.to_thread(read_file, image_path)
+        # Gambar identik (sha256 sama) tidak perlu di-OCR ulang
+        cache = get_cache("ocr", CACHE_TTL_OCR_S)
+        image_hash = upstream_key(image_data)
+        cached = await cache.aget(image_hash) if use_cache else None
+        if cached is not None:
+            return cached
+        t0 = time.perf_counter()
+        session = get_http_session()
+        form_data = aiohttp.FormData()
+        form_data.add_field('file', image_data, filename='image.png', content_type='image/png')
+        with span("ocr"):
+            async with upstream_gate.slot():
+                async with session.post(OCR_API_URL, data=form_data) as response:
+                    latency_ms = (time.perf_counter() - t0) * 1000
+                    logger.info("ocr_call", extra={"status": response.status, "latency_ms": round(latency_ms, 1)})
+                    if response.status == 200:
+                        result = await response.json()
+                    else:
+                        raise HTTPException(status_code=500, detail="OCR API error")
+        log_payload(logger, "ocr_response", result)
+        record_upstream("/ocr/", image_hash, result, latency_ms)
+        await cache.aset(image_hash, result["result"])
+        return result["result"]
+    except HTTPException:
+        raise
     except Exception as e:
-        print(f"Error during OCR processing: {str(e)}")
+        logger.error(f"Error during OCR processing: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Failed to process image: {str(e)}")
     
+@router.post("/reocr/{image_id}", dependencies=[Depends(rate_limit("upload"))])
+async def reocr_image(
+    image_id: int,
+    credentials: HTTPAuthorizationCredentials = Depends(security),
+    user_data: dict = Depends(verify_token_dependency)
+):
+    """OCR ulang satu scan (misal hasil gizi dipakai ulang dari foto mirip tapi ternyata produk lain)."""
+    filepath = await run_in_threadpool(get_scan_filepath, image_id, user_data.get("user_id"))
+    if not filepath or not os.path.isfile(filepath):
+        raise HTTPException(status_code=404, detail="Image not found")
+    ocr_result = await call_ocr_api(filepath, use_cache=False)
+    kandungan_gizi = extract_main_nutrition(ocr_result)
+    await run_in_threadpool(save_scan_nutrition, image_id, kandungan_gizi)
+    return {"message": "OCR ulang berhasil", "id": image_id, "kandungan_gizi": kandungan_gizi, "sumber_gizi": "ocr"}
+
+def get_scan_filepath(image_id: int, user_id):
+    """Path file scan milik user, dari images atau (scan lama) images_archive di ARCHIVE_DIR."""
+    with SessionLocal() as db:
+        for model in (Image, ImageArchive):
+            filepath = db.query(model.filepath).filter(model.id == image_id, model.user_id == user_id).scalar()
+            if filepath is not None:
+                return filepath
+        return None
+
 @router.delete("/delete/{filename}")
-async def delete_image(filename: str, db: Session = Depends(get_db)):
+def delete_image(filename: str, db: Session = Depends(get_db)):
     image = db.query(Image).filter(Image.filename == filename).first()
+    if not image:
+        image = db.query(ImageArchive).filter(ImageArchive.filename == filename).first()
     if not image:
         raise HTTPException(status_code=404, detail="Image not found")
     if os.path.isfile(image.filepath):
@@ -135,12 +272,13 @@ async def delete_image(filename: str, db: Session = Depends(get_db)):
         except Exception as e:
             logger.error(f"Failed to delete file: {str(e)}")
             raise HTTPException(status_code=500, detail=f"Failed to delete file: {str(e)}")
+    nutrient_search.remove(db, [image.id])
     db.delete(image)
     db.commit()
     return {"message": f"Image {filename} deleted successfully"}
 
 @router.get("/")
-async def read_root(db: Session = Depends(get_db)):
+def read_root(db: Session = Depends(get_db)):
     images = db.query(Image).order_by(Image.uploaded_at.desc()).all()
     if not images:
         return "<h2>Belum ada gambar yang diupload.</h2>"
@@ -163,15 +301,19 @@ def gallery():
     return HTMLResponse(content=html)
 
 @router.put("/update-nutrition/{image_id}")
-async def update_nutrition(
+def update_nutrition(
     image_id: int,
     kandungan_gizi: dict = Body(...),
     db: Session = Depends(get_db)
 ):
     image = db.query(Image).filter(Image.id == image_id).first()
+    if not image:
+        image = db.query(ImageArchive).filter(ImageArchive.id == image_id).first()
     if not image:
         raise HTTPException(status_code=404, detail="Image not found")
     image.nutrition_json = json.dumps(kandungan_gizi, ensure_ascii=False)
+    db.flush()
+    nutrient_search.reindex(db, [image.id])
     db.commit()
     db.refresh(image)
     return {"message": "Kandungan gizi berhasil diupdate", "image_id": image.id, "kandungan_gizi": kandungan_gizi}
\ No newline at end of file
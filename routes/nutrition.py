@@ -1,19 +1,30 @@
 # routes/nutrition.py
 # Pindahan dari nutrition_routes.py
-from fastapi import APIRouter, Depends, HTTPException, Body, Request
+from fastapi import APIRouter, Depends, HTTPException, Body, Request, Query
 from fastapi.responses import JSONResponse
 from sqlalchemy.orm import Session
 from pydantic import BaseModel
 from typing import List
-from datetime import datetime, date
+from datetime import datetime, date, timedelta
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
+import asyncio
 import os
+import time
 from database import SessionLocal
 from models import Image, User, Recommendation
-from utils import get_daily_nutrition, proxy_ml_api
+from utils import get_daily_nutrition, proxy_ml_api, map_kebutuhan_gizi, CSV_KEY_MAP
+from nutrition_engine import build_report, day_bounds
 import logging
 import json
 from routes.global_config import BASE_API_URL
+from core.responses import FastJSONResponse, json_fragment
+from core.ratelimit import Overloaded, rate_limit
+import crud
+from core import config, nutrient_search
+from core.replica import get_read_db, replicas
+from core.health_score import hedge as health_score_hedge
+from core.idempotency import skip_store
+from starlette.concurrency import run_in_threadpool
 
 router = APIRouter()
 logger = logging.getLogger(__name__)
@@ -48,12 +59,17 @@ class ScanHistoryItem(BaseModel):
 class ScanHistoryAllResponse(BaseModel):
     history: List[ScanHistoryItem]
 
+class DashboardPayload(BaseModel):
+    # Payload khusus untuk ML health-score / predict-dieses; default = konsumsi + target_harian hari ini
+    health_scoring: dict | None = None
+    predict: dict | None = None
+
 @router.get("/daily-nutrition")
-async def get_daily_nutrition_endpoint(credentials: HTTPAuthorizationCredentials = Depends(security), user_data: dict = Depends(verify_token_dependency), db: Session = Depends(get_db)):
+def get_daily_nutrition_endpoint(credentials: HTTPAuthorizationCredentials = Depends(security), user_data: dict = Depends(verify_token_dependency), db: Session = Depends(get_read_db)):
     user_id = user_data.get("user_id")
     if not user_id:
         raise HTTPException(status_code=401, detail="User tidak ditemukan di token")
-    user = db.query(User).filter(User.id == user_id).first()
+    user = db.scalars(crud.user_by_id(user_id)).first()
     if not user:
         raise HTTPException(status_code=404, detail="User tidak ditemukan di database")
     kebutuhan = get_daily_nutrition(
@@ -65,18 +81,9 @@ async def get_daily_nutrition_endpoint(credentials: HTTPAuthorizationCredentials
         user.menyusui,
         user.umur_anak
     )
-    csv_key_map = {
-        "energi": "Energi (kkal)",
-        "protein": "Protein (g)",
-        "lemak total": "Total Lemak (g)",
-        "karbohidrat": "Karbohidrat (g)",
-        "serat": "Serat (g)",
-        "gula": "Gula (g)",
-        "garam": "Garam (mg)"
-    }
     kebutuhan_gizi = {}
     if kebutuhan:
-        for key, csv_key in csv_key_map.items():
+        for key, csv_key in CSV_KEY_MAP.items():
             if csv_key in kebutuhan and kebutuhan[csv_key] not in (None, ''):
                 val_raw = str(kebutuhan[csv_key]).strip().replace(',', '.')
                 try:
@@ -88,112 +95,253 @@ async def get_daily_nutrition_endpoint(credentials: HTTPAuthorizationCredentials
         return {"error": "Kebutuhan harian tidak ditemukan untuk data user ini."}
     return {"kebutuhan_harian": kebutuhan_gizi}
 
-@router.post("/recommendation")
+@router.post("/recommendation", dependencies=[Depends(rate_limit("recommendation"))])
 async def recommendation_proxy(payload: RecommendationPayload):
     result = await proxy_ml_api(ML_RECOMMEND_URL, payload.dict())
     return JSONResponse(status_code=200, content=result)
 
-@router.post("/recommendation/save")
+@router.post("/recommendation/save", dependencies=[Depends(rate_limit("recommendation"))])
 async def save_recommendation(
+    request: Request,
     payload: RecommendationPayload,
     credentials: HTTPAuthorizationCredentials = Depends(security),
-    user_data: dict = Depends(verify_token_dependency),
-    db: Session = Depends(get_db)
+    user_data: dict = Depends(verify_token_dependency)
 ):
     user_id = user_data.get("user_id")
     if not user_id:
         raise HTTPException(status_code=401, detail="User tidak ditemukan di token")
-    # Hapus semua rekomendasi lama user ini sebelum simpan baru
-    db.query(Recommendation).filter(Recommendation.user_id == user_id).delete()
-    db.commit()
+    # Panggil ML dulu: jika request ditolak karena upstream penuh, rekomendasi lama tidak hilang.
     # Tetap simpan meskipun result dari ML API belum ada/masih kosong
     try:
         result = await proxy_ml_api(ML_RECOMMEND_URL, payload.dict())
+    except Overloaded:
+        raise
     except Exception:
         result = None
-    rekomendasi_json = json.dumps(result, ensure_ascii=False)
-    rec = Recommendation(user_id=user_id, rekomendasi_json=rekomendasi_json)
-    db.add(rec)
-    db.commit()
-    db.refresh(rec)
+        # Retry dengan Idempotency-Key yang sama harus memanggil ML lagi, bukan replay hasil kosong
+        skip_store(request)
+    # Koneksi DB baru diambil setelah ML selesai (unit kerja pendek di thread pool)
+    await run_in_threadpool(replace_recommendation, user_id, json.dumps(result, ensure_ascii=False))
     return {"message": "Rekomendasi berhasil disimpan", "recommendation": result}
 
+def replace_recommendation(user_id: int, rekomendasi_json: str):
+    """Hapus semua rekomendasi lama user ini lalu simpan yang baru (satu commit)."""
+    with SessionLocal() as db:
+        db.query(Recommendation).filter(Recommendation.user_id == user_id).delete()
+        db.add(Recommendation(user_id=user_id, rekomendasi_json=rekomendasi_json))
+        db.commit()
+
 @router.get("/recommendation/history")
 def get_recommendation_history(
     credentials: HTTPAuthorizationCredentials = Depends(security),
     user_data: dict = Depends(verify_token_dependency),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ):
     user_id = user_data.get("user_id")
     if not user_id:
         raise HTTPException(status_code=401, detail="User tidak ditemukan di token")
-    recs = db.query(Recommendation).filter(Recommendation.user_id == user_id).order_by(Recommendation.created_at.desc()).all()
-    history = []
-    for rec in recs:
-        try:
-            rekomendasi = json.loads(rec.rekomendasi_json) if rec.rekomendasi_json else {}
-        except Exception:
-            rekomendasi = {}
-        history.append({
+    recs = db.execute(crud.recommendation_history(user_id)).all()
+    # JSON tersimpan dikirim apa adanya (tanpa json.loads -> encode ulang)
+    history = [
+        {
             "id": rec.id,
             "created_at": rec.created_at,
-            "recommendation": rekomendasi
-        })
-    return {"history": history}
+            "recommendation": json_fragment(rec.rekomendasi_json)
+        }
+        for rec in recs
+    ]
+    return FastJSONResponse({"history": history})
+
+def scan_history_response(rows) -> FastJSONResponse:
+    """
+    Serialize riwayat scan langsung ke JSON. Bentuknya sama dengan ScanHistoryAllResponse,
+    tapi tanpa membuat ScanHistoryItem per baris + validasi ulang response_model.
+    """
+    history = [
+        {
+            "filename": row.filename,
+            "uploaded_at": row.uploaded_at,
+            "kandungan_gizi": json_fragment(row.nutrition_json)
+        }
+        for row in rows
+    ]
+    return FastJSONResponse({"history": history})
 
 @router.get("/scan-history-all", response_model=ScanHistoryAllResponse)
-def get_scan_history_all(credentials: HTTPAuthorizationCredentials = Depends(security), user_data: dict = Depends(verify_token_dependency), db: Session = Depends(get_db)):
+def get_scan_history_all(credentials: HTTPAuthorizationCredentials = Depends(security), user_data: dict = Depends(verify_token_dependency), db: Session = Depends(get_read_db)):
     user_id = user_data.get("user_id")
     if not user_id:
         raise HTTPException(status_code=401, detail="User tidak ditemukan di token")
-    images = db.query(Image).filter(Image.user_id == user_id).order_by(Image.uploaded_at.desc()).all()
-    history = []
-    for img in images:
-        try:
-            import json
-            kandungan_gizi = json.loads(img.nutrition_json) if img.nutrition_json else {}
-        except Exception:
-            kandungan_gizi = {}
-        history.append(ScanHistoryItem(
-            filename=img.filename,
-            uploaded_at=img.uploaded_at,
-            kandungan_gizi=kandungan_gizi
-        ))
-    return {"history": history}
+    rows = db.execute(crud.scan_history_all(user_id)).all()
+    return scan_history_response(rows)
 
 @router.get("/scan-history", response_model=ScanHistoryAllResponse)
-def get_scan_history_today(credentials: HTTPAuthorizationCredentials = Depends(security), user_data: dict = Depends(verify_token_dependency), db: Session = Depends(get_db)):
+def get_scan_history_today(credentials: HTTPAuthorizationCredentials = Depends(security), user_data: dict = Depends(verify_token_dependency), db: Session = Depends(get_read_db)):
+    user_id = user_data.get("user_id")
+    if not user_id:
+        raise HTTPException(status_code=401, detail="User tidak ditemukan di token")
+    rows = db.execute(crud.scan_history_day(user_id, date.today())).all()
+    return scan_history_response(rows)
+
+SCAN_SEARCH_MAX_LIMIT = 200
+
+@router.get("/scan-search")
+def search_scans(
+    filter: List[str] = Query([], description="Filter nilai gizi, boleh berulang: gula>10, garam<=500"),
+    sort: str = Query("waktu", description="waktu atau nama nutrisi (mis. garam)"),
+    order: str = Query("desc", pattern="^(asc|desc)$"),
+    date_from: date | None = Query(None, alias="from"),
+    date_to: date | None = Query(None, alias="to"),
+    limit: int = Query(50, ge=1, le=SCAN_SEARCH_MAX_LIMIT),
+    offset: int = Query(0, ge=0),
+    credentials: HTTPAuthorizationCredentials = Depends(security),
+    user_data: dict = Depends(verify_token_dependency),
+    db: Session = Depends(get_read_db)
+):
+    """Cari scan user berdasarkan nilai gizi (index scan_nutrients), misal gula>10 urut garam tertinggi bulan ini."""
+    user_id = user_data.get("user_id")
+    if not user_id:
+        raise HTTPException(status_code=401, detail="User tidak ditemukan di token")
+    if date_from and date_to and date_from > date_to:
+        raise HTTPException(status_code=400, detail="Parameter 'from' harus sebelum atau sama dengan 'to'")
+    start = day_bounds(date_from, date_from)[0] if date_from else None
+    end = day_bounds(date_to, date_to)[1] if date_to else None
+    try:
+        filters = [nutrient_search.parse_filter(expr) for expr in filter]
+        stmt = nutrient_search.search_stmt(user_id, filters, sort.strip().lower(), order == "desc", start, end, limit, offset)
+    except nutrient_search.InvalidQuery as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    rows = db.execute(stmt).all()
+    return FastJSONResponse({
+        "scans": [nutrient_search.result_item(row) for row in rows],
+        "limit": limit,
+        "offset": offset,
+    })
+
+NUTRITION_REPORT_MAX_DAYS = 366
+
+@router.get("/nutrition-report")
+def get_nutrition_report(
+    date_from: date | None = Query(None, alias="from"),
+    date_to: date | None = Query(None, alias="to"),
+    credentials: HTTPAuthorizationCredentials = Depends(security),
+    user_data: dict = Depends(verify_token_dependency),
+    db: Session = Depends(get_read_db)
+):
+    """Laporan gizi per hari untuk periode from..to (default 7 hari terakhir)."""
+    user_id = user_data.get("user_id")
+    if not user_id:
+        raise HTTPException(status_code=401, detail="User tidak ditemukan di token")
+    date_to = date_to or date.today()
+    date_from = date_from or date_to - timedelta(days=6)
+    if date_from > date_to:
+        raise HTTPException(status_code=400, detail="Parameter 'from' harus sebelum atau sama dengan 'to'")
+    if (date_to - date_from).days + 1 > NUTRITION_REPORT_MAX_DAYS:
+        raise HTTPException(status_code=400, detail=f"Periode laporan maksimal {NUTRITION_REPORT_MAX_DAYS} hari")
+    user = db.scalars(crud.user_by_id(user_id)).first()
+    if not user:
+        raise HTTPException(status_code=404, detail="User tidak ditemukan di database")
+    kebutuhan = get_daily_nutrition(
+        user.gender,
+        user.umur,
+        user.umur_satuan,
+        user.hamil,
+        user.usia_kandungan,
+        user.menyusui,
+        user.umur_anak
+    )
+    start, end = day_bounds(date_from, date_to)
+    rows = db.execute(crud.nutrition_report_scans(user_id, start, end)).all()
+    return FastJSONResponse(build_report(rows, map_kebutuhan_gizi(kebutuhan, CSV_KEY_MAP), date_from, date_to))
+
+# Panggilan ML dashboard yang lewat timeout dibiarkan selesai (hasilnya masuk cache ML)
+_dashboard_background = set()
+
+def _background_done(task: asyncio.Task):
+    _dashboard_background.discard(task)
+    if not task.cancelled():
+        task.exception()  # error sudah dicatat proxy_ml_api
+
+async def dashboard_section(call, timeout: float) -> dict:
+    """Satu bagian ML dashboard (coroutine ``call``): {"status": "ok" | "timeout" | "error", "data" / "detail", "ms"}."""
+    t0 = time.perf_counter()
+    task = asyncio.ensure_future(call)
+    try:
+        section = {"status": "ok", "data": await asyncio.wait_for(asyncio.shield(task), timeout)}
+    except asyncio.TimeoutError:
+        _dashboard_background.add(task)
+        task.add_done_callback(_background_done)
+        section = {"status": "timeout", "detail": f"ML API belum merespons dalam {timeout:g} detik"}
+    except HTTPException as e:
+        section = {"status": "error", "status_code": e.status_code, "detail": e.detail}
+    section["ms"] = round((time.perf_counter() - t0) * 1000, 1)
+    return section
+
+def dashboard_today(user_id: int, today: date) -> dict | None:
+    """Kebutuhan harian, asupan dan scan hari ini (read replica jika ada); None jika user tidak ada."""
+    with replicas.session(user_id) as db:
+        user = db.scalars(crud.user_by_id(user_id)).first()
+        if not user:
+            return None
+        kebutuhan_gizi = map_kebutuhan_gizi(get_daily_nutrition(
+            user.gender,
+            user.umur,
+            user.umur_satuan,
+            user.hamil,
+            user.usia_kandungan,
+            user.menyusui,
+            user.umur_anak
+        ), CSV_KEY_MAP)
+        rows = db.execute(crud.scan_history_day(user_id, today)).all()
+    report = build_report([(row.uploaded_at, row.nutrition_json) for row in rows], kebutuhan_gizi, today, today)
+    return {
+        "tanggal": today.isoformat(),
+        "kebutuhan_harian": kebutuhan_gizi,
+        "asupan_hari_ini": report["ringkasan"]["total_asupan"],
+        "persen_kebutuhan": report["ringkasan"]["persen_kebutuhan_periode"],
+        "scan_hari_ini": [
+            {"filename": row.filename, "uploaded_at": row.uploaded_at, "kandungan_gizi": json_fragment(row.nutrition_json)}
+            for row in rows
+        ],
+    }
+
+@router.post("/dashboard", dependencies=[Depends(rate_limit("dashboard"))])
+async def get_dashboard(
+    payload: DashboardPayload | None = Body(None),
+    credentials: HTTPAuthorizationCredentials = Depends(security),
+    user_data: dict = Depends(verify_token_dependency)
+):
+    """
+    Ringkasan setelah scan dalam satu request (pengganti /daily-nutrition + /scan-history +
+    /recommendation + /health-scoring + /predict): data hari ini dari DB, lalu tiga panggilan
+    ML bersamaan. Bagian ML yang gagal atau lebih lambat dari DASHBOARD_SECTION_TIMEOUT_S
+    dikembalikan dengan status-nya tanpa menggagalkan bagian lain.
+    """
     user_id = user_data.get("user_id")
     if not user_id:
         raise HTTPException(status_code=401, detail="User tidak ditemukan di token")
-    today = date.today()
-    images = db.query(Image).filter(
-        Image.user_id == user_id,
-        Image.uploaded_at >= datetime.combine(today, datetime.min.time()),
-        Image.uploaded_at <= datetime.combine(today, datetime.max.time())
-    ).order_by(Image.uploaded_at.desc()).all()
-    history = []
-    for img in images:
-        try:
-            import json
-            kandungan_gizi = json.loads(img.nutrition_json) if img.nutrition_json else {}
-        except Exception:
-            kandungan_gizi = {}
-        history.append(ScanHistoryItem(
-            filename=img.filename,
-            uploaded_at=img.uploaded_at,
-            kandungan_gizi=kandungan_gizi
-        ))
-    return {"history": history}
-
-@router.post("/predict")
+    summary = await run_in_threadpool(dashboard_today, user_id, date.today())
+    if summary is None:
+        raise HTTPException(status_code=404, detail="User tidak ditemukan di database")
+    payload = payload or DashboardPayload()
+    harian = {"konsumsi": summary["asupan_hari_ini"], "target_harian": summary["kebutuhan_harian"]}
+    timeout = config.DASHBOARD_SECTION_TIMEOUT_S
+    rekomendasi, health_score, prediksi = await asyncio.gather(
+        dashboard_section(proxy_ml_api(ML_RECOMMEND_URL, harian), timeout),
+        dashboard_section(health_score_hedge.score(ML_HEALTH_SCORE_URL, payload.health_scoring or harian), timeout),
+        dashboard_section(proxy_ml_api(ML_PREDICT_URL, payload.predict or harian), timeout),
+    )
+    return FastJSONResponse({**summary, "rekomendasi": rekomendasi, "health_score": health_score, "prediksi": prediksi})
+
+@router.post("/predict", dependencies=[Depends(rate_limit("predict"))])
 async def predict_dieses_proxy(request: Request):
     payload = await request.json()
     result = await proxy_ml_api(ML_PREDICT_URL, payload)
     return JSONResponse(status_code=200, content=result)
 
-@router.post("/health-scoring")
+@router.post("/health-scoring", dependencies=[Depends(rate_limit("health_scoring"))])
 async def health_score_proxy(request: Request):
     payload = await request.json()
-    result = await proxy_ml_api(ML_HEALTH_SCORE_URL, payload)
+    # Skor lokal (approximate) jika ML lambat / error, lihat core/health_score.py
+    result = await health_score_hedge.score(ML_HEALTH_SCORE_URL, payload)
     return JSONResponse(status_code=200, content=result)
\ No newline at end of file
@@ -0,0 +1,56 @@
+# scripts/archive_scans.py
+"""
+Pindahkan scan yang lebih tua dari ARCHIVE_AFTER_DAYS ke images_archive + ARCHIVE_DIR
+(lihat core/archive.py). Per batch dengan jeda; aman dihentikan & dijalankan ulang
+(misal via cron harian).
+
+    python -m scripts.archive_scans --batch-size 500 --sleep 0.2
+"""
+import argparse
+import time
+
+from sqlalchemy import func, select
+
+from core import config
+from core.archive import archive_batch, archive_cutoff
+from database import engine
+from models import Image, ImageArchive
+
+
+def count_rows() -> tuple:
+    with engine.connect() as conn:
+        hot = conn.execute(select(func.count()).select_from(Image.__table__)).scalar()
+        cold = conn.execute(select(func.count()).select_from(ImageArchive.__table__)).scalar()
+    return hot, cold
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Arsipkan scan lama ke images_archive")
+    parser.add_argument("--batch-size", type=int, default=config.ARCHIVE_BATCH_SIZE)
+    parser.add_argument("--sleep", type=float, default=0.1, help="Jeda antar batch (detik)")
+    parser.add_argument("--max-batches", type=int, help="Berhenti setelah N batch")
+    args = parser.parse_args()
+
+    cutoff = archive_cutoff()
+    print(f"Arsipkan scan sebelum {cutoff.isoformat(timespec='seconds')} (ARCHIVE_AFTER_DAYS={config.ARCHIVE_AFTER_DAYS}) "
+          f"ke {config.ARCHIVE_DIR}")
+    totals = {"rows": 0, "files_moved": 0, "files_missing": 0}
+    started = time.perf_counter()
+    batches = 0
+    while args.max_batches is None or batches < args.max_batches:
+        result = archive_batch(cutoff, args.batch_size)
+        if not result["rows"]:
+            break
+        batches += 1
+        for key in totals:
+            totals[key] += result[key]
+        if args.sleep:
+            time.sleep(args.sleep)
+    hot, cold = count_rows()
+    print(f"Selesai dalam {time.perf_counter() - started:.1f} detik: {totals['rows']} scan diarsipkan, "
+          f"{totals['files_moved']} file dipindah, {totals['files_missing']} file tidak ditemukan. "
+          f"images={hot} baris, images_archive={cold} baris")
+
+
+if __name__ == "__main__":
+    main()
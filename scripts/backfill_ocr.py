@@ -0,0 +1,138 @@
+# scripts/backfill_ocr.py
+"""
+OCR ulang gambar yang nutrition_json-nya masih NULL (OCR gagal / timeout saat /upload/).
+
+Baris diambil per batch urut id, OCR dijalankan paralel (dibatasi ``--concurrency``) lewat
+``call_ocr_api`` yang sama dengan /upload/ (cache + admission control), lalu hasilnya
+ditulis dengan satu bulk UPDATE per batch. Progress (id terakhir) disimpan ke file
+checkpoint setelah tiap batch, jadi proses yang terputus bisa dilanjutkan.
+
+    python -m scripts.backfill_ocr --batch-size 200 --concurrency 8
+    python -m scripts.backfill_ocr --reset      # mulai dari awal (termasuk yang gagal sebelumnya)
+"""
+import argparse
+import asyncio
+import json
+import os
+import time
+
+from fastapi import HTTPException
+from sqlalchemy import bindparam, select, update
+
+from core import nutrient_search
+from core.http import close_http_session
+from database import SessionLocal, engine
+from models import Image
+from routes.image import call_ocr_api
+from utils import extract_main_nutrition
+
+DEFAULT_CHECKPOINT = "backfill_ocr.checkpoint.json"
+
+
+def load_checkpoint(path: str) -> dict:
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {"last_id": 0, "done": 0, "failed": 0, "failures": {}}
+
+
+def save_checkpoint(path: str, state: dict):
+    tmp = f"{path}.tmp"
+    with open(tmp, "w") as f:
+        json.dump(state, f, indent=2)
+    os.replace(tmp, path)  # atomic: checkpoint tidak pernah setengah tertulis
+
+
+def fetch_batch(last_id: int, batch_size: int, max_id: int | None) -> list:
+    db = SessionLocal()
+    try:
+        stmt = select(Image.id, Image.filepath).where(Image._nutrition_json.is_(None), Image.id > last_id)
+        if max_id is not None:
+            stmt = stmt.where(Image.id <= max_id)
+        return db.execute(stmt.order_by(Image.id).limit(batch_size)).all()
+    finally:
+        db.close()
+
+
+def write_results(results: list):
+    """Bulk UPDATE (+ index gizi); baris yang sudah terisi (misal lewat /update-nutrition) tidak ditimpa."""
+    table = Image.__table__
+    stmt = update(table).where(
+        table.c.id == bindparam("b_id"), table.c.nutrition_json.is_(None)
+    ).values(nutrition_json=bindparam("b_json"))
+    with engine.begin() as conn:
+        conn.execute(stmt, [{"b_id": image_id, "b_json": value} for image_id, value in results])
+        nutrient_search.reindex(conn, [image_id for image_id, _ in results])
+
+
+async def ocr_one(image_id: int, filepath: str, semaphore: asyncio.Semaphore) -> tuple:
+    """Return (id, nutrition_json atau None, alasan gagal atau None)."""
+    if not os.path.isfile(filepath):
+        return image_id, None, "file_missing"
+    async with semaphore:
+        try:
+            ocr_result = await call_ocr_api(filepath)
+        except HTTPException as e:
+            return image_id, None, f"http_{e.status_code}"
+        except Exception as e:
+            return image_id, None, type(e).__name__
+    return image_id, json.dumps(extract_main_nutrition(ocr_result), ensure_ascii=False), None
+
+
+async def backfill(args) -> dict:
+    state = {"last_id": 0, "done": 0, "failed": 0, "failures": {}} if args.reset else load_checkpoint(args.checkpoint)
+    semaphore = asyncio.Semaphore(args.concurrency)
+    started = time.perf_counter()
+    processed = 0
+    try:
+        while True:
+            rows = await asyncio.to_thread(fetch_batch, state["last_id"], args.batch_size, args.max_id)
+            if not rows:
+                break
+            t0 = time.perf_counter()
+            outcomes = await asyncio.gather(*(ocr_one(row.id, row.filepath, semaphore) for row in rows))
+            results = [(image_id, value) for image_id, value, error in outcomes if error is None]
+            if results and not args.dry_run:
+                await asyncio.to_thread(write_results, results)
+            for _, _, error in outcomes:
+                if error is not None:
+                    state["failures"][error] = state["failures"].get(error, 0) + 1
+            state["last_id"] = rows[-1].id
+            state["done"] += len(results)
+            state["failed"] += len(rows) - len(results)
+            processed += len(rows)
+            if not args.dry_run:
+                save_checkpoint(args.checkpoint, state)
+            elapsed = time.perf_counter() - t0
+            print(f"batch s/d id {state['last_id']}: {len(results)}/{len(rows)} berhasil, "
+                  f"{len(rows) / elapsed:.1f} gambar/detik")
+    finally:
+        await close_http_session()
+    total_s = time.perf_counter() - started
+    return {
+        **state,
+        "processed_this_run": processed,
+        "seconds": round(total_s, 1),
+        "images_per_s": round(processed / total_s, 2) if total_s else 0.0,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="OCR ulang gambar tanpa nutrition_json")
+    parser.add_argument("--batch-size", type=int, default=100)
+    parser.add_argument("--concurrency", type=int, default=4, help="Maksimal panggilan OCR bersamaan")
+    parser.add_argument("--checkpoint", default=DEFAULT_CHECKPOINT)
+    parser.add_argument("--reset", action="store_true", help="Abaikan checkpoint, mulai dari id terkecil")
+    parser.add_argument("--max-id", type=int, help="Hanya proses id <= nilai ini")
+    parser.add_argument("--dry-run", action="store_true", help="Jalankan OCR tanpa menulis DB / checkpoint")
+    args = parser.parse_args()
+    report = asyncio.run(backfill(args))
+    print(f"Selesai: {report['processed_this_run']} gambar diproses dalam {report['seconds']} detik "
+          f"({report['images_per_s']} gambar/detik); total berhasil {report['done']}, gagal {report['failed']}")
+    if report["failures"]:
+        print("Gagal per penyebab: " + ", ".join(f"{k}={v}" for k, v in sorted(report["failures"].items())))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+# scripts/compress_blobs.py
+"""
+Kompres data lama nutrition_json / rekomendasi_json secara online (setelah migrasi
+compress_json_columns). Diproses per batch urut id dengan jeda antar batch; UPDATE
+bersyarat (``WHERE id = :id AND kolom = :lama``) jadi baris yang berubah di tengah
+jalan tidak tertimpa. Aman dijalankan ulang: nilai yang sudah terkompresi dilewati.
+
+    python -m scripts.compress_blobs --batch-size 500 --sleep 0.2
+    python -m scripts.compress_blobs --dry-run   # hanya laporan penghematan
+"""
+import argparse
+import time
+
+from sqlalchemy import text
+
+from core.compression import compress_text, is_compressed
+from database import engine
+
+COLUMNS = (("images", "nutrition_json"), ("recommendations", "rekomendasi_json"))
+
+
+def _as_bytes(value) -> bytes:
+    return value.encode("utf-8") if isinstance(value, str) else bytes(value)
+
+
+def compress_column(table: str, column: str, batch_size: int, sleep_s: float, dry_run: bool) -> dict:
+    stats = {"rows": 0, "compressed": 0, "skipped": 0, "conflicts": 0, "bytes_before": 0, "bytes_after": 0}
+    last_id = 0
+    while True:
+        with engine.connect() as conn:
+            rows = conn.execute(
+                text(f"SELECT id, {column} FROM {table} WHERE id > :last_id AND {column} IS NOT NULL "
+                     f"ORDER BY id LIMIT :limit"),
+                {"last_id": last_id, "limit": batch_size},
+            ).fetchall()
+        if not rows:
+            break
+        last_id = rows[-1][0]
+        updates = []
+        for row_id, value in rows:
+            raw = _as_bytes(value)
+            stats["rows"] += 1
+            stats["bytes_before"] += len(raw)
+            packed = raw if is_compressed(raw) else compress_text(raw)
+            stats["bytes_after"] += len(packed)
+            if packed == raw:
+                stats["skipped"] += 1
+            else:
+                updates.append({"id": row_id, "old": value, "new": packed})
+        if updates and not dry_run:
+            with engine.begin() as conn:
+                for params in updates:
+                    result = conn.execute(
+                        text(f"UPDATE {table} SET {column} = :new WHERE id = :id AND {column} = :old"), params
+                    )
+                    if result.rowcount:
+                        stats["compressed"] += 1
+                    else:
+                        stats["conflicts"] += 1  # sudah diubah request lain; akan tersimpan terkompresi oleh app
+        elif dry_run:
+            stats["compressed"] += len(updates)
+        if sleep_s:
+            time.sleep(sleep_s)
+    before, after = stats["bytes_before"], stats["bytes_after"]
+    stats["saved_pct"] = round((1 - after / before) * 100, 1) if before else 0.0
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Kompres kolom JSON lama secara online")
+    parser.add_argument("--batch-size", type=int, default=500)
+    parser.add_argument("--sleep", type=float, default=0.1, help="Jeda antar batch (detik)")
+    parser.add_argument("--dry-run", action="store_true", help="Hitung penghematan tanpa menulis")
+    args = parser.parse_args()
+    for table, column in COLUMNS:
+        stats = compress_column(table, column, args.batch_size, args.sleep, args.dry_run)
+        print(f"{table}.{column}: {stats['rows']} baris, {stats['compressed']} dikompres, "
+              f"{stats['skipped']} dilewati, {stats['conflicts']} konflik, "
+              f"{stats['bytes_before']} -> {stats['bytes_after']} byte (hemat {stats['saved_pct']}%)")
+
+
+if __name__ == "__main__":
+    main()
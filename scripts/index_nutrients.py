@@ -0,0 +1,54 @@
+# scripts/index_nutrients.py
+"""
+Isi tabel scan_nutrients (pencarian gizi, lihat core/nutrient_search.py) dari
+nutrition_json scan lama di images dan images_archive, setelah migrasi add_scan_nutrients.
+
+Diproses per batch urut id dengan jeda antar batch; tiap batch ditulis ulang dalam satu
+transaksi dari data terbaru, jadi aman dijalankan ulang dan bersamaan dengan app.
+
+    python -m scripts.index_nutrients --batch-size 1000 --sleep 0.1
+"""
+import argparse
+import time
+
+from sqlalchemy import select
+
+from core import nutrient_search
+from database import engine
+from models import Image, ImageArchive
+
+
+def index_table(model, batch_size: int, sleep_s: float) -> dict:
+    stats = {"scans": 0, "indexed": 0}
+    last_id = 0
+    while True:
+        with engine.connect() as conn:
+            ids = list(conn.execute(
+                select(model.id).where(model.id > last_id, model._nutrition_json.is_not(None))
+                .order_by(model.id).limit(batch_size)
+            ).scalars())
+        if not ids:
+            break
+        last_id = ids[-1]
+        with engine.begin() as conn:
+            stats["indexed"] += nutrient_search.reindex(conn, ids)
+        stats["scans"] += len(ids)
+        if sleep_s:
+            time.sleep(sleep_s)
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Isi index gizi scan_nutrients dari data lama")
+    parser.add_argument("--batch-size", type=int, default=1000)
+    parser.add_argument("--sleep", type=float, default=0.1, help="Jeda antar batch (detik)")
+    args = parser.parse_args()
+    for model in (Image, ImageArchive):
+        t0 = time.perf_counter()
+        stats = index_table(model, args.batch_size, args.sleep)
+        print(f"{model.__tablename__}: {stats['scans']} scan dengan gizi, {stats['indexed']} diindex "
+              f"({time.perf_counter() - t0:.1f} detik)")
+
+
+if __name__ == "__main__":
+    main()
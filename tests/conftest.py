@@ -0,0 +1,10 @@
+# tests/conftest.py
+import os
+import sys
+import tempfile
+
+# Modul app membuat engine saat import: arahkan ke SQLite sementara, bukan MySQL lokal
+os.environ.setdefault("DATABASE_URL", "sqlite:///" + os.path.join(tempfile.mkdtemp(prefix="packfact-test-"), "test.db"))
+os.environ.setdefault("CACHE_BACKEND", "memory")
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,103 @@
+# tests/test_cache.py
+import pytest
+
+from core import cache as cache_module
+from core.cache import Cache, MemoryCache, NullCache, SQLiteCache
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1_000_000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(cache_module.time, "time", clock)
+    return clock
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def backend(request, tmp_path):
+    if request.param == "memory":
+        backend = MemoryCache(max_entries=3)
+    else:
+        backend = SQLiteCache(str(tmp_path / "cache.sqlite3"), max_entries=3)
+    yield backend
+    backend.close()
+
+
+def test_ttl_expiry(backend, clock):
+    backend.set("a", b"1", ttl=10)
+    backend.set("b", b"2")  # tanpa TTL
+    clock.now += 9.9
+    assert backend.get("a") == b"1"
+    clock.now += 0.2
+    assert backend.get("a") is None
+    assert backend.get("b") == b"2"
+    assert backend.info()["expired"] == 1
+
+
+def test_lru_eviction(backend, clock):
+    for key in ("a", "b", "c"):
+        backend.set(key, key.encode())
+        clock.now += 2  # sqlite: accessed_at hanya di-update setelah TOUCH_INTERVAL_S
+    assert backend.get("a") == b"a"  # a jadi paling baru dipakai
+    clock.now += 2
+    backend.set("d", b"d")
+    assert backend.get("b") is None
+    assert [backend.get(k) for k in ("a", "c", "d")] == [b"a", b"c", b"d"]
+    assert backend.info()["evictions"] == 1
+
+
+def test_add_only_when_missing_or_expired(backend, clock):
+    assert backend.add("k", b"1", ttl=5)
+    assert not backend.add("k", b"2", ttl=5)
+    assert backend.get("k") == b"1"
+    clock.now += 6
+    assert backend.add("k", b"3", ttl=5)
+    assert backend.get("k") == b"3"
+    backend.delete("k")
+    assert backend.get("k") is None
+
+
+def test_namespaced_view_and_default_ttl(clock):
+    backend = MemoryCache()
+    ocr, ml = Cache(backend, "ocr", ttl=10), Cache(backend, "ml")
+    ocr.set("x", {"gula": 12})
+    ml.set("x", [1, 2])
+    assert ocr.get("x") == {"gula": 12}
+    assert ml.get("x") == [1, 2]
+    clock.now += 11
+    assert ocr.get("x") is None
+    assert ml.get("x") == [1, 2]
+    ml.clear()
+    assert ml.get("x", "miss") == "miss"
+    assert ocr.stats()["hits"] == 1 and ocr.stats()["misses"] == 1
+
+
+def test_backend_errors_are_misses():
+    class Broken(NullCache):
+        def get(self, key):
+            raise ConnectionError("redis mati")
+
+        def set(self, key, value, ttl=None):
+            raise ConnectionError("redis mati")
+
+    cache = Cache(Broken(), "ml")
+    cache.set("x", 1)
+    assert cache.get("x") is None
+    assert cache.stats()["errors"] == 2
+
+
+@pytest.mark.parametrize("name, cached", [("memory", False), ("none", False), ("sqlite", True)])
+def test_profile_cached_only_with_shared_backend(monkeypatch, tmp_path, name, cached):
+    from routes.auth import profile_cache
+
+    monkeypatch.setattr(cache_module.config, "CACHE_SQLITE_PATH", str(tmp_path / "cache.sqlite3"))
+    monkeypatch.setattr(cache_module, "_backend", cache_module.create_backend(name))
+    monkeypatch.setattr(cache_module, "_caches", {})
+    assert (profile_cache() is not None) == cached
@@ -0,0 +1,96 @@
+# tests/test_compression.py
+import json
+
+import pytest
+from sqlalchemy import Column, Integer, MetaData, Table, create_engine, insert, select
+
+from core import compression, config
+from core.compression import CompressedText, compress_text, decompress_bytes, decompress_text, is_compressed
+
+GIZI = {"energi": 210, "protein": 4, "lemak total": 9, "karbohidrat": 28, "serat": 1, "gula": 12, "garam": 160}
+LONG_JSON = json.dumps({"rekomendasi": [{"nutrisi": k, "saran": "Kurangi konsumsi"} for k in GIZI] * 5})
+
+
+def test_plain_text_round_trip():
+    text = json.dumps(GIZI, ensure_ascii=False)
+    assert decompress_text(compress_text(text)) == text
+
+
+def test_long_text_is_compressed():
+    stored = compress_text(LONG_JSON)
+    assert is_compressed(stored)
+    assert len(stored) < len(LONG_JSON)
+    assert decompress_text(stored) == LONG_JSON
+    assert decompress_bytes(stored) == LONG_JSON.encode("utf-8")
+
+
+def test_unicode_round_trip():
+    text = json.dumps({"saran": "Kurangi gula – maks 50 g/hari ✓"} | GIZI, ensure_ascii=False) * 3
+    assert decompress_text(compress_text(text)) == text
+
+
+def test_small_value_stored_uncompressed():
+    # Header + deflate lebih besar dari teksnya: disimpan apa adanya
+    stored = compress_text("{}")
+    assert stored == b"{}"
+    assert not is_compressed(stored)
+    assert decompress_text(stored) == "{}"
+
+
+def test_already_compressed_value_is_not_compressed_twice():
+    stored = compress_text(LONG_JSON)
+    assert compress_text(stored) == stored
+
+
+@pytest.mark.parametrize("legacy", [LONG_JSON, LONG_JSON.encode("utf-8"), bytearray(LONG_JSON.encode("utf-8"))])
+def test_legacy_uncompressed_rows(legacy):
+    # Baris lama (Text / BLOB tanpa marker) dibaca apa adanya
+    assert decompress_text(legacy) == LONG_JSON
+    assert not is_compressed(legacy)
+
+
+def test_empty_and_none():
+    assert compress_text(None) is None
+    assert compress_text("") == b""
+    assert decompress_bytes(None) is None
+    assert decompress_text(None) is None
+    assert decompress_bytes(b"") == b""
+    assert decompress_text(b"") == ""
+    assert not is_compressed(None)
+    assert not is_compressed(b"")
+
+
+def test_codec_none_stores_plain_text():
+    assert compress_text(LONG_JSON, codec="none") == LONG_JSON.encode("utf-8")
+
+
+def test_unknown_codec_is_rejected():
+    with pytest.raises(ValueError):
+        decompress_bytes(compression.MARKER + b"q\x00data")
+
+
+@pytest.mark.skipif(compression.zstandard is None, reason="paket zstandard tidak ter-install")
+def test_zstd_round_trip():
+    stored = compress_text(LONG_JSON, codec="zstd")
+    assert stored[:2] == compression.MARKER + compression.CODEC_ZSTD
+    assert decompress_text(stored) == LONG_JSON
+
+
+def test_zstd_falls_back_to_zlib_without_package(monkeypatch):
+    monkeypatch.setattr(config, "COMPRESSION_CODEC", "zstd")
+    monkeypatch.setattr(compression, "zstandard", None)
+    assert compression.active_codec() == "zlib"
+    assert compress_text(LONG_JSON)[:2] == compression.MARKER + compression.CODEC_ZLIB
+
+
+def test_compressed_text_column_round_trip():
+    engine = create_engine("sqlite://")
+    table = Table("t", MetaData(), Column("id", Integer, primary_key=True), Column("data", CompressedText))
+    table.metadata.create_all(engine)
+    with engine.begin() as conn:
+        conn.execute(insert(table), [{"id": 1, "data": LONG_JSON}, {"id": 2, "data": "{}"}, {"id": 3, "data": None}])
+        # Baris lama yang ditulis sebelum kolom dikompresi
+        conn.exec_driver_sql("INSERT INTO t (id, data) VALUES (4, ?)", (LONG_JSON.encode("utf-8"),))
+        rows = dict(conn.execute(select(table.c.id, table.c.data)).all())
+    assert is_compressed(rows[1])
+    assert [decompress_text(rows[i]) for i in (1, 2, 3, 4)] == [LONG_JSON, "{}", None, LONG_JSON]
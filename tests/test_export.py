@@ -0,0 +1,61 @@
+# tests/test_export.py
+import csv
+import io
+from datetime import datetime
+
+import orjson
+import pytest
+
+from core.compression import MARKER, compress_text
+from nutrition_engine import NUTRIENTS
+from routes.export import CSV_COLUMNS, stream_csv, stream_ndjson
+
+WAKTU = datetime(2025, 8, 1, 7, 30)
+GIZI = '{"energi": 210, "gula": 12, "garam": 160, "protein": 4, "total lemak": 9}'
+REKOMENDASI = '{"rekomendasi": [{"nutrisi": "gula", "saran": "Kurangi konsumsi"}]}'
+BROKEN = [
+    MARKER + b"z\x01bukan deflate",  # zlib.error
+    MARKER + b"q\x00data",  # codec tidak dikenal
+    MARKER + b"s\x00" + b"\x28\xb5\x2f\xfd",  # zstd (paket mungkin tidak ada / data rusak)
+    b"{'energi': 5}",  # bukan JSON
+]
+
+
+def batches():
+    scans = [{"tipe": "scan", "id": 1, "waktu": WAKTU, "filename": "a.jpg", "kandungan_gizi": compress_text(GIZI)}]
+    scans += [{"tipe": "scan", "id": 10 + i, "waktu": WAKTU, "filename": "rusak.jpg", "kandungan_gizi": value}
+              for i, value in enumerate(BROKEN)]
+    scans.append({"tipe": "scan", "id": 20, "waktu": None, "filename": "kosong.jpg", "kandungan_gizi": None})
+    recs = [{"tipe": "rekomendasi", "id": 2, "waktu": WAKTU, "rekomendasi": compress_text(REKOMENDASI)}]
+    recs += [{"tipe": "rekomendasi", "id": 30 + i, "waktu": WAKTU, "rekomendasi": value} for i, value in enumerate(BROKEN[:3])]
+    return [scans, recs]
+
+
+def test_csv_skips_unreadable_rows():
+    rows = list(csv.reader(io.StringIO(b"".join(stream_csv(batches())).decode("utf-8"))))
+    assert rows[0] == list(CSV_COLUMNS)
+    by_id = {row[1]: dict(zip(CSV_COLUMNS, row)) for row in rows[1:]}
+    assert len(by_id) == 10
+    assert by_id["1"]["gula"] == "12" and by_id["1"]["lemak total"] == "9"
+    for image_id in ("10", "11", "12", "13", "20"):
+        assert all(by_id[image_id][key] == "" for key in NUTRIENTS)
+    assert orjson.loads(by_id["2"]["rekomendasi_json"]) == orjson.loads(REKOMENDASI)
+    assert [by_id[i]["rekomendasi_json"] for i in ("30", "31", "32")] == ["", "", ""]
+
+
+def test_ndjson_skips_unreadable_rows(caplog):
+    lines = b"".join(stream_ndjson(batches())).splitlines()
+    records = {rec["id"]: rec for rec in map(orjson.loads, lines)}
+    assert len(records) == 10
+    assert records[1]["kandungan_gizi"]["gula"] == 12
+    assert records[2]["rekomendasi"] == orjson.loads(REKOMENDASI)
+    assert all(records[i]["kandungan_gizi"] is None for i in (10, 11, 12, 13, 20))
+    assert all(records[i]["rekomendasi"] is None for i in (30, 31, 32))
+    assert "id=13" in caplog.text
+
+
+@pytest.mark.parametrize("stream", [stream_csv, stream_ndjson])
+def test_stream_completes_after_bad_row(stream):
+    # Baris rusak di tengah batch tidak memotong stream (response 200 tapi file terpotong)
+    chunks = list(stream(batches()))
+    assert chunks and b"kosong.jpg" in b"".join(chunks)
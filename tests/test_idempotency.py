@@ -0,0 +1,152 @@
+# tests/test_idempotency.py
+import asyncio
+
+import orjson
+import pytest
+from starlette.requests import Request
+
+from core import config, idempotency
+from core.cache import Cache, MemoryCache
+from core.idempotency import IdempotencyMiddleware, skip_store
+
+
+@pytest.fixture(autouse=True)
+def cache(monkeypatch):
+    cache = Cache(MemoryCache(), "idempotency", 60)
+    monkeypatch.setattr(idempotency, "_cache", lambda: cache)
+    monkeypatch.setattr(config, "IDEMPOTENCY_ENABLED", True)
+    monkeypatch.setattr(config, "IDEMPOTENCY_WAIT_S", 5)
+    yield cache
+    assert idempotency._waiters == {}
+
+
+class Endpoint:
+    """App ASGI palsu: hitung panggilan, bisa ditahan (release) dan mengembalikan status tertentu."""
+
+    def __init__(self, status=200, no_store=False, error=None):
+        self.status = status
+        self.no_store = no_store
+        self.error = error
+        self.calls = 0
+        self.release = asyncio.Event()
+        self.release.set()
+
+    async def __call__(self, scope, receive, send):
+        self.calls += 1
+        n = self.calls
+        await self.release.wait()
+        if self.error:
+            raise self.error
+        if self.no_store:
+            skip_store(Request(scope))  # seperti save_recommendation saat ML gagal
+        body = orjson.dumps({"id": n})
+        await send({"type": "http.response.start", "status": self.status,
+                    "headers": [(b"content-type", b"application/json"), (b"x-request-id", b"r%d" % n)]})
+        await send({"type": "http.response.body", "body": body})
+
+
+async def call(app, key="k1", token=b"Bearer a", path="/upload/"):
+    scope = {"type": "http", "method": "POST", "path": path,
+             "headers": [(b"authorization", token)] + ([(b"idempotency-key", key.encode())] if key is not None else [])}
+    messages = []
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        messages.append(message)
+
+    await app(scope, receive, send)
+    start, body = messages[0], b"".join(m.get("body", b"") for m in messages[1:])
+    return start["status"], dict(start["headers"]), orjson.loads(body)
+
+
+def test_retry_replays_stored_response():
+    async def main():
+        endpoint = Endpoint()
+        app = IdempotencyMiddleware(endpoint)
+        first = await call(app)
+        second = await call(app)
+        return endpoint.calls, first, second
+
+    calls, (status1, headers1, body1), (status2, headers2, body2) = asyncio.run(main())
+    assert calls == 1
+    assert (status1, body1) == (status2, body2) == (200, {"id": 1})
+    assert headers2[b"idempotent-replayed"] == b"true"
+    assert b"x-request-id" not in headers2  # header per request tidak ikut di-replay
+
+
+def test_concurrent_duplicates_run_endpoint_once():
+    async def main():
+        endpoint = Endpoint()
+        endpoint.release.clear()
+        app = IdempotencyMiddleware(endpoint)
+        tasks = [asyncio.create_task(call(app)) for _ in range(5)]
+        await asyncio.sleep(0.05)
+        assert endpoint.calls == 1 and len(idempotency._waiters) == 1
+        endpoint.release.set()
+        return endpoint.calls, await asyncio.gather(*tasks)
+
+    calls, results = asyncio.run(main())
+    assert calls == 1
+    assert [body for _, _, body in results] == [{"id": 1}] * 5
+    assert sum(headers.get(b"idempotent-replayed") == b"true" for _, headers, _ in results) == 4
+
+
+def test_keys_are_scoped_per_token_and_path():
+    async def main():
+        endpoint = Endpoint()
+        app = IdempotencyMiddleware(endpoint)
+        await call(app)
+        await call(app, token=b"Bearer b")
+        await call(app, path="/recommendation/save")
+        await call(app, key=None)
+        await call(app, path="/scan-history")  # bukan IDEMPOTENT_ROUTES
+        return endpoint.calls
+
+    assert asyncio.run(main()) == 5
+
+
+@pytest.mark.parametrize("endpoint", [Endpoint(status=502), Endpoint(status=429), Endpoint(no_store=True)])
+def test_failed_or_unstorable_responses_are_retried(endpoint):
+    async def main():
+        app = IdempotencyMiddleware(endpoint)
+        await call(app)
+        await call(app)
+        return endpoint.calls
+
+    assert asyncio.run(main()) == 2
+
+
+def test_exception_clears_pending_key(cache):
+    async def main():
+        app = IdempotencyMiddleware(Endpoint(error=RuntimeError("OCR mati")))
+        with pytest.raises(RuntimeError):
+            await call(app)
+        endpoint = Endpoint()
+        await call(IdempotencyMiddleware(endpoint))
+        return endpoint.calls
+
+    assert asyncio.run(main()) == 1
+
+
+def test_pending_on_other_worker_times_out_without_leaking_waiter(cache, monkeypatch):
+    monkeypatch.setattr(config, "IDEMPOTENCY_WAIT_S", 0.3)
+    headers = {b"authorization": b"Bearer a"}
+    # Request pertama sedang berjalan di worker lain: hanya tanda pending di cache bersama
+    cache.add(idempotency.scoped_key(headers, "POST", "/upload/", "k1"), {"state": "pending"})
+
+    async def main():
+        endpoint = Endpoint()
+        result = await call(IdempotencyMiddleware(endpoint))
+        return endpoint.calls, result
+
+    calls, (status, headers, body) = asyncio.run(main())
+    assert calls == 0
+    assert status == 409 and headers[b"retry-after"] == b"5"
+    # fixture: _waiters harus kosong (event tidak tertinggal setelah timeout)
+
+
+def test_invalid_key_is_rejected():
+    status, _, body = asyncio.run(call(IdempotencyMiddleware(Endpoint()), key="x" * 300))
+    assert status == 400
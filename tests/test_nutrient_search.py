@@ -0,0 +1,52 @@
+# tests/test_nutrient_search.py
+import pytest
+
+from core.compression import compress_text
+from core.nutrient_search import InvalidQuery, nutrient_values, parse_filter, parse_value
+
+
+@pytest.mark.parametrize("expr, expected", [
+    ("gula>10", ("gula", ">", 10.0)),
+    ("garam<=500", ("garam", "<=", 500.0)),
+    ("protein >= 2,5", ("protein", ">=", 2.5)),
+    ("serat=0", ("serat", "=", 0.0)),
+    ("energi < -1", ("energi", "<", -1.0)),
+    ("  GULA > 10  ", ("gula", ">", 10.0)),
+    ("lemak total <= 5", ("lemak_total", "<=", 5.0)),
+    ("lemak_total<=5", ("lemak_total", "<=", 5.0)),
+])
+def test_parse_filter(expr, expected):
+    assert parse_filter(expr) == expected
+
+
+@pytest.mark.parametrize("expr", ["gula", "gula>", ">10", "gula=>10", "gula>>10", "gula>sepuluh", "gula>10 g", ""])
+def test_parse_filter_invalid_syntax(expr):
+    with pytest.raises(InvalidQuery, match="Filter tidak valid"):
+        parse_filter(expr)
+
+
+def test_parse_filter_unknown_nutrient():
+    with pytest.raises(InvalidQuery, match="Nutrisi tidak dikenal"):
+        parse_filter("kafein>10")
+
+
+@pytest.mark.parametrize("val, expected", [
+    (10, 10.0), (1.5, 1.5), ("1,5", 1.5), ("10 g", 10.0), ("-3", -3.0),
+    (None, None), (True, None), ("", None), ("abc", None),
+])
+def test_parse_value(val, expected):
+    assert parse_value(val) == expected
+
+
+def test_nutrient_values_from_compressed_json_with_alias():
+    stored = compress_text('{"energi": 210, "total lemak": "9 g", "gula": "1,5", "garam": null}')
+    values = nutrient_values(stored)
+    assert values["energi"] == 210.0
+    assert values["lemak_total"] == 9.0
+    assert values["gula"] == 1.5
+    assert values["garam"] is None
+
+
+@pytest.mark.parametrize("stored", [None, b"", b"{}", b"[1, 2]", b"{'energi': 5}"])
+def test_nutrient_values_without_usable_json(stored):
+    assert nutrient_values(stored) is None
@@ -0,0 +1,50 @@
+# tests/test_nutrition_engine.py
+from datetime import date, datetime
+
+import numpy as np
+
+from core.compression import MARKER, compress_text
+from nutrition_engine import NUTRIENTS, build_report, scans_to_matrix
+
+KEBUTUHAN = {"energi": 2000, "gula": 50, "garam": 2000}
+
+
+def gizi(**values):
+    return compress_text(str(values).replace("'", '"'))
+
+
+def test_bad_rows_count_as_no_data():
+    rows = [
+        (datetime(2025, 8, 1, 8), gizi(energi=300, gula=20)),
+        (datetime(2025, 8, 1, 12), MARKER + b"z\x01rusak"),  # zlib.error
+        (datetime(2025, 8, 1, 13), MARKER + b"q\x00data"),  # codec tidak dikenal
+        (datetime(2025, 8, 2, 9), b"{'gula': 5}"),  # bukan JSON
+        (datetime(2025, 8, 2, 10), None),
+        (None, gizi(energi=999)),  # tanpa uploaded_at: dilewati
+    ]
+    days, matrix = scans_to_matrix(rows)
+    assert len(days) == 5
+    assert matrix[0, NUTRIENTS.index("energi")] == 300
+    assert not matrix[1:].any()
+
+
+def test_report_with_bad_rows():
+    rows = [
+        (datetime(2025, 8, 1, 8), gizi(energi=300, gula=30)),
+        (datetime(2025, 8, 1, 9), gizi(gula="30,5")),
+        (datetime(2025, 8, 2, 9), MARKER + b"z\x01rusak"),
+        (None, gizi(gula=999)),
+    ]
+    report = build_report(rows, KEBUTUHAN, date(2025, 8, 1), date(2025, 8, 3))
+    hari = {h["tanggal"]: h for h in report["hari"]}
+    assert hari["2025-08-01"]["jumlah_scan"] == 2
+    assert hari["2025-08-01"]["asupan"]["gula"] == 60.5
+    assert hari["2025-08-01"]["melebihi"] == ["gula"]
+    assert hari["2025-08-02"]["jumlah_scan"] == 1
+    assert hari["2025-08-02"]["asupan"]["gula"] == 0
+
+
+def test_empty_rows():
+    days, matrix = scans_to_matrix([])
+    assert days.shape == (0,) and matrix.shape == (0, len(NUTRIENTS))
+    assert np.isfinite(matrix).all()
@@ -0,0 +1,66 @@
+# tests/test_phash.py
+import io
+import random
+
+import pytest
+
+from core.phash import BKTree, dhash, hamming
+
+
+def linear_search(items, value, max_dist):
+    found = [(hamming(value, h), item) for h, item in items if hamming(value, h) <= max_dist]
+    return sorted(found, key=lambda x: (x[0], -x[1]))
+
+
+def test_empty_tree():
+    assert BKTree().search(0, 64) == []
+
+
+def test_exact_and_near_matches():
+    tree = BKTree()
+    tree.add(0b0000, 1)
+    tree.add(0b0001, 2)
+    tree.add(0b0111, 3)
+    tree.add(0b1111_0000, 4)
+    assert tree.size == 4
+    assert tree.search(0b0000, 0) == [(0, 1)]
+    assert tree.search(0b0000, 1) == [(0, 1), (1, 2)]
+    assert tree.search(0b0000, 3) == [(0, 1), (1, 2), (3, 3)]
+
+
+def test_same_distance_newest_first():
+    tree = BKTree()
+    for image_id in (5, 9, 7):
+        tree.add(0xFF, image_id)  # foto identik, scan berbeda
+    assert tree.search(0xFF, 0) == [(0, 9), (0, 7), (0, 5)]
+
+
+@pytest.mark.parametrize("max_dist", [0, 2, 8, 16])
+def test_matches_linear_search(max_dist):
+    rng = random.Random(max_dist)
+    base = [rng.getrandbits(64) for _ in range(20)]
+    # Hash acak + variasi kecil dari beberapa hash dasar (seperti foto ulang label yang sama)
+    items = [(rng.getrandbits(64), i) for i in range(300)]
+    items += [(h ^ (1 << rng.randrange(64)) ^ (1 << rng.randrange(64)), 300 + i) for i, h in enumerate(base * 5)]
+    tree = BKTree()
+    for h, item in items:
+        tree.add(h, item)
+    for query in base + [rng.getrandbits(64) for _ in range(10)]:
+        assert tree.search(query, max_dist) == linear_search(items, query, max_dist)
+
+
+def test_dhash_similar_images():
+    PIL = pytest.importorskip("PIL.Image")
+    img = PIL.linear_gradient("L").resize((256, 256))
+
+    def encode(im, fmt, **kw):
+        buf = io.BytesIO()
+        im.save(buf, fmt, **kw)
+        return buf.getvalue()
+
+    original = dhash(encode(img, "PNG"))
+    recompressed = dhash(encode(img.resize((180, 180)), "JPEG", quality=60))
+    different = dhash(encode(img.rotate(90), "PNG"))
+    assert hamming(original, recompressed) <= 8
+    assert hamming(original, different) > 8
+    assert dhash(b"bukan gambar") is None
@@ -0,0 +1,134 @@
+# tests/test_ratelimit.py
+import asyncio
+
+import pytest
+
+from core import ratelimit
+from core.ratelimit import Overloaded, TokenBucketLimiter, UpstreamGate, parse_rate_limits
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr(ratelimit.time, "monotonic", lambda: now[0])
+    return now
+
+
+def test_parse_rate_limits():
+    assert parse_rate_limits(" upload=20/60, predict=5 ,,") == {"upload": (20.0, 60.0), "predict": (5.0, 1.0)}
+
+
+def test_token_bucket_burst_then_refill(clock):
+    limiter = TokenBucketLimiter(3, 60)  # 3 per 60 detik = 1 token / 20 detik
+    assert [limiter.take("user:1") for _ in range(3)] == [0, 0, 0]
+    assert limiter.take("user:1") == pytest.approx(20)
+    assert limiter.take("user:2") == 0  # bucket per key
+    clock[0] += 10
+    assert limiter.take("user:1") == pytest.approx(10)
+    clock[0] += 10
+    assert limiter.take("user:1") == 0
+    clock[0] += 1000  # tidak melebihi kapasitas setelah lama idle
+    assert [limiter.take("user:1") for _ in range(4)][-1] > 0
+    assert limiter.stats()["limited"] == 3
+
+
+def test_token_bucket_drops_oldest_keys(clock):
+    limiter = TokenBucketLimiter(1, 60, max_keys=2)
+    for key in ("a", "b", "c"):
+        limiter.take(key)
+    assert list(limiter._buckets) == ["b", "c"]
+    assert limiter.take("a") == 0  # bucket baru (penuh) setelah dibuang
+
+
+async def hold(gate, seconds):
+    async with gate.slot():
+        await asyncio.sleep(seconds)
+
+
+def assert_idle(gate):
+    assert gate._semaphore._value == gate.max_inflight
+    assert gate.in_flight == 0 and gate.waiting == 0
+
+
+def test_gate_queue_timeout_returns_every_permit():
+    async def main():
+        gate = UpstreamGate(2, 100, 0.05)
+
+        async def attempt():
+            try:
+                await hold(gate, 0.049)  # selesai hampir bersamaan dengan batas tunggu antrean
+                return "ok"
+            except Overloaded:
+                return "shed"
+
+        for _ in range(20):
+            results = await asyncio.gather(*(attempt() for _ in range(12)))
+            assert "ok" in results and "shed" in results
+            await asyncio.sleep(0)
+            assert_idle(gate)
+        return gate
+
+    gate = asyncio.run(main())
+    assert gate.timeouts > 0
+
+
+def test_gate_releases_permit_acquired_after_timeout():
+    class LateSemaphore(asyncio.Semaphore):
+        async def acquire(self):
+            await super().acquire()
+            try:
+                await asyncio.sleep(1)
+            except asyncio.CancelledError:
+                pass  # permit sudah didapat tepat saat batas tunggu habis
+            return True
+
+    async def main():
+        gate = UpstreamGate(1, 10, 0.05)
+        gate._semaphore = LateSemaphore(1)
+        with pytest.raises(Overloaded):
+            await hold(gate, 0)
+        await asyncio.sleep(0.01)  # task acquire yang dibatalkan selesai + callback-nya
+        assert_idle(gate)
+
+    asyncio.run(main())
+
+
+def test_gate_cancelled_waiter_returns_permit():
+    async def main():
+        gate = UpstreamGate(1, 10, 5)
+        holder = asyncio.create_task(hold(gate, 0.1))
+        await asyncio.sleep(0.01)
+        waiter = asyncio.create_task(hold(gate, 0))
+        await asyncio.sleep(0.01)
+        assert gate.waiting == 1
+        waiter.cancel()  # client putus saat menunggu antrean
+        await holder
+        with pytest.raises(asyncio.CancelledError):
+            await waiter
+        await asyncio.sleep(0)
+        assert_idle(gate)
+        await hold(gate, 0)  # permit masih bisa dipakai
+        assert_idle(gate)
+
+    asyncio.run(main())
+
+
+def test_gate_sheds_when_queue_full():
+    async def main():
+        gate = UpstreamGate(1, 1, 5)
+        holder = asyncio.create_task(hold(gate, 0.1))
+        await asyncio.sleep(0.01)
+        queued = asyncio.create_task(hold(gate, 0))
+        await asyncio.sleep(0.01)
+        with pytest.raises(Overloaded) as exc:
+            await hold(gate, 0)
+        assert int(exc.value.headers["Retry-After"]) >= 1
+        await asyncio.gather(holder, queued)
+        assert_idle(gate)
+        assert gate.shed == 1 and gate.admitted == 2
+
+    asyncio.run(main())
+
+
+def test_gate_disabled_is_pass_through():
+    asyncio.run(hold(UpstreamGate(0, 0, 0), 0))
@@ -0,0 +1,120 @@
+# tests/test_replica.py
+import asyncio
+
+import jwt
+import pytest
+
+from core import cache as cache_module, config, replica as replica_module
+from core.cache import MemoryCache
+from core.replica import ReadYourWritesMiddleware, ReplicaSet, token_user_id
+from database import engine as primary_engine
+
+
+@pytest.fixture(autouse=True)
+def fresh_cache(monkeypatch):
+    # Cache db_sticky bersama (di app: sqlite / redis) diganti memory baru per test
+    monkeypatch.setattr(cache_module, "_backend", MemoryCache())
+    monkeypatch.setattr(cache_module, "_caches", {})
+
+
+@pytest.fixture
+def replica_set(tmp_path):
+    urls = [f"sqlite:///{tmp_path / 'replica1.db'}", f"sqlite:///{tmp_path / 'replica2.db'}"]
+    replicas = ReplicaSet(urls)
+    yield replicas
+    replicas.dispose()
+
+
+def bind(session):
+    try:
+        return session.get_bind()
+    finally:
+        session.close()
+
+
+def test_without_replicas_reads_go_to_primary():
+    assert bind(ReplicaSet([]).session(1)) is primary_engine
+
+
+def test_unchecked_replicas_are_not_used(replica_set):
+    assert bind(replica_set.session(1)) is primary_engine
+    assert replica_set.primary_reads["no_replica"] == 1
+
+
+def test_healthy_replicas_round_robin(replica_set):
+    assert replica_set.check() == {"replicas": 2, "healthy": 2}
+    engines = [bind(replica_set.session(1)) for _ in range(4)]
+    assert set(engines) == {r.engine for r in replica_set.replicas}
+    assert engines[0] is engines[2] and engines[1] is engines[3]
+    assert [r.reads for r in replica_set.replicas] == [2, 2]
+
+
+def test_lagging_or_broken_replica_is_skipped(replica_set, monkeypatch):
+    lagging, healthy = replica_set.replicas
+    monkeypatch.setattr(replica_module, "replication_lag",
+                        lambda conn: 99.0 if conn.engine is lagging.engine else 0.0)
+    replica_set.check()
+    assert not lagging.healthy and lagging.error == "lag 99.0 s"
+    assert all(bind(replica_set.session(1)) is healthy.engine for _ in range(3))
+
+    def broken(conn):
+        raise RuntimeError("Replikasi berhenti")
+
+    monkeypatch.setattr(replica_module, "replication_lag", broken)
+    replica_set.check()
+    assert bind(replica_set.session(1)) is primary_engine
+
+
+def test_connect_failure_falls_back_to_primary(tmp_path):
+    replicas = ReplicaSet([f"sqlite:///{tmp_path / 'tidak-ada' / 'replica.db'}"])
+    replicas.replicas[0].healthy = True  # sehat saat dicek, mati sebelum request berikutnya
+    assert bind(replicas.session(1)) is primary_engine
+    assert not replicas.replicas[0].healthy
+    assert replicas.primary_reads["connect_failed"] == 1
+    replicas.dispose()
+
+
+def test_sticky_reads_after_write(replica_set, monkeypatch):
+    replica_set.check()
+    asyncio.run(replica_set.mark_write(7))
+    assert bind(replica_set.session(7)) is primary_engine
+    assert bind(replica_set.session(8)) is not primary_engine  # user lain tetap ke replica
+    assert replica_set.primary_reads["sticky"] == 1
+
+    # Write di worker lain: hanya tercatat di cache bersama
+    other_worker = ReplicaSet([])
+    asyncio.run(other_worker.mark_write(9))
+    assert replica_set.is_sticky(9)
+
+    # Setelah DB_REPLICA_STICKY_S: kembali ke replica
+    now = replica_module.time.monotonic() + config.DB_REPLICA_STICKY_S + 1
+    monkeypatch.setattr(replica_module.time, "monotonic", lambda: now)
+    monkeypatch.setattr(cache_module.time, "time", lambda: 10 ** 10)
+    assert not replica_set.is_sticky(7)
+    assert bind(replica_set.session(7)) is not primary_engine
+
+
+def test_token_user_id():
+    token = jwt.encode({"user_id": 5}, config.SECRET_KEY, algorithm="HS256")
+    assert token_user_id(f"Bearer {token}") == 5
+    assert token_user_id("Bearer rusak") is None
+    assert token_user_id(token) is None
+    assert token_user_id(f"Bearer {jwt.encode({'user_id': 5}, 'kunci-lain', algorithm='HS256')}") is None
+
+
+@pytest.mark.parametrize("method, sticky", [("POST", True), ("PUT", True), ("GET", False)])
+def test_middleware_marks_writes(replica_set, monkeypatch, method, sticky):
+    monkeypatch.setattr(replica_module, "replicas", replica_set)
+    token = jwt.encode({"user_id": 11}, config.SECRET_KEY, algorithm="HS256")
+
+    async def endpoint(scope, receive, send):
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+        await send({"type": "http.response.body", "body": b"{}"})
+
+    async def send(message):
+        pass
+
+    scope = {"type": "http", "method": method, "path": "/me",
+             "headers": [(b"authorization", f"Bearer {token}".encode())]}
+    asyncio.run(ReadYourWritesMiddleware(endpoint)(scope, None, send))
+    assert replica_set.is_sticky(11) is sticky
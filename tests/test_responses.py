@@ -0,0 +1,28 @@
+# tests/test_responses.py
+import orjson
+import pytest
+
+from core.compression import compress_text
+from core.responses import json_fragment
+
+
+def dumps(value):
+    return orjson.loads(orjson.dumps({"v": value}))["v"]
+
+
+@pytest.mark.parametrize("stored, expected", [
+    ('{"energi": 5}', {"energi": 5}),
+    (' [1, 2] ', [1, 2]),
+    ("null", None),
+    ("5", 5),
+    (compress_text('{"rekomendasi": [' + ", ".join(['{"saran": "Kurangi konsumsi"}'] * 10) + "]}"),
+     {"rekomendasi": [{"saran": "Kurangi konsumsi"}] * 10}),
+])
+def test_valid_json_passes_through(stored, expected):
+    assert dumps(json_fragment(stored)) == expected
+
+
+@pytest.mark.parametrize("stored", ["{'energi': 5}", "{bukan json}", '{"a": 1', "[1, 2", b"\x00z\x01rusak", "", None])
+def test_invalid_json_falls_back_to_default(stored):
+    assert dumps(json_fragment(stored)) == {}
+    assert dumps(json_fragment(stored, default=[])) == []
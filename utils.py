@@ -2,12 +2,20 @@ import os
 import time
 import csv
 import jwt
-import aiohttp
 import logging
+import functools
 from fastapi import HTTPException
 from fastapi.security import HTTPAuthorizationCredentials
 from passlib.context import CryptContext
 from typing import Optional
+from urllib.parse import urlparse
+from core import config
+from core.cache import get_cache
+from core.capture import record_upstream, upstream_key
+from core.http import get_http_session
+from core.log import log_payload
+from core.ratelimit import upstream_gate
+from core.tracing import span, traced
 
 # Password hashing context (if needed elsewhere)
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
@@ -40,52 +48,70 @@ def verify_token(credentials: HTTPAuthorizationCredentials, secret_key: str, alg
         raise HTTPException(status_code=401, detail="Token tidak valid atau kadaluarsa")
 
 
+NUTRITION_CSV_PATH = os.path.join(os.path.dirname(__file__), 'nutrition.csv')
+
+# Key gizi hasil OCR -> kolom kebutuhan harian di nutrition.csv
+CSV_KEY_MAP = {
+    "energi": "Energi (kkal)",
+    "protein": "Protein (g)",
+    "lemak total": "Total Lemak (g)",
+    "karbohidrat": "Karbohidrat (g)",
+    "serat": "Serat (g)",
+    "gula": "Gula (g)",
+    "garam": "Garam (mg)"
+}
+
+
+@functools.lru_cache(maxsize=8)
+def load_nutrition_rows(csv_path: str = NUTRITION_CSV_PATH) -> tuple:
+    """Baca tabel kebutuhan gizi sekali per proses (data referensi statis, di-warm saat startup)."""
+    with open(csv_path, encoding='utf-8') as f:
+        return tuple(csv.DictReader(f))
+
+
+@traced("csv")
 def get_daily_nutrition(gender, umur, umur_satuan, hamil, usia_kandungan, menyusui, umur_anak, csv_path=None):
     """
     Mengambil kebutuhan harian dari CSV berdasarkan data user.
     Jika hamil/menyusui, kebutuhan = kebutuhan dasar + tambahan hamil/menyusui.
     """
     if csv_path is None:
-        csv_path = os.path.join(os.path.dirname(__file__), 'nutrition.csv')
+        csv_path = NUTRITION_CSV_PATH
     kebutuhan_dasar = None
     tambahan = None
     # 1. Cari kebutuhan dasar (berdasarkan gender/umur)
     if gender and umur is not None and umur_satuan:
         if umur_satuan == 'tahun':
-            with open(csv_path, encoding='utf-8') as f:
-                reader = csv.DictReader(f)
-                for row in reader:
-                    kategori_csv = row['Kategori'].strip().lower()
-                    gender_norm = (gender or '').strip().lower()
-                    if kategori_csv == gender_norm:
-                        umur_csv = row['Umur'].strip()
-                        if '-' in umur_csv:
-                            parts = umur_csv.split('-')
-                            try:
-                                min_u = int(parts[0].strip())
-                                max_u = int(parts[1].replace('+','').strip())
-                                if min_u <= int(umur) <= max_u and row['Satuan'].lower() == 'tahun':
-                                    kebutuhan_dasar = row
-                                    break
-                            except:
-                                continue
-                        elif umur_csv.replace('+','').isdigit():
-                            min_u = int(umur_csv.replace('+','').strip())
-                            if int(umur) >= min_u and row['Satuan'].lower() == 'tahun':
+            for row in load_nutrition_rows(csv_path):
+                kategori_csv = row['Kategori'].strip().lower()
+                gender_norm = (gender or '').strip().lower()
+                if kategori_csv == gender_norm:
+                    umur_csv = row['Umur'].strip()
+                    if '-' in umur_csv:
+                        parts = umur_csv.split('-')
+                        try:
+                            min_u = int(parts[0].strip())
+                            max_u = int(parts[1].replace('+','').strip())
+                            if min_u <= int(umur) <= max_u and row['Satuan'].lower() == 'tahun':
                                 kebutuhan_dasar = row
                                 break
+                        except:
+                            continue
+                    elif umur_csv.replace('+','').isdigit():
+                        min_u = int(umur_csv.replace('+','').strip())
+                        if int(umur) >= min_u and row['Satuan'].lower() == 'tahun':
+                            kebutuhan_dasar = row
+                            break
         elif umur_satuan == 'bulan':
-            with open(csv_path, encoding='utf-8') as f:
-                reader = csv.DictReader(f)
-                for row in reader:
-                    if row['Kategori'] == 'Bayi/Anak':
-                        umur_range = row['Umur'].split('-')
-                        if len(umur_range) == 2:
-                            min_u = int(umur_range[0].strip())
-                            max_u = int(umur_range[1].strip())
-                            if min_u <= int(umur) <= max_u and row['Satuan'] == 'bulan':
-                                kebutuhan_dasar = row
-                                break
+            for row in load_nutrition_rows(csv_path):
+                if row['Kategori'] == 'Bayi/Anak':
+                    umur_range = row['Umur'].split('-')
+                    if len(umur_range) == 2:
+                        min_u = int(umur_range[0].strip())
+                        max_u = int(umur_range[1].strip())
+                        if min_u <= int(umur) <= max_u and row['Satuan'] == 'bulan':
+                            kebutuhan_dasar = row
+                            break
     # 2. Tambahan jika hamil
     if hamil and usia_kandungan:
         if usia_kandungan <= 3:
@@ -94,24 +120,20 @@ def get_daily_nutrition(gender, umur, umur_satuan, hamil, usia_kandungan, menyus
             trimester = '2'
         else:
             trimester = '3'
-        with open(csv_path, encoding='utf-8') as f:
-            reader = csv.DictReader(f)
-            for row in reader:
-                if row['Kategori'].lower().startswith('hamil') and row['Umur'] == trimester and row['Satuan'].lower() == 'trimester':
-                    tambahan = row
-                    break
+        for row in load_nutrition_rows(csv_path):
+            if row['Kategori'].lower().startswith('hamil') and row['Umur'] == trimester and row['Satuan'].lower() == 'trimester':
+                tambahan = row
+                break
     # 3. Tambahan jika menyusui
     elif menyusui and umur_anak is not None:
         if umur_anak <= 6:
             menyusui_periode = '1 - 6'
         else:
             menyusui_periode = '7 - 12'
-        with open(csv_path, encoding='utf-8') as f:
-            reader = csv.DictReader(f)
-            for row in reader:
-                if row['Kategori'].lower().startswith('menyusui') and row['Umur'] == menyusui_periode and row['Satuan'].lower() == 'bulan':
-                    tambahan = row
-                    break
+        for row in load_nutrition_rows(csv_path):
+            if row['Kategori'].lower().startswith('menyusui') and row['Umur'] == menyusui_periode and row['Satuan'].lower() == 'bulan':
+                tambahan = row
+                break
     # 4. Gabungkan kebutuhan dasar + tambahan (jika ada)
     if kebutuhan_dasar:
         kebutuhan_final = kebutuhan_dasar.copy()
@@ -132,7 +154,7 @@ def get_daily_nutrition(gender, umur, umur_satuan, hamil, usia_kandungan, menyus
                 kebutuhan_final[key] = dasar + add
         return kebutuhan_final
     elif tambahan:
-        return tambahan
+        return dict(tambahan)
     else:
         return None
 
@@ -183,19 +205,37 @@ def compare_nutrition(kandungan_gizi, kebutuhan_gizi):
 
 # --- Utility untuk proxy ML API ---
 async def proxy_ml_api(url: str, payload: dict):
-    logger.info(f"[ML PROXY] POST {url}")
-    logger.info(f"[ML PROXY] Payload: {payload}")
+    # Body hanya dicatat jika LOG_PAYLOADS aktif + terpilih sampling (core/log.py)
+    log_payload(logger, "ml_proxy_request", payload, url=url)
+    # Payload yang sama -> respons ML yang sama; cache dipakai bersama antar worker
+    cache = get_cache("ml", config.CACHE_TTL_ML_S)
+    path, payload_key = urlparse(url).path, upstream_key(payload)
+    cache_key = f"{path}:{payload_key}"
+    cached = await cache.aget(cache_key)
+    if cached is not None:
+        logger.info("ml_proxy", extra={"url": url, "cache": "hit"})
+        return cached
     try:
-        async with aiohttp.ClientSession() as session:
-            async with session.post(url, json=payload) as resp:
-                try:
-                    data = await resp.json()
-                except Exception:
-                    data = {"detail": "ML API response is not valid JSON"}
-                logger.info(f"[ML PROXY] Status: {resp.status}, Response: {data}")
-                if resp.status >= 400:
-                    raise HTTPException(status_code=resp.status, detail=data.get("detail") or data)
-                return data
+        t0 = time.perf_counter()
+        session = get_http_session()
+        with span("ml", path=path):
+            async with upstream_gate.slot():
+                async with session.post(url, json=payload) as resp:
+                    try:
+                        data = await resp.json()
+                    except Exception:
+                        data = {"detail": "ML API response is not valid JSON"}
+                    status = resp.status
+        latency_ms = (time.perf_counter() - t0) * 1000
+        logger.info("ml_proxy", extra={"url": url, "cache": "miss", "status": status, "latency_ms": round(latency_ms, 1)})
+        log_payload(logger, "ml_proxy_response", data, url=url, status=status)
+        record_upstream(path, payload_key, data, latency_ms, status)
+        if status >= 400:
+            raise HTTPException(status_code=status, detail=data.get("detail") or data)
+        await cache.aset(cache_key, data)
+        return data
+    except HTTPException:
+        raise
     except Exception as e:
-        logger.error(f"[ML PROXY] ERROR: {str(e)}")
+        logger.error(f"[ML PROXY] ERROR: {str(e)}", extra={"url": url})
         raise HTTPException(status_code=500, detail=f"Gagal memanggil ML API: {str(e)}")